@@ -0,0 +1,111 @@
+import gc
+import sys
+import time
+import json
+import platform
+import statistics
+
+# Timing, results file and baseline comparison shared by micro.py and macro.py.
+#
+# Results file (JSON):
+#   {"version": 1, "timestamp": ..., "machine": {...},
+#    "results": {name: {"unit": "s", "per_call": min seconds, "median": ..., "mean": ...,
+#                       "number": calls per repeat, "repeat": ..., ...extra fields}}}
+# The minimum is compared against the baseline: it is the least noisy of the
+# three on a busy machine.
+
+RESULTS_VERSION = 1
+DEFAULT_THRESHOLD = 0.25 # Slower than the baseline by more than this fraction is a regression
+
+
+def measure(fn, reset=None, number=100, repeat=5):
+    # Seconds per call of fn(); reset() runs before every call and isn't timed.
+    # Garbage collection is off while timing, like timeit.
+    times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            total = 0.0
+            for _ in range(number):
+                if reset is not None:
+                    reset()
+                start = time.perf_counter()
+                fn()
+                total += time.perf_counter() - start
+            times.append(total / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "unit": "s",
+        "per_call": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def machine_info():
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def new_results():
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "results": {},
+    }
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read {path}: {e}")
+        return None
+    if data.get("version") != RESULTS_VERSION:
+        print(f"{path}: unsupported results version {data.get('version')}")
+        return None
+    return data
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    # [(name, status, ratio)] with status "ok", "regression", "faster" or
+    # "new" (no baseline entry); ratio is current / baseline time
+    rows = []
+    base = baseline["results"] if baseline else {}
+    for name, result in current["results"].items():
+        if name not in base or not base[name].get("per_call"):
+            rows.append((name, "new", None))
+            continue
+        ratio = result["per_call"] / base[name]["per_call"]
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, status, ratio))
+    return rows
+
+
+def format_time(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
@@ -0,0 +1,143 @@
+import os
+import sys
+import pygame
+from . import scenes
+from .common import measure, new_results, save_results, load_results, compare, format_time, DEFAULT_THRESHOLD
+
+# Golden-frame harness: puts the game into every scene (benchmarks/scenes.py,
+# fixed seed, dummy video driver), draws one frame, saves it as PNG and
+# compares it with the golden image; then times the scene's frames.
+# Usage: python -m benchmarks.golden [--update] [--scene NAME] [--tolerance 2] [--max-diff 0]
+#                                    [--golden DIR] [--out DIR] [--frames N] [--baseline FILE]
+#
+#   --update     write the captured frames as the new golden images
+#   --scene      only scenes whose name contains NAME
+#   --tolerance  per-channel difference a pixel may have and still match (0-255)
+#   --max-diff   fraction of pixels allowed to differ (0 = every pixel within tolerance)
+#   --golden     golden images (default benchmarks/golden)
+#   --out        captured frames and diff images (default benchmarks/frames)
+#   --frames     frames timed per scene
+#   --baseline   compare the frame times with a results file (see benchmarks/run.py)
+#
+# Exits 1 if a frame doesn't match (a <scene>.diff.png marks the differing
+# pixels in red) or a frame time regressed. Golden images depend on the fonts
+# installed (SimHei falls back to pygame's default font), so generate them
+# on the machine that checks them.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_GOLDEN = os.path.join(HERE, "golden")
+DEFAULT_OUT = os.path.join(HERE, "frames")
+DEFAULT_TOLERANCE = 2
+FRAMES = 30
+DIFF_COLOR = (255, 0, 0)
+
+
+def capture(game, name):
+    # The scene's first frame; None if the scene couldn't be set up
+    if not scenes.enter(game, name):
+        return None
+    game.draw()
+    return game.screen.copy()
+
+
+def diff_mask(frame, golden, tolerance):
+    # Mask of the pixels that differ by more than tolerance in any channel
+    diff = frame.copy()
+    diff.blit(golden, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+    other = golden.copy()
+    other.blit(frame, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+    diff.blit(other, (0, 0), special_flags=pygame.BLEND_RGB_MAX) # |frame - golden|
+    limit = min(tolerance + 1, 255)
+    same = pygame.mask.from_threshold(diff, (0, 0, 0, 255), (limit, limit, limit, 255))
+    same.invert()
+    return same
+
+
+def check(frame, golden_path, tolerance, max_diff, diff_path):
+    # (status, fraction of differing pixels)
+    if not os.path.exists(golden_path):
+        return "missing", None
+    golden = pygame.image.load(golden_path).convert()
+    if golden.get_size() != frame.get_size():
+        return "size", None
+    mask = diff_mask(frame, golden, tolerance)
+    fraction = mask.count() / (frame.get_width() * frame.get_height())
+    if mask.count() and fraction > max_diff:
+        marked = frame.copy()
+        marked.fill((96, 96, 96), special_flags=pygame.BLEND_RGB_MULT)
+        marked.blit(mask.to_surface(setcolor=DIFF_COLOR, unsetcolor=None), (0, 0))
+        pygame.image.save(marked, diff_path)
+        return "differs", fraction
+    if os.path.exists(diff_path):
+        os.remove(diff_path)
+    return "ok", fraction
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m benchmarks.golden [--update] [--scene NAME] [--tolerance 2] [--max-diff 0]"
+              " [--golden DIR] [--out DIR] [--frames N] [--baseline FILE]")
+        return 2
+    update = "--update" in args
+    scene_filter = option(args, "--scene", None)
+    tolerance = int(option(args, "--tolerance", DEFAULT_TOLERANCE))
+    max_diff = float(option(args, "--max-diff", 0))
+    golden_dir = option(args, "--golden", DEFAULT_GOLDEN)
+    out_dir = option(args, "--out", DEFAULT_OUT)
+    frames = int(option(args, "--frames", FRAMES))
+    baseline_path = option(args, "--baseline", None)
+    os.makedirs(golden_dir if update else out_dir, exist_ok=True)
+
+    game = scenes.new_game()
+    results = new_results()
+    failed = 0
+    print(f"{'scene':<16} {'frame':>10} {'median':>10}  golden")
+    for name, _, _ in scenes.SCENES:
+        if scene_filter and scene_filter not in name:
+            continue
+        frame = capture(game, name)
+        if frame is None:
+            print(f"{name:<16} {'-':>10} {'-':>10}  scene not reached (phase {game.game_phase})")
+            failed += 1
+            continue
+
+        if update:
+            pygame.image.save(frame, os.path.join(golden_dir, f"{name}.png"))
+            status = "updated"
+        else:
+            pygame.image.save(frame, os.path.join(out_dir, f"{name}.png"))
+            status, fraction = check(frame, os.path.join(golden_dir, f"{name}.png"), tolerance, max_diff,
+                                     os.path.join(out_dir, f"{name}.diff.png"))
+            if status == "differs":
+                status = f"DIFFERS ({fraction:.3%} of pixels)"
+                failed += 1
+            elif status in ("missing", "size"):
+                status = "no golden image" if status == "missing" else "SIZE MISMATCH"
+                failed += status != "no golden image"
+
+        # Timing: the frames after the captured one (animations keep running)
+        timing = measure(game.draw, None, frames, 3)
+        results["results"][f"macro/frame/{name}"] = timing
+        print(f"{name:<16} {format_time(timing['per_call']):>10} {format_time(timing['median']):>10}  {status}")
+
+    if baseline_path:
+        baseline = load_results(baseline_path)
+        if baseline is None:
+            return 2
+        print(f"\nFrame times compared with {baseline_path}:")
+        for key, status, ratio in compare(results, baseline, DEFAULT_THRESHOLD):
+            if status != "new":
+                print(f"{key:<30} {ratio:>6.2f}x  {status}")
+                failed += status == "regression"
+    if not update:
+        save_results(results, os.path.join(out_dir, "timings.json"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import time
+from . import scenes
+from .common import measure
+from game.autoplay import AutoPlayer, load_systems
+
+# Macrobenchmarks: whole seeded playthroughs (rules only, AutoPlayer with the
+# survival policy) and rendered frames of each scene under the dummy video
+# driver (Game.draw, without the display flip).
+
+PLAY_SEEDS = 10
+FRAMES = 60
+SEASON = "spring"
+
+
+def run_playthroughs(results, quick=False):
+    player = AutoPlayer(*load_systems())
+    seeds = range(PLAY_SEEDS // 5 if quick else PLAY_SEEDS)
+    steps = 0
+    times = []
+    for seed in seeds:
+        start = time.perf_counter()
+        run = player.play(seed, season=SEASON)
+        times.append(time.perf_counter() - start)
+        steps += run.steps
+    total = sum(times)
+    results["results"]["macro/playthrough"] = {
+        "unit": "s",
+        "per_call": min(times),
+        "median": sorted(times)[len(times) // 2],
+        "mean": total / len(times),
+        "number": 1,
+        "repeat": len(times),
+        "steps_per_second": steps / total,
+        "runs_per_second": len(times) / total,
+    }
+    yield "macro/playthrough"
+
+
+def run_frames(game, results, quick=False, name_filter=None):
+    frames = FRAMES // 6 if quick else FRAMES
+    for name, _, _ in scenes.SCENES:
+        key = f"macro/frame/{name}"
+        if name_filter and name_filter not in key:
+            continue
+        if not scenes.enter(game, name):
+            print(f"Scene {name}: ended up in phase {game.game_phase}, skipped")
+            continue
+        game.draw() # Warm the emoji and text caches
+        results["results"][key] = measure(game.draw, None, frames, 3)
+        yield key
+
+
+def run(game, results, quick=False, name_filter=None):
+    if not name_filter or name_filter in "macro/playthrough":
+        yield from run_playthroughs(results, quick)
+    yield from run_frames(game, results, quick, name_filter)
@@ -0,0 +1,70 @@
+import random
+from . import scenes
+from .common import measure
+
+# Microbenchmarks of the per-turn hot paths. Every timed call starts from the
+# same explore-phase snapshot (restored untimed), so stateful calls like
+# hike and camp measure the same turn every time.
+
+NUMBER = 200
+REPEAT = 5
+EMOJI = "⛺"
+
+
+class Snapshot:
+    # Explore phase with the default loadout; restore() puts the game back
+    def __init__(self, game):
+        self.game = game
+        scenes.enter(game, "EXPLORE_cloudy")
+        self.data = game.state.to_dict()
+
+    def restore(self):
+        game = self.game
+        game.state.apply_dict(self.data)
+        game.game_phase = "EXPLORE"
+        game.current_event = None
+        game.sim.current_event = None
+        game.sim.log = None
+        game.sim.rng.seed(scenes.SEED)
+        game.warning_confirmed = False
+        game.ui.message_log.clear()
+
+
+def benchmarks(game):
+    # [(name, fn, reset)]
+    snap = Snapshot(game)
+    sim = game.sim
+    state = game.state
+    rng = random.Random(scenes.SEED)
+
+    def reseed():
+        rng.seed(scenes.SEED)
+
+    def drop_emoji():
+        game.ui.emoji_cache.pop((EMOJI, 48), None)
+
+    game.ui.get_emoji_surface(EMOJI, 24)
+    return [
+        ("EventSystem.check_event",
+         lambda: game.event_system.check_event(state, game.map_system, {'phase': 'hike'}, rng), reseed),
+        ("WeatherSystem.next_weather",
+         lambda: game.weather_system.next_weather(state.weather, state.season, rng), reseed),
+        ("Game.update_environment", game.update_environment, snap.restore),
+        ("Game.hike", game.hike, snap.restore),
+        ("Game.camp", game.camp, snap.restore),
+        ("ItemSystem.calculate_weight", lambda: game.item_system.calculate_weight(state.inventory), None),
+        ("UI.get_emoji_surface (cached)", lambda: game.ui.get_emoji_surface(EMOJI, 24), None),
+        ("UI.get_emoji_surface (cold)", lambda: game.ui.get_emoji_surface(EMOJI, 48), drop_emoji),
+    ]
+
+
+def run(game, results, quick=False, name_filter=None):
+    number = NUMBER // 10 if quick else NUMBER
+    repeat = 3 if quick else REPEAT
+    for name, fn, reset in benchmarks(game):
+        if name_filter and name_filter not in name:
+            continue
+        # Slow calls get fewer iterations
+        n = number // 10 if name.startswith("UI.get_emoji_surface (cold)") else number
+        results["results"][f"micro/{name}"] = measure(fn, reset, max(n, 1), repeat)
+        yield f"micro/{name}"
@@ -0,0 +1,93 @@
+import os
+import sys
+from . import scenes, micro, macro
+from .common import new_results, save_results, load_results, compare, format_time, DEFAULT_THRESHOLD
+
+# Benchmark suite for the simulation and rendering hot paths.
+# Usage: python -m benchmarks.run [--micro] [--macro] [--quick] [--filter TEXT]
+#                                 [--out FILE] [--baseline FILE] [--threshold 0.25] [--save-baseline]
+#
+#   --micro / --macro  run only that group (default: both)
+#   --quick            fewer iterations (smoke check, noisy numbers)
+#   --filter           only benchmarks whose name contains TEXT
+#   --out              results file (default benchmarks/last_results.json)
+#   --baseline         compare with this results file (default benchmarks/baseline.json)
+#   --threshold        slowdown that counts as a regression (0.25 = 25% slower)
+#   --save-baseline    also write the results as the new baseline
+#
+# Exits 1 if any benchmark regressed against the baseline. Timings are only
+# comparable on the same machine; regenerate the baseline after upgrading.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(HERE, "last_results.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m benchmarks.run [--micro] [--macro] [--quick] [--filter TEXT]"
+              " [--out FILE] [--baseline FILE] [--threshold 0.25] [--save-baseline]")
+        return 2
+    quick = "--quick" in args
+    name_filter = option(args, "--filter", None)
+    out = option(args, "--out", DEFAULT_OUT)
+    baseline_path = option(args, "--baseline", DEFAULT_BASELINE)
+    threshold = float(option(args, "--threshold", DEFAULT_THRESHOLD))
+    groups = [g for g in ("--micro", "--macro") if g in args] or ["--micro", "--macro"]
+
+    game = scenes.new_game()
+    results = new_results()
+    results["content"] = {
+        "items": len(game.item_system.items),
+        "events": len(game.event_system.events),
+        "map_nodes": len(game.map_system.node_list),
+    }
+
+    runs = []
+    if "--micro" in groups:
+        runs.append(micro.run(game, results, quick, name_filter))
+    if "--macro" in groups:
+        runs.append(macro.run(game, results, quick, name_filter))
+    for run in runs:
+        for name in run:
+            result = results["results"][name]
+            extra = ""
+            if "steps_per_second" in result:
+                extra = f"  ({result['steps_per_second']:.0f} steps/s)"
+            print(f"{name:<45} {format_time(result['per_call']):>10}{extra}")
+
+    save_results(results, out)
+    print(f"Results written to {out}")
+    if "--save-baseline" in args:
+        save_results(results, baseline_path)
+        print(f"Baseline written to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path} (run with --save-baseline to create one).")
+        return 0
+    baseline = load_results(baseline_path)
+    if baseline is None:
+        return 2
+
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (threshold {threshold:.0%}):")
+    for name, status, ratio in compare(results, baseline, threshold):
+        if status == "new":
+            print(f"{name:<45} {'new':>10}")
+            continue
+        print(f"{name:<45} {ratio:>9.2f}x  {status}")
+        regressions += status == "regression"
+    if regressions:
+        print(f"{regressions} regression(s).")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # No window; must be set before pygame starts
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import random
+import main
+from game.config import *
+from game.autoplay import DEFAULT_CART
+from game.simulation import WARN_HEALTH
+from game.storage import MemoryStorage
+from game import save
+
+# A headless Game that can be put into any phase, with fixed seeds, for
+# benchmarks and golden-frame checks. Saves go to memory, never to disk.
+
+SEED = 1234
+WEATHERS = ["sunny", "cloudy", "fog", "rain", "snow", "storm"]
+
+
+def new_game():
+    save.set_storage(MemoryStorage())
+    game = main.Game()
+    game.load_all()
+    return game
+
+
+def reset(game, seed=SEED):
+    # Same starting point for every scene: seeded RNGs (the visualizer draws
+    # from the global one), empty message log, fresh visualizer
+    random.seed(seed)
+    game.sim.rng = random.Random(seed)
+    game.sim.log = None
+    game.ui.message_log.clear()
+    game.ui._visualizer = None
+    game.warning_confirmed = False
+
+
+def menu(game):
+    game.game_phase = "MENU"
+    game.setup_menu()
+
+
+def setup(game):
+    game.start_setup_phase()
+
+
+def shop(game):
+    game.start_setup_phase()
+    game.confirm_setup()
+    game.sim.log = None
+    game.sim.rng = random.Random(SEED)
+
+
+def explore(game, weather=None):
+    shop(game)
+    game.cart = dict(DEFAULT_CART)
+    game.checkout()
+    if weather is not None:
+        game.state.weather = weather
+        game.update_environment()
+        game.setup_explore_ui()
+
+
+def event(game):
+    # The first event whose first choice has a result screen (not scavenge)
+    explore(game)
+    for ev in game.event_system.events:
+        game.sim.trigger_event(ev)
+        game.trigger_event(ev)
+        if game.event_system.get_choice_effect(ev, 0).special_action is None:
+            return ev
+    return None
+
+
+def event_result(game):
+    event(game)
+    game.handle_event_choice(0)
+
+
+def warning(game):
+    explore(game)
+    game.state.health = WARN_HEALTH - 10 # Below the hike warning threshold
+    game.hike()
+
+
+def game_over(game):
+    explore(game)
+    game.state.health = 0
+    game.state.check_game_over()
+    game.check_game_over_state()
+
+
+# (name, phase the game ends up in, setup function)
+SCENES = [
+    ("MENU", "MENU", menu),
+    ("SETUP", "SETUP", setup),
+    ("SHOP", "SHOP", shop),
+] + [
+    (f"EXPLORE_{w}", "EXPLORE", (lambda w: lambda game: explore(game, w))(w)) for w in WEATHERS
+] + [
+    ("EVENT", "EVENT", event),
+    ("EVENT_RESULT", "EVENT_RESULT", event_result),
+    ("WARNING", "WARNING", warning),
+    ("GAME_OVER", "GAME_OVER", game_over),
+]
+
+
+def enter(game, name):
+    # Puts the game into the named scene; returns False if it ended up elsewhere
+    for scene_name, phase, setup_scene in SCENES:
+        if scene_name == name:
+            reset(game)
+            setup_scene(game)
+            return game.game_phase == phase
+    raise KeyError(name)
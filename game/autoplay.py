@@ -0,0 +1,331 @@
+import random
+from .config import *
+from .state import GameState
+from .simulation import Simulation
+from .systems import ItemSystem, MapSystem, WeatherSystem, EventSystem
+from .replay import ActionLog
+
+# Headless player for benchmarks, bots and balancing tools.
+# A Playthrough is a Simulation plus the screen the UI would be showing, and
+# offers exactly the actions that screen's buttons offer, as logged action
+# tuples (see Simulation.apply). Runs are seeded, so the same seed, loadout
+# and policy always play the same game.
+
+MAX_STEPS = 3000 # Safety stop (e.g. a scavenge without action points never ends the event)
+
+# A sensible all-round loadout (5690 of the 10000 budget), including the
+# items event choices ask for
+DEFAULT_CART = {
+    "tent": 1,
+    "sleeping_bag": 1,
+    "down_jacket": 1,
+    "fleece_jacket": 1,
+    "backpack_medium": 1,
+    "stove": 1,
+    "pot": 1,
+    "gas": 1,
+    "water_bottle": 10,
+    "food_high_energy": 8,
+    "food_dried_noodles": 2,
+    "first_aid_kit": 1,
+    "medicine": 1,
+    "raincoat": 1,
+    "trekking_pole": 1,
+    "headlamp": 1,
+    "batteries": 1,
+    "duct_tape": 1,
+}
+
+# Policy thresholds (survival_policy)
+EAT_BELOW = 40
+DRINK_BELOW = 40
+HEAL_BELOW = 50
+CHEER_BELOW = 40
+TIRED_BELOW = 25
+WARM_UP_BELOW = 35.0
+CHOICE_SAMPLES = 4 # Lookahead samples per event choice
+
+
+def load_systems():
+    # (item, map, weather, event) systems, loaded once and shared by every run
+    item_system = ItemSystem()
+    return item_system, MapSystem(), WeatherSystem(), EventSystem(item_system)
+
+
+class Playthrough:
+    # Phases: EXPLORE, EVENT (choice pending), EVENT_RESULT, GAME_OVER, STUCK
+    def __init__(self, sim, phase="EXPLORE"):
+        self.sim = sim
+        self.state = sim.state
+        self.phase = phase
+        self.steps = 0
+        self.retreat_offered = False # Arrived at the 2800 camp (the UI asks)
+        self.no_effect = set() # Actions that changed nothing (an item that can't be used,
+                               # a scavenge without action points), until something else happens
+
+    def clone(self, rng=None):
+        # Independent copy for lookahead: own state, shared systems. The RNG
+        # is a copy of this run's unless one is given (tree search passes
+        # its own, which also skips copying the generator state).
+        sim = self.sim
+        other_sim = Simulation(sim.state.clone(), sim.item_system, sim.map_system,
+                               sim.weather_system, sim.event_system, rng=rng or random.Random())
+        if rng is None:
+            other_sim.rng.setstate(sim.rng.getstate())
+        other_sim.current_event = sim.current_event
+        other_sim._env_tables = sim._env_tables # Pure cache
+        other = Playthrough(other_sim, self.phase)
+        other.steps = self.steps
+        other.retreat_offered = self.retreat_offered
+        other.no_effect = set(self.no_effect)
+        return other
+
+    @property
+    def done(self):
+        return self.phase in ("GAME_OVER", "STUCK")
+
+    def legal_actions(self):
+        s = self.state
+        sim = self.sim
+        if self.phase == "EVENT":
+            actions = []
+            for idx, choice in enumerate(sim.current_event['choices']):
+                reqs = choice.get('requirements', {}).get('items', [])
+                if all(s.has_item(item_id) for item_id in reqs) and ("choose", idx) not in self.no_effect:
+                    actions.append(("choose", idx))
+            return actions
+        if self.phase == "EVENT_RESULT":
+            return [("close",)]
+        if self.phase != "EXPLORE":
+            return []
+
+        actions = []
+        connections = sim.map_system.get_connections(s.current_node_id)
+        if s.distance_to_next_node > 0:
+            if s.action_points > 0 and s.stamina > 10:
+                actions.append(("hike",))
+            if CHARACTERS[s.character_id]['buffs'].get('special_ability') == 'teleport' \
+                    and not s.teleport_used and connections:
+                actions.append(("teleport",))
+        elif connections:
+            actions.extend(("travel", node['node_id']) for node in connections)
+        else:
+            actions.append(("finish",))
+        if self.retreat_offered:
+            actions.append(("retreat",))
+
+        if s.action_points > 0:
+            actions.append(("rest",))
+        if s.has_item("tent"):
+            actions.append(("camp", 12))
+            morning = (6 - s.day_time) % 24 or 24
+            if morning != 12:
+                actions.append(("camp", morning))
+
+        if s.thirst <= 30:
+            node = sim.map_system.get_node(s.current_node_id)
+            if s.weather in ["snow", "storm"] or node.get('altitude', 0) > 3000:
+                actions.append(("snow",))
+
+        consumables = sim.item_system.consumables
+        for item_id in sorted(s.inventory):
+            if item_id in consumables:
+                cooked = True
+                if item_id == "food_dried_noodles":
+                    cooked = all(k in s.inventory for k in ("stove", "pot", "gas"))
+                if ("use", item_id, cooked) not in self.no_effect:
+                    actions.append(("use", item_id, cooked))
+        return actions
+
+    def step(self, action):
+        # Applies a legal action and moves to the screen the UI would show next
+        sim = self.sim
+        result = sim.apply(action)
+        self.steps += 1
+        name = action[0]
+        if name == "use" and not result:
+            self.no_effect.add(action)
+            return result
+        if name == "choose" and result['scavenge'] is not None and not result['scavenge']['ok']:
+            # No action points: the event stays open (see Game.show_scavenge_result)
+            self.no_effect.add(action)
+            return result
+        self.no_effect.clear()
+        self.retreat_offered = False
+
+        if name == "choose":
+            if result['scavenge'] is None:
+                self.phase = "EVENT_RESULT"
+            else:
+                self.phase = "GAME_OVER" if self.state.game_over else "EXPLORE"
+        elif name in ("finish", "retreat"):
+            self.phase = "GAME_OVER"
+        elif sim.current_event is not None:
+            self.phase = "EVENT"
+        elif self.state.game_over:
+            self.phase = "GAME_OVER"
+        else:
+            self.phase = "EXPLORE"
+            if name in ("travel", "teleport") and result is not None and "2800" in result['name']:
+                self.retreat_offered = True
+        return result
+
+    def km(self):
+        # Distance covered along the route
+        s = self.state
+        map_system = self.sim.map_system
+        node = map_system.get_node(s.current_node_id)
+        leg = node.get('distance_to_next', 0) - s.distance_to_next_node
+        return map_system.km_from_start.get(s.current_node_id, 0) + max(0, leg)
+
+    def outcome(self):
+        s = self.state
+        return {
+            'won': s.game_won,
+            'phase': self.phase,
+            'message': s.status_message,
+            'days': s.game_time,
+            'hour': s.day_time,
+            'node': s.current_node_id,
+            'km': self.km(),
+            'steps': self.steps,
+            'lowest_temp': s.lowest_temp,
+            'lowest_sanity': s.lowest_sanity,
+        }
+
+
+# --- Policies ---
+# policy(playthrough) -> action (one of legal_actions()), or None if stuck
+
+def _best_item(run, actions, stat):
+    # The "use" action whose item restores the most of stat
+    best = None
+    best_value = 0
+    for action in actions:
+        if action[0] != "use":
+            continue
+        value = run.sim.item_system.get_item(action[1])['effects'].get(stat, 0)
+        if isinstance(value, (int, float)) and value > best_value:
+            best, best_value = action, value
+    return best
+
+
+def condition_score(state):
+    # How well off the hiker is; death outweighs everything
+    if state.game_over and not state.game_won:
+        return -1000
+    return (state.health + state.sanity + 0.2 * state.stamina + 0.3 * state.hunger
+            + 0.3 * state.thirst + 20 * (state.temperature - 32))
+
+
+def best_choice(run, actions):
+    # Tries each event choice on clones with their own fixed seeds (the run's
+    # RNG is never touched, so the game stays replayable) and keeps the best
+    best = None
+    best_score = None
+    for action in actions:
+        score = 0
+        for k in range(CHOICE_SAMPLES):
+            trial = run.clone()
+            trial.sim.rng.seed(k)
+            trial.step(action)
+            score += condition_score(trial.state)
+        if best_score is None or score > best_score:
+            best, best_score = action, score
+    return best
+
+
+def survival_policy(run):
+    # Plays like a careful player: eat and drink before it hurts, camp when
+    # tired, otherwise keep walking. Event choices by a short lookahead.
+    actions = run.legal_actions()
+    if not actions:
+        return None
+    if run.phase == "EVENT":
+        return best_choice(run, actions)
+    if run.phase != "EXPLORE":
+        return actions[0]
+
+    s = run.state
+    if s.thirst < DRINK_BELOW:
+        action = _best_item(run, actions, 'thirst')
+        if action is None and ("snow",) in actions:
+            action = ("snow",)
+        if action:
+            return action
+    needs = (('hunger', 'hunger', EAT_BELOW), ('health', 'health', HEAL_BELOW),
+             ('temperature', 'temp', WARM_UP_BELOW), ('sanity', 'sanity', CHEER_BELOW))
+    for stat, effect, below in needs:
+        if getattr(s, stat) < below:
+            action = _best_item(run, actions, effect)
+            if action:
+                return action
+
+    for action in actions:
+        if action[0] in ("travel", "finish"):
+            return action
+
+    camps = [a for a in actions if a[0] == "camp"]
+    tired = s.stamina <= TIRED_BELOW or s.temperature < WARM_UP_BELOW or run.sim.hike_warnings()
+    if ("hike",) in actions and not tired:
+        return ("hike",)
+    # An hour's rest restores more stamina per hour than a night in the tent;
+    # camp once the day's action points are spent
+    if ("rest",) in actions and s.hunger > 30:
+        return ("rest",)
+    if camps:
+        # Until morning if that is at most 12h away, else 12h
+        return min(camps, key=lambda a: a[1])
+    if ("rest",) in actions:
+        return ("rest",)
+    if ("hike",) in actions:
+        return ("hike",)
+    return actions[0]
+
+
+def random_policy(rng):
+    # Uniformly random legal actions (rollouts, fuzzing)
+    def policy(run):
+        actions = run.legal_actions()
+        return rng.choice(actions) if actions else None
+    return policy
+
+
+class AutoPlayer:
+    # Systems are loaded once and shared by every run (like Replayer)
+    def __init__(self, item_system, map_system, weather_system, event_system):
+        self.item_system = item_system
+        self.map_system = map_system
+        self.weather_system = weather_system
+        self.event_system = event_system
+
+    def new_run(self, seed, character_id="xiaomou", season="spring", cart=None, record=False):
+        # Set up and checked out, ready for the first action.
+        # record=True keeps an ActionLog (sim.log) for tools/replay.py.
+        state = GameState()
+        sim = Simulation(state, self.item_system, self.map_system, self.weather_system,
+                         self.event_system, rng=random.Random(seed))
+        if record:
+            sim.log = ActionLog(seed, character_id, season)
+        sim.start(character_id, season)
+        if not sim.checkout(DEFAULT_CART if cart is None else cart):
+            raise ValueError("Loadout is over budget")
+        return Playthrough(sim)
+
+    def play(self, seed, character_id="xiaomou", season="spring", cart=None, policy=survival_policy,
+             max_steps=MAX_STEPS, record=False, observe=None):
+        run = self.new_run(seed, character_id, season, cart, record)
+        return self.finish(run, policy, max_steps, observe)
+
+    def finish(self, run, policy=survival_policy, max_steps=MAX_STEPS, observe=None):
+        # Plays an existing run to the end (or max_steps actions in total).
+        # observe(run) is called after every action (trajectories, statistics).
+        while not run.done and run.steps < max_steps:
+            action = policy(run)
+            if action is None:
+                run.phase = "STUCK"
+                break
+            run.step(action)
+            if observe is not None:
+                observe(run)
+        return run
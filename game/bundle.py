@@ -0,0 +1,274 @@
+import sys
+import json
+
+# Compiled data bundle.
+# `python -m tools.build_bundle` validates data/*.json against SCHEMAS and
+# writes everything, plus the derived indexes below, to one file that the
+# game loads with a single read. Without a bundle (or when a JSON file is
+# newer than it, i.e. while editing data) the game reads the JSON files and
+# builds the same indexes itself, so dev workflow is unchanged.
+# The bundle is JSON (no code runs when loading it); every decode gives new
+# dicts, so each system owns its records and may modify them.
+
+BUNDLE_NAME = "data.bundle"
+BUNDLE_MAGIC = b"AOTB"
+BUNDLE_VERSION = 2
+
+SOURCES = {
+    "items": "items.json",
+    "events": "events.json",
+    "map_nodes": "map_nodes.json",
+}
+
+NUMBER = (int, float)
+
+# Field -> (type, required) per record type
+SCHEMAS = {
+    "items": {
+        "id": (str, True),
+        "name": (str, True),
+        "type": (str, True),
+        "price": (NUMBER, True),
+        "weight": (NUMBER, True),
+        "effects": (dict, True),
+        "icon": (str, False),
+        "description": (str, False),
+    },
+    "events": {
+        "event_id": (str, True),
+        "name": (str, True),
+        "description": (str, True),
+        "choices": (list, True),
+        "trigger_conditions": (dict, False),
+        "unique": (bool, False),
+    },
+    "map_nodes": {
+        "node_id": (str, True),
+        "name": (str, True),
+        "altitude": (NUMBER, True),
+        "terrain": (str, True),
+        "connections": (list, True),
+        "distance_to_next": (NUMBER, False),
+        "description": (str, False),
+        "type": (str, False),
+        "resources": (dict, False),
+    },
+}
+
+CHOICE_SCHEMA = {
+    "text": (str, True),
+    "effects": (dict, True),
+    "requirements": (dict, False),
+}
+
+TRIGGER_SCHEMA = {
+    "chance": (NUMBER, False),
+    "terrain": (str, False),
+    "weather": ((str, list), False),
+    "time": (str, False),
+    "time_range": (list, False),
+    "altitude_min": (NUMBER, False),
+    "sanity_max": (NUMBER, False),
+    "phase": (str, False),
+}
+
+
+# --- Validation ---
+
+def check_record(record, schema, where, errors):
+    if not isinstance(record, dict):
+        errors.append(f"{where}: not an object")
+        return False
+    for field, (kind, required) in schema.items():
+        if field not in record:
+            if required:
+                errors.append(f"{where}: missing '{field}'")
+        elif not isinstance(record[field], kind) or isinstance(record[field], bool) and kind is NUMBER:
+            errors.append(f"{where}: '{field}' has type {type(record[field]).__name__}")
+    return True
+
+
+def check_effects(effects, items, where, warnings):
+    if 'remove_item' in effects and effects['remove_item'] not in items:
+        warnings.append(f"{where}: remove_item '{effects['remove_item']}' is not an item")
+    for j, outcome in enumerate(effects.get('random_outcome', [])):
+        check_effects(outcome.get('effects', {}), items, f"{where} outcome {j}", warnings)
+
+
+def validate(data):
+    # Returns (errors, warnings). Errors stop the build; warnings are data
+    # quirks the game tolerates (duplicate event ids, references to items
+    # that don't exist: such choices are never available / removals skipped).
+    errors = []
+    warnings = []
+    for name, schema in SCHEMAS.items():
+        records = data.get(name)
+        if not isinstance(records, list):
+            errors.append(f"{SOURCES[name]}: top level is not a list")
+            data[name] = []
+            continue
+        for i, record in enumerate(records):
+            check_record(record, schema, f"{SOURCES[name]}[{i}]", errors)
+    if errors:
+        return errors, warnings # Cross-references need well-formed records
+
+    items = set()
+    for item in data["items"]:
+        if item['id'] in items:
+            errors.append(f"items.json: duplicate id '{item['id']}'")
+        items.add(item['id'])
+
+    nodes = {}
+    for node in data["map_nodes"]:
+        if node['node_id'] in nodes:
+            errors.append(f"map_nodes.json: duplicate node_id '{node['node_id']}'")
+        nodes[node['node_id']] = node
+    for node in data["map_nodes"]:
+        for conn in node['connections']:
+            if conn not in nodes:
+                errors.append(f"map_nodes.json: '{node['node_id']}' connects to unknown node '{conn}'")
+    if "start" not in nodes:
+        errors.append("map_nodes.json: no 'start' node")
+
+    seen = set()
+    for i, event in enumerate(data["events"]):
+        where = f"events.json[{i}] ({event['event_id']})"
+        if event['event_id'] in seen:
+            warnings.append(f"{where}: duplicate event_id")
+        seen.add(event['event_id'])
+        check_record(event.get('trigger_conditions', {}), TRIGGER_SCHEMA, f"{where} trigger_conditions", errors)
+        for j, choice in enumerate(event['choices']):
+            if not check_record(choice, CHOICE_SCHEMA, f"{where} choice {j}", errors):
+                continue
+            for item_id in choice.get('requirements', {}).get('items', []):
+                if item_id not in items:
+                    warnings.append(f"{where} choice {j}: requires unknown item '{item_id}'")
+            if isinstance(choice.get('effects'), dict):
+                check_effects(choice['effects'], items, f"{where} choice {j}", warnings)
+    return errors, warnings
+
+
+# --- Interning ---
+
+def intern_ids(name, records):
+    # IDs are compared and hashed on every lookup; interned strings make
+    # those identity checks. Done after every load (JSON doesn't keep it).
+    intern = sys.intern
+    if name == "items":
+        for item in records:
+            item['id'] = intern(item['id'])
+    elif name == "map_nodes":
+        for node in records:
+            node['node_id'] = intern(node['node_id'])
+            node['terrain'] = intern(node['terrain'])
+            node['connections'] = [intern(c) for c in node['connections']]
+    elif name == "events":
+        for event in records:
+            event['event_id'] = intern(event['event_id'])
+    return records
+
+
+# --- Derived indexes ---
+
+def event_trigger_buckets(events):
+    # phase -> positions in events of those that can trigger in that phase,
+    # in file order (the order matters: it is the order check_event rolls
+    # their chances in). Key None holds the events without a phase condition.
+    phases = {e.get('trigger_conditions', {}).get('phase') for e in events}
+    buckets = {}
+    for phase in phases | {None}:
+        buckets[phase] = [
+            i for i, e in enumerate(events)
+            if 'phase' not in e.get('trigger_conditions', {}) or e['trigger_conditions']['phase'] == phase
+        ]
+    return buckets
+
+
+def bucket_events(buckets, events):
+    # event_trigger_buckets positions -> the event dicts themselves
+    return {phase: [events[i] for i in positions] for phase, positions in buckets.items()}
+
+
+def item_aggregates(items):
+    # Per-item numbers the rules look up every turn
+    weights = {}
+    temp_protection = {}
+    spoil_chances = {}
+    consumables = set()
+    for item_id, item in items.items():
+        effects = item.get('effects', {})
+        weights[item_id] = item['weight']
+        if 'temp_protection' in effects:
+            temp_protection[item_id] = effects['temp_protection']
+        if 'spoil_chance' in effects:
+            spoil_chances[item_id] = effects['spoil_chance']
+        if any(k in effects for k in ['hunger', 'thirst', 'heal', 'sanity', 'stamina']):
+            consumables.add(item_id)
+    return {
+        "weights": weights,
+        "temp_protection": temp_protection,
+        "spoil_chances": spoil_chances,
+        "consumables": consumables,
+    }
+
+
+def route_index(node_list):
+    # Position of each node along the route and its distance from the start
+    node_index = {}
+    km_from_start = {}
+    km = 0
+    for i, node in enumerate(node_list):
+        node_index[node['node_id']] = i
+        km_from_start[node['node_id']] = km
+        km += node.get('distance_to_next', 0)
+    return {"node_index": node_index, "km_from_start": km_from_start, "total_km": km}
+
+
+def build_indexes(data):
+    items = {item['id']: item for item in data["items"]}
+    return {
+        "event_buckets": event_trigger_buckets(data["events"]),
+        "item_aggregates": item_aggregates(items),
+        "route": route_index(data["map_nodes"]),
+    }
+
+
+# --- Bundle file ---
+
+def encode_bundle(data):
+    payload = dict(data)
+    indexes = build_indexes(data)
+    # JSON has no None keys nor sets
+    indexes["event_buckets"] = {"" if phase is None else phase: positions
+                                for phase, positions in indexes["event_buckets"].items()}
+    indexes["item_aggregates"]["consumables"] = sorted(indexes["item_aggregates"]["consumables"])
+    payload["indexes"] = indexes
+    text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return BUNDLE_MAGIC + bytes([BUNDLE_VERSION]) + text.encode("utf-8")
+
+
+def decode_bundle(raw):
+    if raw[:4] != BUNDLE_MAGIC:
+        raise ValueError("Not a data bundle")
+    if raw[4] != BUNDLE_VERSION:
+        raise ValueError(f"Data bundle version {raw[4]}, expected {BUNDLE_VERSION}")
+    bundle = json.loads(raw[5:].decode("utf-8"))
+    for name in SOURCES:
+        intern_ids(name, bundle[name])
+    indexes = bundle["indexes"]
+    indexes["event_buckets"] = {phase or None: positions for phase, positions in indexes["event_buckets"].items()}
+    indexes["item_aggregates"]["consumables"] = set(indexes["item_aggregates"]["consumables"])
+    return bundle
+
+
+def bundle_is_stale(loader, data_dir):
+    # A JSON file newer than the bundle means someone is editing data.
+    # Packed / archived resources have no times and are never stale.
+    bundle_time = loader.mtime(f"{data_dir}/{BUNDLE_NAME}")
+    if bundle_time is None:
+        return False
+    for filename in SOURCES.values():
+        source_time = loader.mtime(f"{data_dir}/{filename}")
+        if source_time is not None and source_time > bundle_time:
+            return True
+    return False
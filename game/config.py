@@ -1,5 +1,3 @@
-import pygame
-
 # Screen settings
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 768
@@ -0,0 +1,218 @@
+import random
+
+# Compiled effect engine.
+# Effect dicts from events.json (choice effects) and items.json (consumable
+# effects) are compiled once at load time into a flat list of (opcode, arg, value)
+# tuples. Applying an effect just walks that list; the icon/text summary shown on
+# the event result screen is only built when the UI asks for it.
+
+OP_ADD = 0            # arg = GameState attribute, value = delta
+OP_REMOVE_ITEM = 1    # arg = item_id, value = item name (for the summary)
+OP_WEATHER = 2        # arg = new weather
+OP_STATUS = 3         # arg = status to add
+OP_CURE = 4           # arg = status to remove
+OP_NOTE = 5           # arg = summary key, no state change
+
+# Event effect keys, in the order the result screen lists them
+EVENT_STAT_KEYS = [
+    ("stamina", "stamina"),
+    ("sanity", "sanity"),
+    ("health", "health"),
+    ("thirst", "thirst"),
+    ("hunger", "hunger"),
+    ("karma", "karma"),
+    ("temp", "temperature"),
+]
+
+# Consumable effect keys (items use "heal" for health)
+ITEM_STAT_KEYS = [
+    ("hunger", "hunger"),
+    ("thirst", "thirst"),
+    ("stamina", "stamina"),
+    ("sanity", "sanity"),
+    ("heal", "health"),
+]
+
+STAT_LABELS = {
+    "stamina": ('⚡', "体力"),
+    "sanity": ('🧠', "SAN值"),
+    "health": ('❤️', "健康"),
+    "thirst": ('💧', "水分"),
+    "hunger": ('🍗', "饱腹感"),
+    "karma": ('🌟', "人品"),
+    "temperature": ('🌡️', "体温"),
+    "action_points": ('👣', "行动点"),
+}
+
+STATUS_NAMES = {"sick": "疾病", "lost": "迷路", "injured": "受伤"}
+
+
+class EffectResult:
+    def __init__(self, effect, applied):
+        self.effect = effect
+        self.applied = applied # List of ops that actually changed something
+        self.weather_changed = False
+        self.used = False
+        self._changes = None
+
+    @property
+    def message(self):
+        return self.effect.message
+
+    @property
+    def special_action(self):
+        return self.effect.special_action
+
+    @property
+    def changes(self):
+        # Built lazily, headless runs never touch this
+        if self._changes is None:
+            self._changes = [describe_op(op) for op in self.applied]
+        return self._changes
+
+
+def describe_op(op):
+    code, arg, value = op
+    if code == OP_ADD:
+        icon, label = STAT_LABELS.get(arg, ('', arg))
+        return {'icon': icon, 'text': f"{label} {'+' if value>0 else ''}{value}"}
+    if code == OP_REMOVE_ITEM:
+        return {'icon': '🗑️', 'text': f"失去物品: {value}"}
+    if code == OP_WEATHER:
+        return {'icon': '☁️', 'text': f"天气变为: {arg}"}
+    if code == OP_STATUS:
+        return {'icon': '🤢', 'text': f"获得状态: {STATUS_NAMES.get(arg, arg)}"}
+    if code == OP_CURE:
+        return {'icon': '💊', 'text': f"状态解除: {STATUS_NAMES.get(arg, arg)}"}
+    if code == OP_NOTE and arg == 'stamina_cost_multiplier':
+        return {'icon': '⚠️', 'text': "体力消耗增加"}
+    return {'icon': '', 'text': str(arg)}
+
+
+class CompiledEffect:
+    __slots__ = ("ops", "message", "special_action", "outcomes", "clamp", "always_used")
+
+    def __init__(self, ops, message=None, special_action=None, outcomes=None, clamp=False, always_used=False):
+        self.ops = ops
+        self.message = message
+        self.special_action = special_action
+        self.outcomes = outcomes # [(cumulative_chance, CompiledEffect)] or None
+        self.clamp = clamp
+        self.always_used = always_used
+
+    def resolve(self, rng=random):
+        # Pick the random_outcome branch (if any). Falls back to the base effect
+        # when the chances don't cover the roll, same as the old if-chain.
+        if self.outcomes:
+            roll = rng.random()
+            for threshold, outcome in self.outcomes:
+                if roll <= threshold:
+                    return outcome
+        return self
+
+    def apply(self, state):
+        # Applies this effect's own ops; call resolve() first for random_outcome
+        applied = []
+        weather_changed = False
+        used = self.always_used
+
+        for op in self.ops:
+            code, arg, value = op
+            if code == OP_ADD:
+                setattr(state, arg, getattr(state, arg) + value)
+                applied.append(op)
+                used = True
+            elif code == OP_REMOVE_ITEM:
+                state.remove_item(arg)
+                applied.append(op)
+            elif code == OP_WEATHER:
+                state.weather = arg
+                weather_changed = True
+                applied.append(op)
+            elif code == OP_STATUS:
+                if arg not in state.statuses:
+                    state.statuses.append(arg)
+                    applied.append(op)
+            elif code == OP_CURE:
+                if arg in state.statuses:
+                    state.statuses.remove(arg)
+                    applied.append(op)
+                    used = True
+            else:
+                applied.append(op)
+
+        if self.clamp:
+            state.clamp_stats()
+
+        result = EffectResult(self, applied)
+        result.weather_changed = weather_changed
+        result.used = used
+        return result
+
+    def apply_batch(self, states, rng=random):
+        # Each state rolls its own random_outcome branch
+        return [self.resolve(rng).apply(state) for state in states]
+
+    def stat_deltas(self):
+        deltas = {}
+        for code, arg, value in self.ops:
+            if code == OP_ADD:
+                deltas[arg] = deltas.get(arg, 0) + value
+        return deltas
+
+
+def compile_event_effect(effects, item_system=None):
+    ops = []
+    for key, attr in EVENT_STAT_KEYS:
+        if key in effects:
+            ops.append((OP_ADD, attr, effects[key]))
+
+    if 'remove_item' in effects:
+        item_id = effects['remove_item']
+        item = item_system.get_item(item_id) if item_system else None
+        # Unknown items are dropped at compile time (the old chain skipped them too)
+        if item or item_system is None:
+            ops.append((OP_REMOVE_ITEM, item_id, item['name'] if item else item_id))
+
+    if 'change_weather' in effects:
+        ops.append((OP_WEATHER, effects['change_weather'], None))
+
+    if 'action_points' in effects:
+        ops.append((OP_ADD, 'action_points', effects['action_points']))
+
+    if 'stamina_cost_multiplier' in effects:
+        ops.append((OP_NOTE, 'stamina_cost_multiplier', effects['stamina_cost_multiplier']))
+
+    if 'status' in effects:
+        ops.append((OP_STATUS, effects['status'], None))
+
+    outcomes = None
+    if 'random_outcome' in effects:
+        outcomes = []
+        acc = 0
+        for outcome in effects['random_outcome']:
+            acc += outcome['chance']
+            outcomes.append((acc, compile_event_effect(outcome.get('effects', {}), item_system)))
+
+    return CompiledEffect(
+        tuple(ops),
+        message=effects.get('message', "发生了什么？"),
+        special_action=effects.get('special_action'),
+        outcomes=outcomes,
+    )
+
+
+def compile_item_effect(item):
+    effects = item.get('effects', {})
+    ops = []
+    for key, attr in ITEM_STAT_KEYS:
+        if key in effects:
+            ops.append((OP_ADD, attr, effects[key]))
+
+    if 'status_cure' in effects:
+        ops.append((OP_CURE, effects['status_cure'], None))
+
+    # Medicine (bandages etc.) counts as used even if nothing changed
+    always_used = item.get('type') == 'consumable' and ('heal' in effects or 'status_cure' in effects)
+
+    return CompiledEffect(tuple(ops), message=None, clamp=True, always_used=always_used)
@@ -0,0 +1,114 @@
+import random
+from .simulation import Simulation
+from .autoplay import Playthrough, survival_policy
+
+# Risk forecast: what the next hours look like after each thing the player
+# can do now (hike, rest, camp). Every sample is a future played with the
+# real rules on a copy of the game: the action, then careful play (the
+# survival policy) until the horizon, with its own RNG so the game's draws
+# are never touched. Sample k of every action uses the same seed (common
+# random numbers), so the actions are compared on the same weather and
+# events. Samples are independent, so steps() can be spread over frames and
+# the numbers read at any time.
+
+HORIZON = 12 # Hours ahead
+SAMPLES = 200 # Futures per action
+MAX_STEPS = 200 # Per future (the survival policy can get stuck, see autoplay.MAX_STEPS)
+STATS = ("health", "stamina", "sanity", "temperature", "hunger", "thirst")
+
+
+def candidate_actions(run):
+    # Hike, rest and camp (12h, like the camp button) as far as the
+    # screen offers them
+    actions = run.legal_actions()
+    return [a for a in actions if a in (("hike",), ("rest",), ("camp", 12))]
+
+
+def playthrough(sim):
+    # The live game as a Playthrough (exploring, no event open), on a copy
+    state = sim.state.clone()
+    other = Simulation(state, sim.item_system, sim.map_system, sim.weather_system, sim.event_system,
+                       rng=random.Random())
+    other._env_tables = sim._env_tables # Pure cache
+    return Playthrough(other)
+
+
+def signature(state):
+    # Changes whenever anything the forecast depends on does
+    return tuple(getattr(state, name) for name in STATS) + (
+        state.game_time, state.day_time, state.current_node_id, state.distance_to_next_node,
+        state.weather, state.action_points, tuple(sorted(state.inventory.items())))
+
+
+def hours(state):
+    return state.game_time * 24 + state.day_time
+
+
+class Forecast:
+    def __init__(self, run, actions=None, samples=SAMPLES, horizon=HORIZON, seed=0):
+        self.run = run
+        self.actions = candidate_actions(run) if actions is None else actions
+        self.samples = samples
+        self.horizon = horizon
+        self.seed = seed
+        self.start = hours(run.state)
+        self.signature = signature(run.state)
+        self.done = 0 # Samples finished (per action)
+        self.deaths = {a: 0 for a in self.actions}
+        self.death_hours = {a: [] for a in self.actions}
+        # action -> hour (1..horizon) -> stat -> values, one per living sample
+        self.stats = {a: [{stat: [] for stat in STATS} for _ in range(horizon + 1)] for a in self.actions}
+
+    def sample(self, action, seed):
+        rng = random.Random(seed)
+        trial = self.run.clone(rng)
+        trial.step(action)
+        recorded = 0
+        while True:
+            elapsed = hours(trial.state) - self.start
+            if trial.state.game_over and not trial.state.game_won:
+                # A camp can end past the horizon: a death then is not within it
+                if elapsed <= self.horizon:
+                    self.deaths[action] += 1
+                    self.death_hours[action].append(max(elapsed, 0))
+                return
+            elapsed = min(elapsed, self.horizon)
+            for hour in range(recorded + 1, elapsed + 1):
+                # A camp skips hours: they get the stats it woke up with
+                for stat in STATS:
+                    self.stats[action][hour][stat].append(getattr(trial.state, stat))
+            recorded = max(recorded, elapsed)
+            if elapsed >= self.horizon or trial.done or trial.steps >= MAX_STEPS:
+                return
+            next_action = survival_policy(trial)
+            if next_action is None:
+                return
+            trial.step(next_action)
+
+    def steps(self):
+        # One sample of every action per step
+        while self.done < self.samples:
+            seed = self.seed + self.done
+            for action in self.actions:
+                self.sample(action, seed)
+            self.done += 1
+            yield self.done
+
+    def finish(self):
+        for _ in self.steps():
+            pass
+        return self
+
+    @property
+    def complete(self):
+        return self.done >= self.samples
+
+    def death_probability(self, action):
+        return self.deaths[action] / self.done if self.done else None
+
+    def quantiles(self, action, hour, stat, qs=(0.1, 0.5, 0.9)):
+        # Stat percentiles at an hour among the samples still alive (None if none)
+        values = sorted(self.stats[action][hour][stat])
+        if not values:
+            return None
+        return [values[min(len(values) - 1, int(q * len(values)))] for q in qs]
@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import time
+from .systems import DataLoader
+from . import bundle as data_bundle
+from . import resources
+
+# Dev-mode hot reload of data/*.json (python main.py --dev, or AOTAI_DEV=1).
+# The watcher polls the files' modification times; when one changes it is
+# re-read, validated together with the other two (as currently loaded) and
+# against the running game, and only then swapped into the systems. Each
+# system updates just what the change touches (see the reload methods in
+# game/systems.py). The GameState is never replaced.
+#
+# Packed or archived resources have no modification times and aren't watched.
+
+DEV_FLAG = "--dev"
+DEV_ENV = "AOTAI_DEV"
+POLL_INTERVAL = 0.5 # Seconds between modification time checks
+
+
+def dev_mode():
+    return DEV_FLAG in sys.argv or os.environ.get(DEV_ENV) == "1"
+
+
+def effect_items(effects):
+    # Item ids an event effect removes (including random outcomes)
+    found = set()
+    if 'remove_item' in effects:
+        found.add(effects['remove_item'])
+    for outcome in effects.get('random_outcome', []):
+        found |= effect_items(outcome.get('effects', {}))
+    return found
+
+
+class DataWatcher:
+    def __init__(self, sim, loader=None):
+        self.sim = sim
+        self.loader = loader or resources.loader
+        self.mtimes = {name: self.loader.mtime(self._path(name)) for name in data_bundle.SOURCES}
+        self.last_poll = 0
+        self.warnings = set() # Already reported (known data quirks repeat every reload)
+        if not any(self.mtimes.values()):
+            print("Hot reload: data files are packed, nothing to watch.")
+
+    def _path(self, name):
+        return f"{DataLoader.DATA_DIR}/{data_bundle.SOURCES[name]}"
+
+    def poll(self, now=None):
+        # Called every frame; returns messages for the files it reloaded
+        now = time.monotonic() if now is None else now
+        if now - self.last_poll < POLL_INTERVAL:
+            return []
+        self.last_poll = now
+        messages = []
+        for name, old_mtime in self.mtimes.items():
+            if old_mtime is None:
+                continue
+            mtime = self.loader.mtime(self._path(name))
+            if mtime is not None and mtime != old_mtime:
+                self.mtimes[name] = mtime
+                messages.append(self.reload(name))
+        return messages
+
+    def current_data(self):
+        return {
+            "items": list(self.sim.item_system.items.values()),
+            "events": list(self.sim.event_system.events),
+            "map_nodes": list(self.sim.map_system.node_list),
+        }
+
+    def check_state(self, data):
+        # The running game must still make sense with the new data
+        errors = []
+        state = self.sim.state
+        nodes = {node['node_id'] for node in data["map_nodes"]}
+        if state.current_node_id not in nodes:
+            errors.append(f"current node '{state.current_node_id}' was removed")
+        items = {item['id'] for item in data["items"]}
+        for item_id in state.inventory:
+            if item_id not in items:
+                errors.append(f"inventory item '{item_id}' was removed")
+        return errors
+
+    def reload(self, name):
+        filename = data_bundle.SOURCES[name]
+        path = self._path(name)
+        self.loader.invalidate(path)
+        try:
+            records = json.loads(self.loader.read_text(path) or "")
+        except ValueError as e:
+            print(f"Hot reload: {filename} is not valid JSON: {e}")
+            return f"{filename} 格式错误，未重新加载。"
+
+        data = self.current_data()
+        data[name] = records
+        errors, warnings = data_bundle.validate(data)
+        if not errors:
+            errors = self.check_state(data)
+        for warning in warnings:
+            if warning not in self.warnings:
+                print(f"Hot reload warning: {warning}")
+        self.warnings = set(warnings)
+        if errors:
+            for error in errors:
+                print(f"Hot reload error: {error}")
+            return f"{filename} 校验失败（{len(errors)} 个错误），未重新加载。"
+
+        data_bundle.intern_ids(name, records)
+        start = time.perf_counter()
+        sim = self.sim
+        if name == "items":
+            changed = sim.item_system.reload(records)
+            # Events that remove a changed item compiled against the old one
+            stale = {id(e) for e in sim.event_system.events
+                     if any(effect_items(c.get('effects', {})) & changed for c in e['choices'])}
+            if stale:
+                sim.event_system.reload(sim.event_system.events, sim.item_system, stale, sim.current_event)
+            summary = f"{len(changed)} items changed, {len(stale)} events recompiled"
+        elif name == "map_nodes":
+            changed = sim.map_system.reload(records)
+            summary = f"{len(changed)} nodes changed"
+        else:
+            compiled = sim.event_system.reload(records, sim.item_system, pending=sim.current_event)
+            summary = f"{compiled} events recompiled"
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Hot reload: {filename}: {summary} ({elapsed:.1f}ms).")
+        return f"已重新加载 {filename}。"
@@ -0,0 +1,370 @@
+import os
+import json
+import math
+import hashlib
+try:
+    import numpy as np
+except ImportError:
+    np = None # The optimizer needs numpy; the game hides the result without it
+from .config import *
+from .autoplay import DEFAULT_CART, survival_policy
+from .scoring import reward
+from . import resources
+
+# Shop loadout optimizer.
+# 1. Knapsack: every item gets a rough worth per unit from its effects (what
+#    the rules actually read: consumable stats, warmth, camping, items event
+#    choices ask for), capped at what the trip needs. A bounded knapsack over
+#    price (binary split counts, one numpy pass per piece) picks the best
+#    cart for each backpack and for a range of penalties per kg, which
+#    trades worth for weight (hikes slow down above MAX_WEIGHT_BASE).
+# 2. Simulation: each candidate plays the same seeded games with the
+#    survival policy (common random numbers, so differences are the cart's),
+#    scored like the tree search (1 for a finished trip, else progress, cut
+#    if the hiker died). Then a few rounds of +1/-1 item moves on the best.
+# Results are cached per character, season and item catalog.
+
+OPTIMIZER_VERSION = 1
+SEEDS = 16 # Games per candidate (seeds 0..SEEDS-1 for every candidate)
+ROUNDS = 2 # Local search rounds after the knapsack candidates
+PENALTIES = (0, 10, 25, 50, 100, 200) # Knapsack worth per kg traded away
+NEIGHBORS = 24 # Items tried as +1 per round (best worth per price first)
+CACHE_DIR = "cache/loadout"
+
+# Knapsack worth per point of a consumable stat, and the trip's need
+# (further units are worth nothing, see surplus())
+STAT_VALUES = {"hunger": 1.0, "thirst": 1.2, "stamina": 0.3, "sanity": 1.0, "heal": 1.0}
+NEEDS = {"hunger": 500, "thirst": 600, "stamina": 150, "sanity": 250, "heal": 80}
+WARMTH_VALUE = 40 # Per temp_protection point, at COMFORT_TEMP - 10 season base
+COMFORT_TEMP = 25
+CAMP_VALUE = 600 # Camping needs a tent (autoplay and the UI)
+EVENT_ITEM_VALUE = 20 # Per event choice that asks for the item
+UNCOOKED = 0.5 # Food that needs cooking, eaten as it is
+
+
+def catalog_hash(item_system):
+    blob = json.dumps(list(item_system.items.values()), sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def cart_totals(item_system, cart):
+    # (price, weight, weight limit) as the shop counts them
+    price = sum(item_system.get_item(i)['price'] * n for i, n in cart.items())
+    weight = sum(item_system.get_item(i)['weight'] * n for i, n in cart.items())
+    bonus = max([item_system.get_item(i)['effects'].get('capacity_bonus', 0) for i in cart] or [0])
+    return price, weight, MAX_WEIGHT_BASE + bonus
+
+
+def fits(item_system, cart, money):
+    price, weight, limit = cart_totals(item_system, cart)
+    return price <= money and weight <= limit + 1e-9
+
+
+def event_items(event_system):
+    # item_id -> number of event choices that ask for it
+    counts = {}
+    for event in event_system.events if event_system else []:
+        for choice in event.get('choices', []):
+            for item_id in choice.get('requirements', {}).get('items', []):
+                counts[item_id] = counts.get(item_id, 0) + 1
+    return counts
+
+
+def trip_needs(character_id):
+    hunger_mult = CHARACTERS[character_id]['buffs'].get('hunger_drain_mult', 1.0)
+    return dict(NEEDS, hunger=NEEDS["hunger"] * hunger_mult)
+
+
+def stat_points(item):
+    # Consumable stat -> points one unit gives (as eaten uncooked)
+    effects = item.get('effects', {})
+    scale = UNCOOKED if effects.get('needs_cooking') else 1.0
+    return {stat: effects[stat] * scale for stat in STAT_VALUES if stat in effects}
+
+
+def unit_values(item_system, event_system, character_id, season):
+    # item_id -> (worth of one unit, most units worth buying); backpacks
+    # are left out (the optimizer picks one per candidate)
+    needs = trip_needs(character_id)
+    cold = max(1.0, (COMFORT_TEMP - SEASONS[season]['base_temp']) / 10.0)
+    asked = event_items(event_system)
+    values = {}
+    for item_id, item in item_system.items.items():
+        effects = item.get('effects', {})
+        if 'capacity_bonus' in effects:
+            continue
+        value = 0.0
+        cap = 1
+        if item_id in item_system.consumables:
+            main = None
+            for stat, points in stat_points(item).items():
+                # A point is worth less to a character who needs fewer of them
+                worth = points * STAT_VALUES[stat] * NEEDS[stat] / needs[stat]
+                value += worth
+                if points > 0 and (main is None or worth > main[1]):
+                    main = (stat, worth, points)
+            if main is not None:
+                cap = max(1, math.ceil(needs[main[0]] / main[2]))
+        value += effects.get('temp_protection', 0) * WARMTH_VALUE * cold
+        if effects.get('can_camp'):
+            value += CAMP_VALUE
+        value += asked.get(item_id, 0) * EVENT_ITEM_VALUE
+        if value > 0:
+            values[item_id] = (value, cap)
+    return values
+
+
+def knapsack(pieces, budget):
+    # 0/1 knapsack over pieces [(cost, value, item_id, count)] within budget
+    # (integer cost units); returns {item_id: count}
+    best = np.zeros(budget + 1)
+    taken = np.zeros((len(pieces), budget + 1), dtype=bool)
+    for k, (cost, value, _, _) in enumerate(pieces):
+        if cost > budget:
+            continue
+        if cost == 0:
+            best += value
+            taken[k] = True
+            continue
+        candidate = best[:budget + 1 - cost] + value
+        better = candidate > best[cost:]
+        taken[k, cost:] = better
+        best[cost:] = np.where(better, candidate, best[cost:])
+
+    counts = {}
+    left = budget
+    for k in range(len(pieces) - 1, -1, -1):
+        if taken[k, left]:
+            cost, _, item_id, count = pieces[k]
+            counts[item_id] = counts.get(item_id, 0) + count
+            left -= cost
+    return counts
+
+
+def split_counts(count):
+    # Binary splitting: 1, 2, 4, ... and the rest add up to any 0..count
+    parts = []
+    size = 1
+    while count > 0:
+        part = min(size, count)
+        parts.append(part)
+        count -= part
+        size *= 2
+    return parts
+
+
+def backpacks(item_system):
+    # Backpacks no other one beats on capacity, price and weight
+    packs = [(item['effects']['capacity_bonus'], -item['price'], -item['weight'], item_id)
+             for item_id, item in item_system.items.items() if 'capacity_bonus' in item.get('effects', {})]
+    return [p[3] for p in packs if not any(o[:3] != p[:3] and all(a >= b for a, b in zip(o[:3], p[:3]))
+                                           for o in packs)]
+
+
+def knapsack_candidates(item_system, values, needs, money):
+    # Distinct carts that fit the budget and the weight limit: one knapsack
+    # per backpack (or none) and weight penalty
+    unit = 0
+    for item_id in values:
+        unit = math.gcd(unit, item_system.get_item(item_id)['price'])
+    unit = unit or 1
+
+    candidates = []
+    seen = set()
+    for backpack in [None] + backpacks(item_system):
+        base = {backpack: 1} if backpack else {}
+        price, weight, limit = cart_totals(item_system, base)
+        if price > money:
+            continue
+        budget = (money - price) // unit
+        for penalty in PENALTIES:
+            pieces = []
+            for item_id, (value, cap) in values.items():
+                item = item_system.get_item(item_id)
+                worth = value - penalty * item['weight']
+                if worth <= 0:
+                    continue
+                if item['weight'] > 0:
+                    cap = min(cap, int((limit - weight) // item['weight']))
+                cost = math.ceil(item['price'] / unit)
+                for count in split_counts(cap):
+                    pieces.append((cost * count, worth * count, item_id, count))
+            cart = dict(base, **knapsack(pieces, budget))
+            trim(item_system, values, needs, cart)
+            key = tuple(sorted(cart.items()))
+            if key not in seen:
+                seen.add(key)
+                candidates.append(cart)
+    return candidates
+
+
+def trim(item_system, values, needs, cart):
+    # Drops the least worth per kg until the cart is under its weight limit,
+    # then consumables past every need they cover (the knapsack caps each
+    # item on its own, so together they overshoot)
+    price, weight, limit = cart_totals(item_system, cart)
+    while weight > limit + 1e-9:
+        item_id = min((i for i in cart if i in values and item_system.get_item(i)['weight'] > 0),
+                      key=lambda i: values[i][0] / item_system.get_item(i)['weight'])
+        weight -= item_system.get_item(item_id)['weight']
+        cart[item_id] -= 1
+        if not cart[item_id]:
+            del cart[item_id]
+
+    supply = dict.fromkeys(needs, 0.0)
+    points = {}
+    for item_id, count in cart.items():
+        if item_id in item_system.consumables:
+            points[item_id] = {k: v for k, v in stat_points(item_system.get_item(item_id)).items() if v > 0}
+            for stat, p in points[item_id].items():
+                supply[stat] += p * count
+    for item_id in sorted(points, key=lambda i: values.get(i, (0,))[0] / max(1, item_system.get_item(i)['price'])):
+        gives = points[item_id]
+        while gives and cart.get(item_id) and all(supply[stat] - p >= needs[stat] for stat, p in gives.items()):
+            for stat, p in gives.items():
+                supply[stat] -= p
+            cart[item_id] -= 1
+            if not cart[item_id]:
+                del cart[item_id]
+
+
+def cache_path(character_id, season, key):
+    root = resources.project_root()
+    if not isinstance(root, os.PathLike):
+        return None # Running from an archive: no cache
+    return os.path.join(os.fspath(root), CACHE_DIR, f"{character_id}_{season}_{key}.json")
+
+
+class LoadoutOptimizer:
+    # Finds a cart for one character and season. steps() does the work a
+    # game at a time (the shop runs it between frames); run() all at once.
+    def __init__(self, player, character_id="xiaomou", season="spring", money=START_MONEY,
+                 seeds=SEEDS, rounds=ROUNDS):
+        if np is None:
+            raise ImportError("The loadout optimizer needs numpy (pip install numpy)")
+        self.player = player
+        self.item_system = player.item_system
+        self.character_id = character_id
+        self.season = season
+        self.money = money
+        self.seeds = seeds
+        self.rounds = rounds
+        self.key = hashlib.sha1(json.dumps([OPTIMIZER_VERSION, catalog_hash(self.item_system), money])
+                                .encode("utf-8")).hexdigest()[:16]
+        self.scores = {} # sorted cart items -> stats
+        self.games = 0
+        self.result = None
+
+    def evaluate(self, cart):
+        # Plays the common seeds with cart (one game per step); the stats
+        # end up in self.scores
+        key = tuple(sorted(cart.items()))
+        if key in self.scores:
+            return
+        total_km = self.player.map_system.total_km
+        fitness = 0.0
+        wins = 0
+        km = 0.0
+        for seed in range(self.seeds):
+            run = self.player.play(seed, self.character_id, self.season, cart, survival_policy)
+            fitness += reward(run, total_km)
+            wins += run.state.game_won
+            km += run.km()
+            self.games += 1
+            yield
+        price, weight, _ = cart_totals(self.item_system, cart)
+        self.scores[key] = {"cart": dict(cart), "fitness": fitness / self.seeds, "win_rate": wins / self.seeds,
+                            "mean_km": km / self.seeds, "price": price, "weight": round(weight, 2)}
+
+    def best(self):
+        return max(self.scores.values(), key=lambda s: s["fitness"])
+
+    def neighbors(self, cart, values):
+        # +1/-1 of an item, or another backpack, that still fits
+        packs = backpacks(self.item_system)
+        extra = sorted(values, key=lambda i: -values[i][0] / max(1, self.item_system.get_item(i)['price']))
+        moves = [(i, -1) for i in sorted(cart)] + [(i, 1) for i in extra[:NEIGHBORS]]
+        for item_id, change in moves:
+            other = dict(cart)
+            other[item_id] = other.get(item_id, 0) + change
+            if not other[item_id]:
+                del other[item_id]
+            if fits(self.item_system, other, self.money):
+                yield other
+        current = [i for i in cart if i in packs]
+        for backpack in packs:
+            if backpack not in current:
+                other = {i: n for i, n in cart.items() if i not in packs}
+                other[backpack] = 1
+                if fits(self.item_system, other, self.money):
+                    yield other
+
+    def steps(self):
+        # Yields (stage, done, total) after every game: stage 0 scores the
+        # knapsack candidates, stage r the r-th round of local search
+        player = self.player
+        values = unit_values(self.item_system, player.event_system, self.character_id, self.season)
+        candidates = knapsack_candidates(self.item_system, values, trip_needs(self.character_id), self.money)
+        if fits(self.item_system, DEFAULT_CART, self.money):
+            candidates.append(dict(DEFAULT_CART))
+        for n, cart in enumerate(candidates):
+            for _ in self.evaluate(cart):
+                yield 0, n, len(candidates)
+
+        for stage in range(1, self.rounds + 1):
+            current = self.best()
+            others = list(self.neighbors(current["cart"], values))
+            for n, cart in enumerate(others):
+                for _ in self.evaluate(cart):
+                    yield stage, n, len(others)
+            if self.best() is current:
+                break # Local optimum
+
+        baseline = self.scores.get(tuple(sorted(DEFAULT_CART.items())))
+        ranked = sorted(self.scores.values(), key=lambda s: -s["fitness"])
+        self.result = dict(ranked[0], version=OPTIMIZER_VERSION, character=self.character_id,
+                           season=self.season, money=self.money, seeds=self.seeds, games=self.games,
+                           baseline=baseline, runners_up=ranked[1:5])
+
+    def run(self, progress=None):
+        for stage, done, total in self.steps():
+            if progress:
+                progress(stage, done, total)
+        return self.result
+
+    def load(self):
+        # The cached result, or None
+        path = cache_path(self.character_id, self.season, self.key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.result = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Loadout cache unreadable: {e}")
+            return None
+        return self.result
+
+    def save(self):
+        path = cache_path(self.character_id, self.season, self.key)
+        if path is None or self.result is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.result, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Loadout cache not written: {e}")
+
+
+def recommend(player, character_id="xiaomou", season="spring", money=START_MONEY, seeds=SEEDS,
+              rounds=ROUNDS, force=False, progress=None):
+    # The recommended loadout (result dict with "cart"), from the cache when possible
+    optimizer = LoadoutOptimizer(player, character_id, season, money, seeds, rounds)
+    if not force and optimizer.load() is not None:
+        return optimizer.result
+    optimizer.run(progress)
+    optimizer.save()
+    return optimizer.result
@@ -0,0 +1,187 @@
+import math
+import time
+import random
+from concurrent.futures import ProcessPoolExecutor
+from .state import StateCodec
+from .simulation import Simulation
+from .autoplay import Playthrough, load_systems
+from .scoring import reward
+
+# Monte Carlo Tree Search player (UCT with random rollouts).
+# The tree is open-loop: nodes are action sequences from the current screen,
+# and every iteration replays them on a fresh clone with new random draws,
+# so chance (weather, events, loot) is averaged over instead of branched on.
+#
+# Root parallel: each worker process loads the data once, searches its own
+# tree from the same position with its own RNG, and the root statistics are
+# summed; the most visited action is played. Search never touches the run's
+# RNG, so a game is still reproducible from its seed and action log.
+
+EXPLORATION = 1.4 # UCB1 constant
+ITERATIONS = 1000 # Per worker and move
+TIME_LIMIT = 0.5 # Seconds per move (whichever budget runs out first)
+ROLLOUT_STEPS = 40 # Random actions after the tree before scoring
+
+
+class Node:
+    __slots__ = ("visits", "value", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {} # action -> Node
+
+
+def search(run, rng, iterations=ITERATIONS, time_limit=TIME_LIMIT, rollout_steps=ROLLOUT_STEPS):
+    # Root statistics {action: (visits, total reward)} for a Playthrough,
+    # which is left untouched
+    root = Node()
+    total_km = run.sim.map_system.total_km
+    deadline = time.perf_counter() + time_limit if time_limit else None
+    for i in range(iterations):
+        if deadline is not None and i % 16 == 0 and time.perf_counter() > deadline:
+            break
+        trial = run.clone(rng)
+        node = root
+        path = [root]
+
+        # Selection / expansion: among the actions legal in this sample
+        while not trial.done:
+            actions = trial.legal_actions()
+            if not actions:
+                break
+            untried = [a for a in actions if a not in node.children]
+            if untried:
+                action = rng.choice(untried)
+                node.children[action] = child = Node()
+                trial.step(action)
+                path.append(child)
+                break
+            log_visits = math.log(node.visits)
+            children = node.children
+            action = max(actions, key=lambda a: children[a].value / children[a].visits
+                         + EXPLORATION * math.sqrt(log_visits / children[a].visits))
+            node = children[action]
+            trial.step(action)
+            path.append(node)
+
+        # Rollout
+        steps = 0
+        while not trial.done and steps < rollout_steps:
+            actions = trial.legal_actions()
+            if not actions:
+                break
+            trial.step(rng.choice(actions))
+            steps += 1
+
+        value = reward(trial, total_km)
+        for node in path:
+            node.visits += 1
+            node.value += value
+    return {action: (child.visits, child.value) for action, child in root.children.items()}
+
+
+# --- Worker processes ---
+# Each worker loads the data once (initializer); a move ships only the
+# position: the state packed by StateCodec, screen, pending event (by index)
+# and flags.
+
+_systems = None
+_codec = None
+_env_tables = {} # Simulation._env_tables shared by every search in the worker
+
+
+def codec_for(systems):
+    item_system, map_system, weather_system, event_system = systems
+    return StateCodec.from_systems(item_system, map_system, event_system, weather_system)
+
+
+def _init_worker():
+    global _systems, _codec
+    _systems = load_systems()
+    _codec = codec_for(_systems)
+
+
+def snapshot(run, codec):
+    event = run.sim.current_event
+    events = run.sim.event_system.events if run.sim.event_system else []
+    # Events are looked up by identity: two entries share an event_id
+    event_index = next((i for i, e in enumerate(events) if e is event), None)
+    return (codec.pack(run.state), run.phase, event_index, run.steps, run.retreat_offered,
+            sorted(run.no_effect))
+
+
+def restore(systems, data, rng, codec, env_tables=None):
+    # A Playthrough at the snapshot's position, drawing from rng
+    packed, phase, event_index, steps, retreat_offered, no_effect = data
+    item_system, map_system, weather_system, event_system = systems
+    state = codec.unpack(packed)
+    sim = Simulation(state, item_system, map_system, weather_system, event_system, rng=rng)
+    if env_tables is not None:
+        sim._env_tables = env_tables
+    sim.current_event = None if event_index is None else event_system.events[event_index]
+    run = Playthrough(sim, phase)
+    run.steps = steps
+    run.retreat_offered = retreat_offered
+    run.no_effect = set(no_effect)
+    return run
+
+
+def _search_worker(data, seed, iterations, time_limit):
+    rng = random.Random(seed)
+    return search(restore(_systems, data, rng, _codec, _env_tables), rng, iterations, time_limit)
+
+
+class MCTSPlayer:
+    # policy(run) -> action, for AutoPlayer.play / finish. workers=1 searches
+    # in this process; more start a process pool (call close() when done).
+    def __init__(self, workers=1, iterations=ITERATIONS, time_limit=TIME_LIMIT, seed=0):
+        self.workers = max(1, workers)
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.rng = random.Random(seed) # Seeds for the searches, never the game's
+        self.pool = None
+        self.codec = None # Built from the first run's systems (the workers load the same data)
+        if self.workers > 1:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        self.moves = 0
+        self.rollouts = 0
+        self.search_seconds = 0.0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __call__(self, run):
+        actions = run.legal_actions()
+        if len(actions) <= 1:
+            return actions[0] if actions else None
+
+        start = time.perf_counter()
+        seeds = [self.rng.getrandbits(63) for _ in range(self.workers)]
+        if self.pool is None:
+            rng = random.Random(seeds[0])
+            results = [search(run, rng, self.iterations, self.time_limit)]
+        else:
+            if self.codec is None:
+                sim = run.sim
+                self.codec = codec_for((sim.item_system, sim.map_system, sim.weather_system, sim.event_system))
+            data = snapshot(run, self.codec)
+            futures = [self.pool.submit(_search_worker, data, seed, self.iterations, self.time_limit)
+                       for seed in seeds]
+            results = [f.result() for f in futures]
+        self.search_seconds += time.perf_counter() - start
+        self.moves += 1
+
+        totals = {}
+        for stats in results:
+            for action, (visits, value) in stats.items():
+                total = totals.setdefault(action, [0, 0.0])
+                total[0] += visits
+                total[1] += value
+                self.rollouts += visits
+        if not totals:
+            return actions[0] # Out of time before the first iteration
+        # Most visited; mean reward breaks ties
+        return max(totals, key=lambda a: (totals[a][0], totals[a][1] / totals[a][0]))
@@ -0,0 +1,482 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+try:
+    import numpy as np
+except ImportError: # Only the solver and its tables need numpy
+    np = None
+from .config import *
+from .state import GameState
+from .simulation import Simulation, TERRAIN_FACTORS
+from . import resources, simcache, simulation, state as body_rules
+
+# Optimal policy over a discretized survival MDP.
+#
+# The turn rules (hike / rest / camp / eat, see game/simulation.py) for one
+# character, season and loadout are turned into arrays over a grid of states:
+#   position along the route (km), action points, weather, stamina,
+#   nourishment (the lower of hunger and thirst), body temperature, rations left
+# and solved by backward induction over the hours of the trip: the value of
+# a state is the probability of reaching the end within `days` days. Between
+# grid points values are interpolated (multilinear), so slow drains still
+# move the state. The last day of the backward pass is kept as a table per
+# hour of day: the best action and its success probability.
+#
+# Deliberately left out of the model: events, sanity, health (assumed full),
+# spoilage, snow melting, the hike speed's random factor (its mean is used),
+# the retreat and the student's teleport. Food and water are pooled into
+# rations of equal hunger and thirst. Values are therefore an estimate, not
+# a bound on the real game (pooled rations and the mean speed can err either
+# way); good for comparing loadouts, seasons and tuning changes.
+#
+# Drains and body rules are read from simulation / state when a model is
+# built, so balance.json and tuning changes apply. Tables are cached on disk
+# per (character, season, loadout, grid, data and rules).
+
+MODEL_VERSION = 2
+MAX_DAYS = 8
+POS_STEP = 1.0 # km; node distances are whole km, so every node is a grid point
+GRID = {"stamina": 5, "nourish": 5, "temp": 4}
+QUICK_GRID = {"stamina": 3, "nourish": 3, "temp": 3}
+TEMP_RANGE = (32.0, 37.0) # Below 32 is death (GameState.check_game_over); rest caps at 37
+RATION_POINTS = 30 # Hunger and thirst one ration restores (more if the pack holds many)
+MAX_RATIONS = 6
+CAMP_HOURS = 12
+TIE = 1e-5 # Values this close count as equal
+CACHE_DIR = "cache/policy"
+
+# Action codes in the policy table
+NONE, HIKE, REST, CAMP, CAMP_MORNING, EAT = range(6)
+ACTION_NAMES = ["-", "hike", "rest", "camp", "camp_morning", "eat"]
+
+DIMS = ("pos", "ap", "weather", "stamina", "nourish", "temp", "rations")
+
+
+def provisions(item_system, inventory):
+    # Hunger and thirst the pack's food and drink restore in total
+    can_cook = all(k in inventory for k in ("stove", "pot", "gas"))
+    hunger = thirst = 0
+    for item_id, count in inventory.items():
+        item = item_system.get_item(item_id)
+        if not item:
+            continue
+        effects = item.get('effects', {})
+        food = effects.get('hunger', 0)
+        drink = effects.get('thirst', 0)
+        if isinstance(food, (int, float)):
+            if effects.get('needs_cooking') and not can_cook:
+                food *= 0.5
+            hunger += food * count
+        if isinstance(drink, (int, float)):
+            thirst += drink * count
+    return max(0, hunger), max(0, thirst)
+
+
+def cache_key(item_system, map_system, weather_system, character_id, season, cart, grid, days):
+    # Changes whenever anything the model reads changes
+    items = {item_id: item_system.get_item(item_id) for item_id in sorted(cart)}
+    blob = json.dumps([MODEL_VERSION, character_id, season, sorted(cart.items()), grid, days, items,
+                       map_system.node_list, weather_system.transitions, simcache.content_key()], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class SurvivalModel:
+    # The rules of one (character, season, loadout) as arrays over the state grid
+    def __init__(self, item_system, map_system, weather_system, character_id, season, cart,
+                 grid=None, days=MAX_DAYS):
+        if np is None:
+            raise ImportError("The MDP solver needs numpy (pip install numpy)")
+        grid = dict(GRID, **(grid or {}))
+        self.grid = grid
+        self.days = days
+        self.character_id = character_id
+        self.season = season
+        self.weather_system = weather_system
+
+        state = GameState()
+        sim = Simulation(state, item_system, map_system, weather_system)
+        sim.start(character_id, season)
+        for item_id, count in cart.items():
+            state.add_item(item_id, count)
+        self.has_tent = state.has_item("tent")
+        self.gear_warmth = 10.0 - sim.gear_protection()
+        self.buffs = CHARACTERS[character_id]['buffs']
+
+        weight = item_system.calculate_weight(state.inventory)
+        self.weight_factor = 1.0
+        if weight > MAX_WEIGHT_BASE:
+            self.weight_factor = max(0.5, 1.0 - ((weight - MAX_WEIGHT_BASE) * 0.05))
+        if weight < MAX_WEIGHT_BASE * 0.8:
+            self.weight_factor = 1.1
+
+        hunger, thirst = provisions(item_system, state.inventory)
+        pooled = min(hunger, thirst)
+        self.ration = max(RATION_POINTS, pooled / MAX_RATIONS)
+        self.rations = int(pooled // self.ration)
+
+        # Grid values
+        self.total_km = map_system.total_km
+        self.pos = np.arange(0, self.total_km + POS_STEP / 2, POS_STEP)
+        self.ap = np.arange(DAILY_ACTION_POINTS + 1)
+        self.weathers = list(weather_system.weather_types)
+        self.stamina = np.linspace(0, MAX_STAMINA, grid["stamina"])
+        self.nourish = np.linspace(0, 100, grid["nourish"])
+        self.temp = np.linspace(TEMP_RANGE[0], TEMP_RANGE[1], grid["temp"])
+        self.shape = (len(self.pos), len(self.ap), len(self.weathers), len(self.stamina),
+                      len(self.nourish), len(self.temp), self.rations + 1)
+
+        # Per position: the leg being walked and its terrain
+        legs = [(map_system.km_from_start[node['node_id']], node) for node in map_system.node_list]
+        n_pos = len(self.pos)
+        self.leg_end = np.zeros(n_pos)
+        terrain = np.ones(n_pos)
+        altitude = np.zeros(n_pos)
+        for p, km in enumerate(self.pos):
+            start, node = [leg for leg in legs if leg[0] <= km + 1e-9][-1]
+            self.leg_end[p] = start + node.get('distance_to_next', 0)
+            terrain[p] = TERRAIN_FACTORS.get(node.get('terrain', 'normal'), 1.0)
+            altitude[p] = node.get('altitude', 2000)
+        self.terrain_factor = terrain
+        self.altitude_factor = np.maximum(simulation.MIN_ALTITUDE_FACTOR,
+                                          1.0 - (np.maximum(0, altitude - simulation.ALTITUDE_SLOW_START)
+                                                 / simulation.ALTITUDE_SLOW_RANGE))
+
+        # Environment per (position, weather, hour): what update_environment sets
+        n_weather = len(self.weathers)
+        self.env_temp = np.zeros((n_pos, n_weather, 24))
+        self.env_weather = np.zeros((n_pos, n_weather, 24), dtype=np.int64)
+        self.wind = np.zeros((n_pos, n_weather, 24))
+        for p in range(n_pos):
+            for w, weather in enumerate(self.weathers):
+                for hour, (env, new_weather, wind) in enumerate(sim.environment_table(altitude[p], weather)):
+                    self.env_temp[p, w, hour] = env
+                    self.env_weather[p, w, hour] = self.weathers.index(new_weather)
+                    self.wind[p, w, hour] = wind
+        self.stamina_cost = np.array([weather_system.get_weather_effects(w).get('stamina_cost', 1.0)
+                                      for w in self.weathers])
+
+        # Overnight weather change (camp): row = weather at the end of the sleep
+        self.weather_matrix = np.zeros((n_weather, n_weather))
+        for w, weather in enumerate(self.weathers):
+            probs = weather_system.transition_probs(weather, season) or {"sunny": 1.0}
+            for new_weather, prob in probs.items():
+                self.weather_matrix[w, self.weathers.index(new_weather)] += prob
+
+        self.turn_drain = max(simulation.TURN_HUNGER_DRAIN * self.buffs.get('hunger_drain_mult', 1.0),
+                              simulation.TURN_THIRST_DRAIN)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def axis(self, values, dim, ndim=7):
+        # values shaped to broadcast along dimension `dim`
+        shape = [1] * ndim
+        shape[dim] = -1
+        return np.asarray(values).reshape(shape)
+
+    def body_temp(self, temp, hunger, env):
+        # GameState.update_body_temp, vectorized
+        gw = self.gear_warmth
+        heat_loss = np.where(env < gw, (gw - env) * body_rules.COLD_HEAT_LOSS, 0.0) \
+            + np.where(hunger < 20, body_rules.HUNGRY_HEAT_LOSS, 0.0) \
+            + np.where(hunger <= 0, body_rules.STARVING_HEAT_LOSS, 0.0)
+        losing = temp - heat_loss + np.where(hunger > 80, 0.02, 0.0)
+        recover = np.where(temp < 37.0, np.where(env >= gw, 0.1, 0.0) + np.where(hunger > 70, 0.1, 0.0)
+                           + np.where(hunger > 90, 0.1, 0.0), 0.0)
+        return np.clip(np.where(heat_loss > 0, losing, temp + recover), 30.0, MAX_TEMP)
+
+    def expected(self, V, coords):
+        # Value of V at the given coordinates, one per axis of V: an index
+        # array (exact) or (values, grid) for multilinear interpolation
+        strides = [int(np.prod(V.shape[d + 1:])) for d in range(V.ndim)]
+        flat = V.reshape(-1)
+        base = 0
+        parts = []
+        for d, coord in enumerate(coords):
+            if not isinstance(coord, tuple):
+                base = base + coord * strides[d]
+                continue
+            x, grid = coord
+            if len(grid) == 1:
+                continue
+            step = grid[1] - grid[0]
+            f = (np.clip(x, grid[0], grid[-1]) - grid[0]) / step
+            lo = np.minimum(f.astype(np.int64), len(grid) - 2)
+            base = base + lo * strides[d]
+            parts.append((strides[d], (f - lo).astype(np.float32)))
+        # Corner offsets and weights, built one axis at a time so shared
+        # prefixes are multiplied once
+        corners = [(0, None)]
+        for stride, w in parts:
+            corners = [(offset + bit * stride, (w if bit else 1 - w) if weight is None
+                        else weight * (w if bit else 1 - w))
+                       for offset, weight in corners for bit in (0, 1)]
+        base = np.asarray(base, dtype=np.int32) # Half the memory traffic of int64
+        result = None
+        index = np.empty(base.shape, dtype=np.int32)
+        for offset, weight in corners:
+            np.add(base, offset, out=index)
+            values = flat.take(index)
+            if weight is not None:
+                values *= weight
+            if result is None:
+                result = values
+            else:
+                result += values
+        return result
+
+    def resample(self, V, axis, x, grid):
+        # V along one axis re-sampled at x (one value per grid point), for
+        # changes that depend only on that axis' own value: 2 gathers
+        # instead of doubling the corners in expected()
+        if len(grid) == 1:
+            return V
+        step = grid[1] - grid[0]
+        f = (np.clip(x, grid[0], grid[-1]) - grid[0]) / step
+        lo = np.minimum(f.astype(np.int64), len(grid) - 2)
+        w = self.axis((f - lo).astype(np.float32), axis, V.ndim)
+        return V.take(lo, axis=axis) * (1 - w) + V.take(lo + 1, axis=axis) * w
+
+    def q_hike(self, V1, hour):
+        pos, ap, w, st, n, T, r = (self.axis(np.arange(size), d) for d, size in enumerate(self.shape))
+        km = self.pos[pos]
+        stamina = self.stamina[st]
+        nourish = self.nourish[n]
+        temp = self.temp[T]
+        env = self.env_temp[pos, w, hour]
+        wind = self.wind[pos, w, hour]
+
+        wind_factor = np.where(wind >= 8, 0.5, np.where(wind >= 6, 0.8, 1.0))
+        temp_factor = np.where(env < -20, 0.7, np.where(env < -10, 0.9, 1.0))
+        status = 1.0 + np.where(stamina > 80, 0.2, 0.0) - np.where(nourish < 30, 0.1, 0.0)
+        status = status * self.buffs.get('move_speed_mult', 1.0)
+        dist = 2.0 * self.terrain_factor[pos] * self.altitude_factor[pos] * self.weight_factor \
+            * wind_factor * temp_factor * status
+        new_km = np.minimum(km + dist, self.leg_end[pos])
+
+        cold_cost = np.where(env < 0, 1.0 + np.abs(env) * 0.02, 1.0)
+        cost = 15 * (1.0 + (1.0 - self.terrain_factor[pos]) + (1.0 - self.altitude_factor[pos])) \
+            * self.stamina_cost[w] * (1.0 + wind * 0.05) * cold_cost * self.buffs.get('stamina_cost_mult', 1.0)
+        new_stamina = np.clip(stamina - cost, 0, MAX_STAMINA)
+
+        next_hour = (hour + 1) % 24
+        new_ap = np.full(ap.shape, DAILY_ACTION_POINTS) if next_hour == 0 else ap - 1
+        new_w = self.env_weather[pos, w, next_hour]
+        new_temp = self.body_temp(temp, nourish, self.env_temp[pos, w, next_hour])
+
+        V1 = self.resample(V1, 4, self.nourish - self.turn_drain, self.nourish)
+        value = self.expected(V1, [(new_km, self.pos), new_ap, new_w, (new_stamina, self.stamina),
+                                   n, (new_temp, self.temp), r])
+        value = np.where(new_temp < TEMP_RANGE[0], 0.0, value)
+        legal = (ap > 0) & (stamina > 10) & (km < self.total_km)
+        return np.where(legal, value, -1.0)
+
+    def q_rest(self, V1, hour):
+        pos, ap, w, st, n, T, r = (self.axis(np.arange(size), d) for d, size in enumerate(self.shape))
+        nourish = self.nourish[n]
+        temp = np.where(nourish > 30, np.minimum(self.temp[T] + 0.5, 37.0), self.temp[T])
+
+        next_hour = (hour + 1) % 24
+        new_ap = np.full(ap.shape, DAILY_ACTION_POINTS - 1) if next_hour == 0 else ap - 1
+        new_w = self.env_weather[pos, w, next_hour]
+        new_temp = self.body_temp(temp, nourish, self.env_temp[pos, w, next_hour])
+
+        V1 = self.resample(V1, 4, self.nourish - self.turn_drain, self.nourish)
+        V1 = self.resample(V1, 3, self.stamina + 15, self.stamina)
+        value = self.expected(V1, [pos, new_ap, new_w, st, n, (new_temp, self.temp), r])
+        value = np.where(new_temp < TEMP_RANGE[0], 0.0, value)
+        return np.where(ap > 0, value, -1.0)
+
+    def q_camp(self, Vk, hour, hours):
+        # Sleeping `hours` (Simulation.camp / fast_forward); independent of
+        # action points, so computed without that axis and broadcast
+        pos, w, st, n, T, r = (self.axis(np.arange(size), d, 6)
+                               for d, size in enumerate(self.shape[:1] + self.shape[2:]))
+        nourish = self.nourish[n]
+        temp = self.temp[T]
+        stamina = np.minimum(self.stamina[st] + np.where(nourish < 30, 20, 40), MAX_STAMINA)
+        temp = np.where(nourish > 20, np.where(temp < 35, temp + 2.0, np.minimum(37.0, temp + 1.0)),
+                        np.where(temp < 35, temp + 0.5, temp))
+        weather = np.broadcast_to(w, (len(self.pos),) + w.shape[1:]).copy()
+        for j in range(1, hours + 1):
+            h = (hour + j) % 24
+            weather = self.env_weather[pos, weather, h]
+            temp = self.body_temp(temp, nourish, self.env_temp[pos, weather, h])
+            nourish = np.maximum(nourish - simulation.SLEEP_THIRST_DRAIN, 0)
+
+        # Weather for the next day, then action points are back in full
+        mixed = np.einsum("ij,pjsntr->pisntr", self.weather_matrix, Vk[:, DAILY_ACTION_POINTS])
+        mixed = self.resample(mixed, 3, self.nourish - simulation.SLEEP_THIRST_DRAIN * hours, self.nourish)
+        value = self.expected(mixed, [pos, weather, (stamina, self.stamina), n, (temp, self.temp), r])
+        value = np.where(temp < TEMP_RANGE[0], 0.0, value)
+        return value[:, None]
+
+    def eat(self, V, action):
+        # Zero-time: a ration is eaten if the state after it is worth more.
+        # Solved in order of rations left, so chains of meals are covered.
+        for r in range(1, self.rations + 1):
+            after = self.resample(V[..., r - 1], 4, self.nourish + self.ration, self.nourish)
+            better = after > V[..., r]
+            V[..., r] = np.where(better, after, V[..., r])
+            action[..., r] = np.where(better, EAT, action[..., r])
+
+    def solve(self, progress=None):
+        # Backward induction over days * 24 hours; returns (value, action)
+        # tables shaped (24,) + self.shape for the first day of the trip
+        hours = self.days * 24
+        zero = np.zeros(self.shape, dtype=np.float32)
+        future = [zero] * CAMP_HOURS # future[j] = value j + 1 hours from now
+        value_table = np.zeros((24,) + self.shape, dtype=np.float16)
+        action_table = np.zeros((24,) + self.shape, dtype=np.uint8)
+        for t in range(hours - 1, -1, -1):
+            hour = t % 24
+            q = [self.q_hike(future[0], hour), self.q_rest(future[0], hour)]
+            codes = [HIKE, REST]
+            if self.has_tent:
+                q.append(np.broadcast_to(self.q_camp(future[CAMP_HOURS - 1], hour, CAMP_HOURS), self.shape))
+                codes.append(CAMP)
+                morning = (6 - hour) % 24 or 24
+                if morning < CAMP_HOURS:
+                    q.append(np.broadcast_to(self.q_camp(future[morning - 1], hour, morning), self.shape))
+                    codes.append(CAMP_MORNING)
+            q = np.stack(q)
+            V = q.max(axis=0).astype(np.float32)
+            # Ties (e.g. every action wins) go to the earlier action in the list
+            best = (q >= V - TIE).argmax(axis=0)
+            action = np.asarray(codes, dtype=np.uint8)[best]
+            action[V < 0] = NONE
+            np.maximum(V, 0, out=V)
+            self.eat(V, action)
+            # Out of food or water is death; the end of the route is a win
+            V[:, :, :, :, 0] = 0
+            action[:, :, :, :, 0] = NONE
+            V[-1] = 1
+            action[-1] = NONE
+            if t < 24:
+                value_table[hour] = V
+                action_table[hour] = action
+            future = [V] + future[:-1]
+            if progress:
+                progress(hours - t, hours)
+        return value_table, action_table
+
+    def meta(self):
+        return {
+            "version": MODEL_VERSION,
+            "character": self.character_id,
+            "season": self.season,
+            "days": self.days,
+            "grid": self.grid,
+            "dims": list(DIMS),
+            "shape": list(self.shape),
+            "total_km": self.total_km,
+            "pos_step": POS_STEP,
+            "weathers": self.weathers,
+            "temp_range": list(TEMP_RANGE),
+            "ration": self.ration,
+            "rations": self.rations,
+        }
+
+
+class PolicyTable:
+    # A solved table: best action and success probability per hour and state
+    def __init__(self, meta, value, action):
+        self.meta = meta
+        self.value = value
+        self.action = action
+        self.cached = False # Loaded from the disk cache
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            value = np.load(os.path.join(path, "value.npy"), mmap_mode="r")
+            action = np.load(os.path.join(path, "action.npy"), mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Error loading policy table {path}: {e}")
+            return None
+        if meta.get("version") != MODEL_VERSION or list(value.shape[1:]) != meta["shape"]:
+            return None
+        return cls(meta, value, action)
+
+    def save(self, path):
+        # Written next to the final directory and renamed, so concurrent
+        # solvers never leave a half-written table
+        tmp = f"{path}.tmp{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+        np.save(os.path.join(tmp, "value.npy"), self.value)
+        np.save(os.path.join(tmp, "action.npy"), self.action)
+        try:
+            os.rename(tmp, path)
+        except OSError: # Another process got there first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _nearest(self, x, lo, hi, n):
+        if n == 1:
+            return 0
+        return int(round((min(max(x, lo), hi) - lo) / (hi - lo) * (n - 1)))
+
+    def index(self, state, map_system, item_system):
+        # Grid cell (hour, pos, ap, weather, stamina, nourish, temp, rations) of a GameState
+        m = self.meta
+        shape = m["shape"]
+        node = map_system.get_node(state.current_node_id)
+        km = map_system.km_from_start.get(state.current_node_id, 0) \
+            + max(0, node.get('distance_to_next', 0) - state.distance_to_next_node)
+        hunger, thirst = provisions(item_system, state.inventory)
+        weather = m["weathers"].index(state.weather) if state.weather in m["weathers"] else 0
+        return (
+            state.day_time % 24,
+            min(int(round(km / m["pos_step"])), shape[0] - 1),
+            min(max(int(state.action_points), 0), shape[1] - 1),
+            weather,
+            self._nearest(state.stamina, 0, MAX_STAMINA, shape[3]),
+            self._nearest(min(state.hunger, state.thirst), 0, 100, shape[4]),
+            self._nearest(state.temperature, m["temp_range"][0], m["temp_range"][1], shape[5]),
+            min(int(min(hunger, thirst) // m["ration"]), shape[6] - 1),
+        )
+
+    def lookup(self, state, map_system, item_system):
+        # (action name, success probability) for a GameState
+        cell = self.index(state, map_system, item_system)
+        return ACTION_NAMES[int(self.action[cell])], float(self.value[cell])
+
+
+def cache_path(key, character_id, season):
+    root = resources.project_root()
+    if not isinstance(root, os.PathLike):
+        return None # Running from an archive: no cache
+    return os.path.join(os.fspath(root), CACHE_DIR, f"{character_id}_{season}_{key}")
+
+
+def solve(item_system, map_system, weather_system, character_id, season, cart, grid=None,
+          days=MAX_DAYS, force=False, progress=None):
+    # The policy table for a loadout, from the disk cache when possible
+    grid = dict(GRID, **(grid or {}))
+    key = cache_key(item_system, map_system, weather_system, character_id, season, cart, grid, days)
+    path = cache_path(key, character_id, season)
+    if path and not force and os.path.isdir(path):
+        table = PolicyTable.load(path)
+        if table is not None:
+            table.cached = True
+            return table
+
+    model = SurvivalModel(item_system, map_system, weather_system, character_id, season, cart, grid, days)
+    start = time.perf_counter()
+    value, action = model.solve(progress)
+    meta = model.meta()
+    meta["states"] = model.size
+    meta["solve_seconds"] = round(time.perf_counter() - start, 2)
+    table = PolicyTable(meta, value, action)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if force and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        table.save(path)
+    return table
@@ -0,0 +1,184 @@
+import os
+import json
+import random
+from .state import GameState
+from .simulation import Simulation
+from . import save
+
+# Deterministic action log and replay.
+# A run is fully described by its RNG seed, the setup (character + season, or
+# a state snapshot for runs continued from an old save) and the list of actions
+# the player took. The log is a small text file next to the save:
+#
+#   aotai-log 1
+#   seed 1234567
+#   start xiaomou spring
+#   buy tent:1,water_bottle:6
+#   hike
+#   choose 1
+#   close
+#   use food_dried_noodles 0
+#   camp 12
+#
+# Replaying runs the same Simulation methods headlessly, so it rebuilds any
+# intermediate state, checks a save against its log and reproduces bug reports.
+
+LOG_MAGIC = "aotai-log"
+LOG_VERSION = 1
+LAST_RUN_LOG = "last_run.log" # Written at game over, for bug reports
+
+
+def log_filename(save_filename):
+    return os.path.splitext(save_filename)[0] + ".log"
+
+
+def new_seed():
+    # Drawn from the OS so it never disturbs the global random stream
+    return random.SystemRandom().randrange(1 << 31)
+
+
+# --- Action encoding ---
+
+def _format_arg(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, dict):
+        return ",".join(f"{k}:{v}" for k, v in value.items())
+    return str(value)
+
+
+def _parse_bool(text):
+    return text == "1"
+
+
+def _parse_cart(text):
+    cart = {}
+    for pair in filter(None, text.split(",")):
+        item_id, count = pair.split(":")
+        cart[item_id] = int(count)
+    return cart
+
+
+# Argument parsers per action (actions not listed take no arguments)
+ARG_TYPES = {
+    "buy": (_parse_cart,),
+    "camp": (int,),
+    "choose": (int,),
+    "use": (str, _parse_bool),
+    "travel": (str,),
+}
+
+
+def format_action(action):
+    return " ".join([action[0]] + [_format_arg(a) for a in action[1:]])
+
+
+def parse_action(line):
+    parts = line.split(" ")
+    name = parts[0]
+    types = ARG_TYPES.get(name, ())
+    if len(parts) - 1 != len(types):
+        raise ValueError(f"Bad action line: {line!r}")
+    return (name,) + tuple(t(a) for t, a in zip(types, parts[1:]))
+
+
+class ActionLog:
+    def __init__(self, seed, character_id="xiaomou", season="spring", snapshot=None):
+        self.seed = seed
+        self.character_id = character_id
+        self.season = season
+        self.snapshot = snapshot # GameState.to_dict() the run continues from, or None
+        self.actions = []
+
+    def append(self, action):
+        self.actions.append(action)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def to_text(self):
+        lines = [f"{LOG_MAGIC} {LOG_VERSION}", f"seed {self.seed}"]
+        if self.snapshot is not None:
+            lines.append("snapshot " + json.dumps(self.snapshot, ensure_ascii=False, separators=(",", ":")))
+        else:
+            lines.append(f"start {self.character_id} {self.season}")
+        lines.extend(format_action(a) for a in self.actions)
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_text(cls, text):
+        lines = text.splitlines()
+        if len(lines) < 3 or lines[0].split(" ")[0] != LOG_MAGIC:
+            raise ValueError("Not an action log")
+        version = int(lines[0].split(" ")[1])
+        if version > LOG_VERSION:
+            raise ValueError(f"Action log version {version} is newer than this game ({LOG_VERSION})")
+
+        log = cls(int(lines[1].split(" ")[1]))
+        kind, _, rest = lines[2].partition(" ")
+        if kind == "snapshot":
+            log.snapshot = json.loads(rest)
+        else:
+            log.character_id, log.season = rest.split(" ")
+        log.actions = [parse_action(line) for line in lines[3:] if line]
+        return log
+
+    def save(self, filename, background=False):
+        save.write(filename, self.to_text().encode("utf-8"), background)
+
+    @classmethod
+    def load(cls, filename):
+        # Returns None if there is no usable log
+        try:
+            return cls.from_text(save.read_file(filename).decode("utf-8"))
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            print(f"Error loading action log {filename}: {e}")
+            return None
+
+
+class Replayer:
+    # Systems are loaded once and shared by every replay
+    def __init__(self, item_system, map_system, weather_system, event_system):
+        self.item_system = item_system
+        self.map_system = map_system
+        self.weather_system = weather_system
+        self.event_system = event_system
+
+    def new_simulation(self, log):
+        state = GameState()
+        sim = Simulation(state, self.item_system, self.map_system, self.weather_system,
+                         self.event_system, rng=random.Random(log.seed))
+        if log.snapshot is not None:
+            state.apply_dict(log.snapshot)
+        else:
+            sim.start(log.character_id, log.season)
+        return sim
+
+    def replay(self, log, upto=None):
+        # Simulation after the first `upto` actions (all of them by default)
+        sim = self.new_simulation(log)
+        apply = sim.apply
+        for action in log.actions[:upto]:
+            apply(action)
+        return sim
+
+    def states(self, log):
+        # Yields (index, action, state) after every action; the state is live, clone() to keep it
+        sim = self.new_simulation(log)
+        for i, action in enumerate(log.actions):
+            sim.apply(action)
+            yield i, action, sim.state
+
+    def verify(self, log, state_dict, upto=None):
+        # Replays the log and compares with a saved state.
+        # Returns (simulation, [(field, saved, replayed)]); an empty list means they match.
+        sim = self.replay(log, upto)
+        expected = GameState()
+        expected.apply_dict(state_dict)
+        return sim, diff_states(expected, sim.state)
+
+
+def diff_states(a, b):
+    da = a.to_dict()
+    db = b.to_dict()
+    return [(k, da[k], db.get(k)) for k in da if da[k] != db.get(k)]
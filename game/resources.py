@@ -0,0 +1,219 @@
+import io
+import os
+import struct
+import pathlib
+import zipfile
+import importlib.resources
+try:
+    import mmap
+except ImportError: # Not available in every browser build
+    mmap = None
+
+# Read-only game resources (data, fonts, emoji), found relative to the game
+# package instead of the working directory, so the game starts from anywhere.
+#
+# Names are '/'-separated paths from the project root, e.g. "data/items.json".
+# They are looked up in order in:
+#   assets.pack  - single packed file, memory-mapped (tools/pack_assets.py)
+#   assets.zip   - zip archive of the same files
+#   the project directory itself (or the zip the game package was imported from)
+# Bytes are cached after the first read.
+
+ASSET_PACK = "assets.pack"
+ASSET_ZIP = "assets.zip"
+
+PACK_MAGIC = b"AOTP"
+PACK_HEADER = struct.Struct("<4sI")   # magic, entry count
+PACK_ENTRY = struct.Struct("<HII")    # name length, offset, size (name bytes follow)
+
+
+class TraversableSource:
+    # A directory, or any importlib.resources Traversable (e.g. a zipfile.Path
+    # when the game package itself is zip-imported)
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name):
+        return self.root.joinpath(*name.split("/"))
+
+    def read(self, name):
+        path = self._path(name)
+        if not path.is_file():
+            return None
+        return path.read_bytes()
+
+    def exists(self, name):
+        return self._path(name).is_file()
+
+    def mtime(self, name):
+        path = self._path(name)
+        if isinstance(path, os.PathLike) and path.is_file():
+            return os.path.getmtime(path)
+        return None
+
+    def local_path(self, name):
+        path = self._path(name)
+        return os.fspath(path) if isinstance(path, os.PathLike) else None
+
+
+class ZipSource:
+    def __init__(self, filename):
+        self.zip = zipfile.ZipFile(filename)
+        self.names = set(self.zip.namelist())
+
+    def read(self, name):
+        if name not in self.names:
+            return None
+        return self.zip.read(name)
+
+    def exists(self, name):
+        return name in self.names
+
+    def mtime(self, name):
+        return None
+
+    def local_path(self, name):
+        return None
+
+
+class PackSource:
+    # Header + index + concatenated files; only the index is parsed up front,
+    # file contents are sliced out of the memory map on demand
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            if mmap is not None:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = f.read()
+        magic, count = PACK_HEADER.unpack_from(self.data, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{filename} is not an asset pack")
+        self.entries = {}
+        pos = PACK_HEADER.size
+        for _ in range(count):
+            name_len, offset, size = PACK_ENTRY.unpack_from(self.data, pos)
+            pos += PACK_ENTRY.size
+            name = bytes(self.data[pos:pos + name_len]).decode("utf-8")
+            pos += name_len
+            self.entries[name] = (offset, size)
+
+    def read(self, name):
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        offset, size = entry
+        return bytes(self.data[offset:offset + size])
+
+    def exists(self, name):
+        return name in self.entries
+
+    def mtime(self, name):
+        return None
+
+    def local_path(self, name):
+        return None
+
+
+def encode_pack(files):
+    # files: {name: bytes} -> pack file contents
+    index = []
+    names = sorted(files)
+    header_size = PACK_HEADER.size + sum(PACK_ENTRY.size + len(n.encode("utf-8")) for n in names)
+    offset = header_size
+    for name in names:
+        index.append((name.encode("utf-8"), offset, len(files[name])))
+        offset += len(files[name])
+
+    parts = [PACK_HEADER.pack(PACK_MAGIC, len(names))]
+    for name_bytes, offset, size in index:
+        parts.append(PACK_ENTRY.pack(len(name_bytes), offset, size))
+        parts.append(name_bytes)
+    parts.extend(files[name] for name in names)
+    return b"".join(parts)
+
+
+class ResourceLoader:
+    def __init__(self, sources):
+        self.sources = sources
+        self.cache = {} # name -> bytes
+        self.missing = set() # Names no source has (emoji lookups try several)
+
+    def read(self, name):
+        # Bytes of the resource, or None if no source has it
+        data = self.cache.get(name)
+        if data is None and name not in self.missing:
+            for source in self.sources:
+                data = source.read(name)
+                if data is not None:
+                    self.cache[name] = data
+                    break
+            else:
+                self.missing.add(name)
+        return data
+
+    def read_text(self, name):
+        data = self.read(name)
+        return data.decode("utf-8") if data is not None else None
+
+    def open(self, name):
+        # Fresh file object (pygame fonts / images keep reading from it)
+        data = self.read(name)
+        return io.BytesIO(data) if data is not None else None
+
+    def exists(self, name):
+        if name in self.cache:
+            return True
+        if name in self.missing:
+            return False
+        return any(source.exists(name) for source in self.sources)
+
+    def _source_for(self, name):
+        for source in self.sources:
+            if source.exists(name):
+                return source
+        return None
+
+    def mtime(self, name):
+        # Modification time if the resource is a plain file, else None
+        source = self._source_for(name)
+        return source.mtime(name) if source else None
+
+    def local_path(self, name):
+        # Filesystem path if the resource is (or would be) a plain file, else None
+        source = self._source_for(name) or self.sources[-1]
+        return source.local_path(name)
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.cache.clear()
+            self.missing.clear()
+        else:
+            self.cache.pop(name, None)
+            self.missing.discard(name)
+
+
+def project_root():
+    # The directory (or zip) the game package lives in
+    anchor = importlib.resources.files("game")
+    parent = getattr(anchor, "parent", None)
+    if parent is not None:
+        return parent
+    # Namespace package (no __init__.py): a MultiplexedPath without .parent
+    return pathlib.Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def default_loader():
+    root = project_root()
+    sources = []
+    for name, source_class in ((ASSET_PACK, PackSource), (ASSET_ZIP, ZipSource)):
+        path = root.joinpath(name)
+        if isinstance(path, os.PathLike) and path.is_file():
+            try:
+                sources.append(source_class(os.fspath(path)))
+            except (OSError, ValueError, zipfile.BadZipFile, struct.error) as e:
+                print(f"Error opening {name}: {e}")
+    sources.append(TraversableSource(root))
+    return ResourceLoader(sources)
+
+
+loader = default_loader()
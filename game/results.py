@@ -0,0 +1,402 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import numpy as np
+except ImportError: # Only the store needs numpy
+    np = None
+from .autoplay import AutoPlayer, DEFAULT_CART, load_systems, survival_policy
+from .stats import TurnStats
+from . import resources
+
+# Columnar store for simulation results (sweeps, balancing, bots).
+#
+# A store is a directory with two tables: runs/ (one row per game: seed,
+# character, season, loadout hash, outcome, death cause, days, km, lowest
+# temperature and sanity) and turns/ (optional trajectories: the stats after
+# every action, with the run's row number). A table is a schema.json header
+# and one raw fixed-width column file per field. Rows are only ever appended,
+# and queries memory-map the columns and scan them in chunks, so millions of
+# runs are filtered, grouped and summarized without being loaded into RAM.
+#
+# Next to them, stats.json keeps mergeable per-turn histograms (game/stats.py)
+# per character and season, summed over every recording, so percentiles of
+# the per-turn stats are there even when the trajectories are not kept.
+#
+# One process writes a store at a time (record() gathers the games of a
+# process pool and appends them itself); readers can query it meanwhile.
+# The row count is what every column file holds, so a reader, or a writer
+# that died mid-append, never sees half a row.
+
+STORE_VERSION = 1
+CHUNK = 1 << 20 # Rows per scan step
+FLUSH_ROWS = 8192 # Rows buffered per table before they are written
+BATCH = 16 # Games per worker job
+DEFAULT_DIR = "cache/results"
+
+RUN_COLUMNS = [
+    ("seed", "<i8"),
+    ("character", "S16"),
+    ("season", "S8"),
+    ("loadout", "S16"),
+    ("outcome", "S8"), # won, retreat, dead, stuck, timeout
+    ("cause", "S8"), # Death: health, sanity, cold, hunger, thirst (else empty)
+    ("days", "<i2"),
+    ("hours", "<i4"),
+    ("km", "<f4"),
+    ("steps", "<i4"),
+    ("min_temp", "<f4"),
+    ("min_sanity", "<f4"),
+]
+TURN_COLUMNS = [
+    ("run", "<i8"), # Row in runs/
+    ("step", "<i4"),
+    ("hour", "<i4"),
+    ("km", "<f4"),
+    ("temperature", "<f4"),
+    ("sanity", "<f4"),
+    ("health", "<f4"),
+    ("stamina", "<f4"),
+    ("hunger", "<f4"),
+    ("thirst", "<f4"),
+    ("weight", "<f4"),
+]
+
+
+def loadout_hash(cart):
+    blob = json.dumps(sorted(cart.items()))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def death_cause(state):
+    # Same order as GameState.check_game_over
+    if not state.game_over or state.game_won:
+        return ""
+    if state.health <= 0:
+        return "health"
+    if state.sanity <= 0:
+        return "sanity"
+    if state.temperature < 32:
+        return "cold"
+    if state.hunger <= 0:
+        return "hunger"
+    if state.thirst <= 0:
+        return "thirst"
+    return ""
+
+
+def run_record(run, seed, character_id, season, cart):
+    s = run.state
+    if s.game_won:
+        # Finishing happens at the end of the route, retreating on the way
+        outcome = "retreat" if run.sim.map_system.get_connections(s.current_node_id) else "won"
+    elif s.game_over:
+        outcome = "dead"
+    else:
+        outcome = "stuck" if run.phase == "STUCK" else "timeout"
+    return {
+        "seed": seed,
+        "character": character_id,
+        "season": season,
+        "loadout": loadout_hash(cart),
+        "outcome": outcome,
+        "cause": death_cause(s),
+        "days": s.game_time,
+        "hours": s.game_time * 24 + s.day_time,
+        "km": run.km(),
+        "steps": run.steps,
+        "min_temp": s.lowest_temp,
+        "min_sanity": s.lowest_sanity,
+    }
+
+
+class Trajectory:
+    # observe() hook for AutoPlayer.play: the stats after every action, as columns
+    def __init__(self):
+        self.columns = {name: [] for name, _ in TURN_COLUMNS if name != "run"}
+
+    def __call__(self, run):
+        s = run.state
+        c = self.columns
+        c["step"].append(run.steps)
+        c["hour"].append(s.game_time * 24 + s.day_time)
+        c["km"].append(run.km())
+        c["temperature"].append(s.temperature)
+        c["sanity"].append(s.sanity)
+        c["health"].append(s.health)
+        c["stamina"].append(s.stamina)
+        c["hunger"].append(s.hunger)
+        c["thirst"].append(s.thirst)
+        c["weight"].append(run.sim.item_system.calculate_weight(s.inventory))
+
+
+def decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value.item() if hasattr(value, "item") else value
+
+
+class Table:
+    def __init__(self, path, columns):
+        self.path = path
+        self.names = [name for name, _ in columns]
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in columns}
+        schema = {"version": STORE_VERSION, "columns": [[name, self.dtypes[name].str] for name in self.names]}
+        header = os.path.join(path, "schema.json")
+        if os.path.exists(header):
+            with open(header, "r", encoding="utf-8") as f:
+                found = json.load(f)
+            if found != schema:
+                raise ValueError(f"{path}: schema {found} does not match {schema}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            tmp = f"{header}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(schema, f, indent=1)
+            os.replace(tmp, header)
+        self.pending = {name: [] for name in self.names}
+        self.pending_rows = 0
+
+    def column_path(self, name):
+        return os.path.join(self.path, f"{name}.col")
+
+    @property
+    def rows(self):
+        # Rows in every column file (buffered rows count after flush())
+        rows = None
+        for name in self.names:
+            path = self.column_path(name)
+            n = os.path.getsize(path) // self.dtypes[name].itemsize if os.path.exists(path) else 0
+            rows = n if rows is None else min(rows, n)
+        return rows or 0
+
+    def encode(self, name, value):
+        if self.dtypes[name].kind == "S" and isinstance(value, str):
+            return value.encode("utf-8")
+        return value
+
+    def extend(self, columns):
+        # columns: {name: values}, equally long, every column of the table
+        n = len(columns[self.names[0]])
+        for name in self.names:
+            self.pending[name].extend(self.encode(name, v) for v in columns[name])
+        self.pending_rows += n
+        if self.pending_rows >= FLUSH_ROWS:
+            self.flush()
+
+    def append(self, record):
+        self.extend({name: [record[name]] for name in self.names})
+
+    def flush(self):
+        if not self.pending_rows:
+            return
+        rows = self.rows
+        for name in self.names:
+            dtype = self.dtypes[name]
+            with open(self.column_path(name), "ab") as f:
+                f.truncate(rows * dtype.itemsize) # Drops the tail of an interrupted append
+                f.write(np.asarray(self.pending[name], dtype=dtype).tobytes())
+            self.pending[name] = []
+        self.pending_rows = 0
+
+    def column(self, name, start=0, stop=None):
+        # Read-only memory map of rows start..stop of a column
+        dtype = self.dtypes[name]
+        rows = self.rows
+        stop = rows if stop is None else min(stop, rows)
+        if stop <= start:
+            return np.zeros(0, dtype)
+        return np.memmap(self.column_path(name), dtype=dtype, mode="r",
+                         offset=start * dtype.itemsize, shape=(stop - start,))
+
+    def mask(self, start, stop, where):
+        # where: {name: value | [values] | test(array) -> bool array}, all must hold
+        mask = np.ones(stop - start, dtype=bool)
+        for name, test in where.items():
+            values = self.column(name, start, stop)
+            if callable(test):
+                mask &= test(values)
+            elif isinstance(test, (list, tuple, set)):
+                mask &= np.isin(values, [self.encode(name, v) for v in test])
+            else:
+                mask &= values == self.encode(name, test)
+        return mask
+
+    def scan(self, names, where=None, chunk=CHUNK):
+        # Yields {name: array} of the matching rows, chunk by chunk
+        rows = self.rows
+        for start in range(0, rows, chunk):
+            stop = min(rows, start + chunk)
+            mask = self.mask(start, stop, where) if where else None
+            yield {name: np.array(self.column(name, start, stop)) if mask is None
+                   else self.column(name, start, stop)[mask] for name in dict.fromkeys(names)}
+
+    def count(self, where=None):
+        rows = self.rows
+        if not where:
+            return rows
+        return sum(int(self.mask(start, min(rows, start + CHUNK), where).sum()) for start in range(0, rows, CHUNK))
+
+    def select(self, names, where=None):
+        # The matching rows of some columns, in memory
+        parts = list(self.scan(names, where))
+        return {name: np.concatenate([p[name] for p in parts]) if parts else np.zeros(0, self.dtypes[name])
+                for name in names}
+
+    def group_by(self, keys, column, where=None, percentiles=()):
+        # {key tuple: {count, mean, min, max, p<q>...}} of a numeric column per
+        # group. Count, mean and extremes are accumulated chunk by chunk;
+        # percentiles keep the group's matching values of that one column.
+        groups = {}
+        for part in self.scan(list(keys) + [column], where):
+            values = part[column]
+            if not len(values):
+                continue
+            uniques, inverses = [], []
+            for key in keys:
+                u, inverse = np.unique(part[key], return_inverse=True)
+                uniques.append(u)
+                inverses.append(inverse.ravel())
+            sizes = [len(u) for u in uniques]
+            codes = np.ravel_multi_index(inverses, sizes) if keys else np.zeros(len(values), dtype=np.int64)
+            for code in np.unique(codes):
+                selected = values[codes == code]
+                index = np.unravel_index(code, sizes) if keys else ()
+                key = tuple(decode(u[i]) for u, i in zip(uniques, index))
+                g = groups.setdefault(key, {"count": 0, "sum": 0.0, "min": None, "max": None, "values": []})
+                g["count"] += len(selected)
+                g["sum"] += float(selected.sum(dtype=np.float64))
+                low, high = decode(selected.min()), decode(selected.max())
+                g["min"] = low if g["min"] is None else min(g["min"], low)
+                g["max"] = high if g["max"] is None else max(g["max"], high)
+                if percentiles:
+                    g["values"].append(selected)
+        result = {}
+        for key in sorted(groups):
+            g = groups[key]
+            row = {"count": g["count"], "mean": g["sum"] / g["count"], "min": g["min"], "max": g["max"]}
+            if percentiles:
+                values = np.concatenate(g["values"])
+                for q, value in zip(percentiles, np.percentile(values, percentiles)):
+                    row[f"p{q:g}"] = float(value)
+            result[key] = row
+        return result
+
+    def percentile(self, column, percentiles, where=None):
+        # [value per percentile] of a column over the matching rows (None if none)
+        stats = self.group_by([], column, where, percentiles).get(())
+        return [stats[f"p{q:g}"] for q in percentiles] if stats else None
+
+
+class ResultStore:
+    def __init__(self, path):
+        if np is None:
+            raise ImportError("The result store needs numpy (pip install numpy)")
+        self.path = path
+        self.runs = Table(os.path.join(path, "runs"), RUN_COLUMNS)
+        self.turns = Table(os.path.join(path, "turns"), TURN_COLUMNS)
+        self.next_run = self.runs.rows
+
+    def stats_path(self):
+        return os.path.join(self.path, "stats.json")
+
+    def load_stats(self):
+        # {(character_id, season): TurnStats} of everything recorded so far
+        if not os.path.exists(self.stats_path()):
+            return {}
+        with open(self.stats_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {tuple(key.split("/")): TurnStats.from_dict(value) for key, value in data.items()}
+
+    def add_stats(self, cell_stats):
+        merged = merge_stats(self.load_stats(), cell_stats)
+        tmp = f"{self.stats_path()}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"/".join(cell): stats.to_dict() for cell, stats in sorted(merged.items())}, f)
+        os.replace(tmp, self.stats_path())
+
+    def add(self, record, turns=None):
+        # A run_record() and optionally its Trajectory columns
+        if turns and turns["step"]:
+            self.turns.extend(dict(turns, run=[self.next_run] * len(turns["step"])))
+        self.runs.append(record)
+        self.next_run += 1
+
+    def flush(self):
+        self.runs.flush()
+        self.turns.flush()
+
+    def close(self):
+        self.flush()
+
+
+def default_path(name="results"):
+    root = resources.project_root()
+    if not isinstance(root, os.PathLike):
+        return None # Running from an archive: no default location
+    return os.path.join(os.fspath(root), DEFAULT_DIR, name)
+
+
+# --- Recording games ---
+
+def merge_stats(into, cell_stats):
+    for cell, stats in cell_stats.items():
+        if cell in into:
+            into[cell].merge(stats)
+        else:
+            into[cell] = stats
+    return into
+
+
+def play_games(player, jobs, cart, turns, policy=survival_policy):
+    # jobs: [(seed, character_id, season)] ->
+    #   ([(run_record, trajectory columns or None)], {(character_id, season): TurnStats})
+    results = []
+    cell_stats = {}
+    for seed, character_id, season in jobs:
+        trajectory = Trajectory() if turns else None
+        run = player.new_run(seed, character_id, season, cart)
+        run.sim.stats = TurnStats()
+        player.finish(run, policy, observe=trajectory)
+        results.append((run_record(run, seed, character_id, season, cart),
+                        trajectory.columns if turns else None))
+        merge_stats(cell_stats, {(character_id, season): run.sim.stats})
+    return results, cell_stats
+
+
+def _init_worker():
+    global _player
+    _player = AutoPlayer(*load_systems())
+
+
+def _play_worker(jobs, cart, turns):
+    return play_games(_player, jobs, cart, turns)
+
+
+def record(store, jobs, cart, turns=False, workers=1, progress=None):
+    # Plays the (seed, character_id, season) jobs with the survival policy
+    # and appends them to the store in job order. progress(done, total).
+    # Returns this recording's {(character_id, season): TurnStats}.
+    cart = DEFAULT_CART if cart is None else cart
+    batches = [jobs[i:i + BATCH] for i in range(0, len(jobs), BATCH)]
+    cell_stats = {}
+
+    def collect(outputs):
+        done = 0
+        for games, batch_stats in outputs:
+            for row, trajectory in games:
+                store.add(row, trajectory)
+            merge_stats(cell_stats, batch_stats)
+            done += len(games)
+            if progress:
+                progress(done, len(jobs))
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_play_worker, batch, cart, turns) for batch in batches]
+            collect(future.result() for future in futures)
+    else:
+        player = AutoPlayer(*load_systems())
+        collect(play_games(player, batch, cart, turns) for batch in batches)
+    store.flush()
+    store.add_stats(cell_stats)
+    return cell_stats
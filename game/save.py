@@ -0,0 +1,175 @@
+import json
+import sys
+import zlib
+import queue
+import threading
+from .storage import default_storage
+
+# Save subsystem.
+# - Versioned envelope: {"version": N, "state": {...}} with migration hooks
+#   for older files (v1 is the original flat, unversioned savegame.json).
+# - Pluggable storage (game/storage.py): atomic files on desktop, LocalStorage
+#   in the browser. Everything here goes through the module-level `storage`.
+# - Optional zlib compression, detected automatically on load.
+# - Background writer thread so saving never stalls a frame. The browser
+#   build (pygbag) has no threads and writes synchronously.
+
+SCHEMA_VERSION = 2
+COMPRESS_SAVES = False
+
+ZLIB_MAGIC = (b"\x78\x01", b"\x78\x5e", b"\x78\x9c", b"\x78\xda")
+
+
+class SaveError(Exception):
+    pass
+
+
+# --- Migrations ---
+# MIGRATIONS[v] upgrades a version-v state dict to version v + 1.
+
+def _migrate_v1(state):
+    # v1 saves never stored statuses, teleport_used or the end flags
+    state.setdefault("statuses", [])
+    state.setdefault("teleport_used", False)
+    state.setdefault("game_over", False)
+    state.setdefault("game_won", False)
+    return state
+
+MIGRATIONS = {
+    1: _migrate_v1,
+}
+
+
+def migrate(version, state):
+    if version > SCHEMA_VERSION:
+        raise SaveError(f"Save version {version} is newer than this game ({SCHEMA_VERSION})")
+    while version < SCHEMA_VERSION:
+        step = MIGRATIONS.get(version)
+        if step is None:
+            raise SaveError(f"No migration from save version {version}")
+        state = step(state)
+        version += 1
+    return state
+
+
+# --- Encoding ---
+
+def encode(state_dict, compress=COMPRESS_SAVES):
+    envelope = {"version": SCHEMA_VERSION, "state": state_dict}
+    data = json.dumps(envelope, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if compress:
+        data = zlib.compress(data, 6)
+    return data
+
+
+def decode(data):
+    if data[:2] in ZLIB_MAGIC:
+        data = zlib.decompress(data)
+    envelope = json.loads(data.decode("utf-8"))
+    if not isinstance(envelope, dict):
+        raise SaveError("Save file is not an object")
+    if "version" not in envelope:
+        # Legacy flat savegame.json
+        return migrate(1, envelope)
+    return migrate(envelope["version"], envelope.get("state", {}))
+
+
+# --- Storage I/O ---
+
+storage = default_storage()
+
+
+def set_storage(backend):
+    # Swap the backend (e.g. MemoryStorage for headless runs)
+    global storage
+    storage = backend
+
+
+def read_file(filename):
+    return storage.read(filename)
+
+
+def exists(filename):
+    return storage.exists(filename)
+
+
+def write(filename, data, background=False):
+    # Background writes go through the writer thread where there is one
+    if background:
+        writer.submit(filename, data)
+    else:
+        storage.write(filename, data)
+
+
+def write_state(filename, state_dict, compress=COMPRESS_SAVES):
+    write(filename, encode(state_dict, compress))
+
+
+def read_state(filename):
+    try:
+        return decode(read_file(filename))
+    except (ValueError, zlib.error) as e:
+        raise SaveError(f"Corrupt save file {filename}: {e}")
+
+
+# --- Background writer ---
+
+THREADS_AVAILABLE = sys.platform not in ("emscripten", "wasi")
+
+
+class SaveWriter:
+    def __init__(self, background=THREADS_AVAILABLE):
+        self.background = background
+        self._queue = queue.Queue()
+        self._pending = {} # filename -> latest bytes not yet written
+        self._lock = threading.Lock()
+        self._results = [] # [(filename, ok, error)]
+        self._thread = None
+
+    def submit(self, filename, data):
+        # Data must already be encoded (i.e. a snapshot); only I/O happens off-thread
+        if not self.background:
+            self._write(filename, data)
+            return
+
+        with self._lock:
+            already_queued = filename in self._pending
+            self._pending[filename] = data # Newer saves replace queued ones
+        if not already_queued:
+            self._queue.put(filename)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            filename = self._queue.get()
+            with self._lock:
+                data = self._pending.pop(filename, None)
+            if data is not None:
+                self._write(filename, data)
+            self._queue.task_done()
+
+    def _write(self, filename, data):
+        # Deferred backends (browser) report back once the data is committed
+        storage.write(filename, data, self._done)
+
+    def _done(self, filename, ok, error):
+        if not ok:
+            print(f"Save failed: {error}")
+        with self._lock:
+            self._results.append((filename, ok, error))
+
+    def poll(self):
+        # Completed writes since the last poll, for UI feedback
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
+    def flush(self):
+        # Block until every queued write is on disk (quit / tests)
+        if self.background and self._thread is not None:
+            self._queue.join()
+
+
+writer = SaveWriter()
@@ -0,0 +1,14 @@
+# How well a played-out game went, shared by the MCTS player's rollouts
+# (game/mcts.py) and the loadout optimizer's fitness (game/loadout.py).
+
+DEATH_DISCOUNT = 0.25 # Progress counts this much if the hiker died
+
+
+def reward(run, total_km):
+    # 1 for a finished trip, else progress along the route; dying cuts it
+    if run.state.game_won:
+        return 1.0
+    progress = run.km() / total_km if total_km else 0.0
+    if run.state.game_over:
+        return progress * DEATH_DISCOUNT
+    return progress
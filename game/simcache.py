@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import random
+import hashlib
+import importlib
+from . import config, resources, simulation
+from .bundle import SOURCES
+from .systems import DataLoader
+
+# Content-addressed cache of simulation results.
+# An entry's key is a hash of everything its numbers depend on: the data
+# files (items, events, map nodes, tuned drains), the config.py constants,
+# the rules (the source of the rule modules) and the configuration the
+# caller passes (seeds, character, season, loadout, parameter values...).
+# Changing any of them gives new keys, so there is nothing to invalidate:
+# stale entries are simply never asked for again and age out. Text the rules
+# never read (descriptions, icons, choice texts, messages) is left out of the
+# data hash, so rewording content keeps the cache.
+#
+# Entries are small JSON files under cache/sim/, written to a temporary file
+# and renamed, so any number of processes can read and write at once (two
+# writers of one key write the same value). Reads refresh the file's mtime;
+# when the directory grows past max_bytes the least recently used entries
+# are deleted, along with temporary files a killed process left behind.
+
+CACHE_VERSION = 1 # Bump when the stored values change meaning
+CACHE_DIR = "cache/sim"
+MAX_BYTES = 256 * 1024 * 1024
+EVICT_EVERY = 256 # Writes between size checks
+EVICT_TO = 0.8 # Eviction stops below this share of max_bytes
+TEMP_MAX_AGE = 3600 # Seconds; an older temporary file was left by a killed writer
+PRESENTATION = {"description", "icon", "text", "message"}
+RULE_MODULES = ["game.state", "game.simulation", "game.effects", "game.systems", "game.bundle", "game.autoplay",
+                "game.tuning"]
+
+_content_key = None
+
+
+def strip_presentation(value):
+    if isinstance(value, dict):
+        return {k: strip_presentation(v) for k, v in value.items() if k not in PRESENTATION}
+    if isinstance(value, list):
+        return [strip_presentation(v) for v in value]
+    return value
+
+
+def content_key():
+    # Hash of the data, constants and rules, once per process
+    global _content_key
+    if _content_key is None:
+        data = {name: strip_presentation(DataLoader.load_json(filename)) for name, filename in SOURCES.items()}
+        constants = {name: value for name, value in vars(config).items() if name.isupper()}
+        constants["balance"] = simulation.load_balance()
+        rules = {}
+        for name in RULE_MODULES:
+            path = getattr(importlib.import_module(name), "__file__", None)
+            try:
+                with open(path, "rb") as f:
+                    rules[name] = hashlib.sha1(f.read()).hexdigest()
+            except (OSError, TypeError): # No source (frozen build): the version alone
+                rules[name] = None
+        blob = json.dumps([CACHE_VERSION, data, constants, rules], sort_keys=True, default=str)
+        _content_key = hashlib.sha1(blob.encode("utf-8")).hexdigest()
+    return _content_key
+
+
+class SimCache:
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, configuration):
+        blob = json.dumps([content_key(), configuration], sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, configuration):
+        # The stored value, or None
+        path = self.entry_path(self.key(configuration))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path) # Recently used
+        except (OSError, ValueError): # Missing, evicted meanwhile or half-copied by hand
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, configuration, value):
+        path = self.entry_path(self.key(configuration))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}_{random.getrandbits(32):08x}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+        self.writes += 1
+        if self.writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def scan(self):
+        # Every file in the shard directories
+        if not os.path.isdir(self.path):
+            return
+        for shard in os.scandir(self.path):
+            if shard.is_dir():
+                yield from os.scandir(shard.path)
+
+    def entries(self):
+        # [(mtime, size, path)] of every entry
+        found = []
+        for entry in self.scan():
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError: # Deleted by another process
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def sweep(self):
+        # Deletes the temporary files of put()s that never finished; returns how many
+        cutoff = time.time() - TEMP_MAX_AGE
+        removed = 0
+        for entry in self.scan():
+            if ".json.tmp" in entry.name:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError: # Renamed or removed meanwhile
+                    pass
+        return removed
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        # Deletes least recently used entries while over max_bytes; returns how many
+        self.sweep()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError: # Another process got there first
+                pass
+            total -= size
+        return removed
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def default_cache(max_bytes=MAX_BYTES):
+    root = resources.project_root()
+    if not isinstance(root, os.PathLike):
+        return None # Running from an archive: no cache
+    return SimCache(os.path.join(os.fspath(root), CACHE_DIR), max_bytes)
@@ -0,0 +1,676 @@
+import json
+import random
+from .config import *
+from . import state as body_rules
+from . import resources
+
+# Headless rules core.
+# Holds the turn rules that used to live on Game so they can run without a
+# screen: the game UI, batch simulation and tools all drive the same code.
+
+# Camp (sleep) hourly drains
+SLEEP_HUNGER_DRAIN = 1.0
+SLEEP_THIRST_DRAIN = 1.5
+
+# Passive drain per turn (check_turn_end)
+TURN_HUNGER_DRAIN = 2
+TURN_THIRST_DRAIN = 3
+
+# Tuned values of the drains above, read at import (tools.tune_difficulty
+# --apply writes them); a drain missing from the file keeps its default
+BALANCE_FILE = "data/balance.json"
+BALANCE_CONSTANTS = ["TURN_HUNGER_DRAIN", "TURN_THIRST_DRAIN", "SLEEP_HUNGER_DRAIN", "SLEEP_THIRST_DRAIN"]
+
+
+def load_balance():
+    # {constant: value} from BALANCE_FILE, {} without one
+    text = resources.loader.read_text(BALANCE_FILE)
+    if text is None:
+        return {}
+    try:
+        balance = json.loads(text)
+    except ValueError as e:
+        print(f"Error loading {BALANCE_FILE}: {e}")
+        return {}
+    return {name: balance[name] for name in BALANCE_CONSTANTS
+            if isinstance(balance.get(name), (int, float)) and not isinstance(balance[name], bool)}
+
+
+globals().update(load_balance())
+
+# Hike warning thresholds
+WARN_HEALTH = 30
+WARN_STAMINA = 20
+WARN_SANITY = 20
+
+# Scavenge loot tables
+SCAVENGE_COMMON = ["water_bottle", "food_instant_noodles", "food_naan", "candy"]
+SCAVENGE_RARE = ["gas", "batteries", "medicine", "food_beef_jerky"]
+SCAVENGE_PRECIOUS = ["first_aid_kit", "liquor", "food_high_energy"]
+
+# Logged action name -> Simulation method
+ACTIONS = {
+    "buy": "checkout",
+    "hike": "hike",
+    "rest": "rest",
+    "camp": "camp",
+    "choose": "choose",
+    "close": "close_event",
+    "use": "consume",
+    "snow": "eat_snow",
+    "travel": "travel",
+    "teleport": "teleport",
+    "retreat": "retreat",
+    "finish": "finish",
+}
+
+# Hiking slows down above ALTITUDE_SLOW_START: the speed factor drops by 1
+# over ALTITUDE_SLOW_RANGE metres, down to MIN_ALTITUDE_FACTOR
+ALTITUDE_SLOW_START = 2500
+ALTITUDE_SLOW_RANGE = 5000
+MIN_ALTITUDE_FACTOR = 0.5
+
+TERRAIN_FACTORS = {
+    'forest': 0.8,
+    'rocky': 0.6,
+    'ridge': 0.5,
+    'danger': 0.4,
+    'meadow': 1.0,
+}
+
+
+class Simulation:
+    def __init__(self, state, item_system, map_system, weather_system, event_system=None, rng=None):
+        self.state = state
+        self.item_system = item_system
+        self.map_system = map_system
+        self.weather_system = weather_system
+        self.event_system = event_system
+        # Every random draw goes through this, so a seed plus the action log
+        # reproduces a run exactly (see game/replay.py)
+        self.rng = rng if rng is not None else random.Random()
+        self.log = None # ActionLog being recorded, or None
+        self.current_event = None # Event waiting for a choice
+        self.stats = None # stats.TurnStats fed every turn, or None
+        # (altitude, season, weather) -> [(env_temp, weather, wind_level)] per hour of day
+        self._env_tables = {}
+
+    # --- Environment ---
+
+    def gear_protection(self):
+        total_protection = 0
+        protection = self.item_system.temp_protection
+        for item_id in self.state.inventory:
+            if item_id in protection:
+                total_protection += protection[item_id]
+        return total_protection
+
+    def environment_at(self, altitude, hour, weather):
+        # Temp: Season base, -6.5C per 1000m
+        season_base = SEASONS[self.state.season]['base_temp']
+        base_temp = season_base - (altitude / 1000.0) * 6.5
+
+        # Weather effect
+        weather_temp = self.weather_system.get_weather_effects(weather).get('temp', 0)
+
+        # Time of day effect (Night is colder)
+        time_temp = 0
+        if hour < 6 or hour > 20:
+            time_temp = -5
+
+        env_temp = base_temp + weather_temp + time_temp
+
+        # Logic: If temp < 0 and raining, turn to snow
+        if env_temp < 0 and weather == 'rain':
+            weather = 'snow'
+            weather_temp = self.weather_system.get_weather_effects(weather).get('temp', 0)
+            env_temp = base_temp + weather_temp + time_temp
+
+        # Wind
+        base_wind = 1
+        if altitude > 2500: base_wind += 1
+        if altitude > 3000: base_wind += 1
+        if altitude > 3400: base_wind += 1
+
+        if weather == "storm": base_wind += 4
+        elif weather == "snow": base_wind += 2
+        elif weather == "rain": base_wind += 1
+
+        return env_temp, weather, min(10, base_wind)
+
+    def environment_table(self, altitude, weather):
+        # Hourly environment for a whole day, computed once per (altitude, season, weather)
+        key = (altitude, self.state.season, weather)
+        table = self._env_tables.get(key)
+        if table is None:
+            table = [self.environment_at(altitude, hour, weather) for hour in range(24)]
+            self._env_tables[key] = table
+        return table
+
+    def update_environment(self):
+        node = self.map_system.get_node(self.state.current_node_id)
+        if not node: return
+
+        env_temp, weather, wind = self.environment_table(node['altitude'], self.state.weather)[self.state.day_time]
+        self.state.env_temp = env_temp
+        self.state.weather = weather
+        self.state.wind_level = wind
+
+        # Base comfort threshold is 10C. Gear lowers this threshold.
+        gear_warmth = 10.0 - self.gear_protection()
+
+        self.state.update_body_temp(self.state.env_temp, gear_warmth)
+        self.state.update_sanity_drain()
+
+    # --- Time skip ---
+
+    def fast_forward(self, hours):
+        # Advances the sleeping rules (camp) by `hours` in one call.
+        # Equivalent to `hours` iterations of
+        #   update_time(1); update_environment(); sleep drains; clamp
+        # but runs on locals against the precomputed hourly environment table.
+        # Stops at the exact hour health reaches 0 and returns the hours elapsed.
+        # Once a full day repeats exactly (stats pinned at their limits) the
+        # remaining whole days are skipped, so multi-day rests cost about as
+        # much as a single day.
+        s = self.state
+        node = self.map_system.get_node(s.current_node_id)
+        if not node or hours <= 0:
+            return 0
+
+        altitude = node['altitude']
+        gw = 10.0 - self.gear_protection()
+        cold_loss = body_rules.COLD_HEAT_LOSS
+        hungry_loss = body_rules.HUNGRY_HEAT_LOSS
+        starving_loss = body_rules.STARVING_HEAT_LOSS
+
+        stamina = s.stamina
+        hunger = s.hunger
+        thirst = s.thirst
+        temp = s.temperature
+        sanity = s.sanity
+        health = s.health
+        lowest_temp = s.lowest_temp
+        lowest_sanity = s.lowest_sanity
+        weather = s.weather
+        day_time = s.day_time
+        game_time = s.game_time
+        action_points = s.action_points
+        env_temp = s.env_temp
+        wind = s.wind_level
+
+        table = self.environment_table(altitude, weather)
+        day_mark = None # Stats one whole day ago, for steady-state detection
+        elapsed = 0
+
+        while elapsed < hours:
+            # update_time(1)
+            day_time += 1
+            if day_time >= 24:
+                day_time -= 24
+                game_time += 1
+                action_points = DAILY_ACTION_POINTS
+
+            # update_environment()
+            env_temp, new_weather, wind = table[day_time]
+            if new_weather != weather:
+                weather = new_weather
+                table = self.environment_table(altitude, weather)
+
+            # update_body_temp()
+            heat_loss = 0
+            if env_temp < gw:
+                heat_loss += (gw - env_temp) * cold_loss
+            if hunger < 20:
+                heat_loss += hungry_loss
+            if hunger <= 0:
+                heat_loss += starving_loss
+            if heat_loss > 0:
+                temp -= heat_loss
+                if hunger > 80:
+                    temp += 0.02
+            else:
+                recover_rate = 0
+                if temp < 37.0:
+                    if env_temp >= gw:
+                        recover_rate += 0.1
+                    if hunger > 70:
+                        recover_rate += 0.1
+                    if hunger > 90:
+                        recover_rate += 0.1
+                temp += recover_rate
+            stamina = max(0, min(MAX_STAMINA, stamina))
+            hunger = max(0, min(MAX_HUNGER, hunger))
+            thirst = max(0, min(MAX_THIRST, thirst))
+            sanity = max(0, min(MAX_SANITY, sanity))
+            health = max(0, min(MAX_HEALTH, health))
+            temp = max(30.0, min(MAX_TEMP, temp))
+            if temp < lowest_temp:
+                lowest_temp = temp
+
+            # update_sanity_drain()
+            drain = 0
+            if temp < 35: drain += 2
+            if temp < 34: drain += 5
+            if health < 50: drain += 1
+            if hunger < 20: drain += 1
+            if thirst < 20: drain += 1
+            if drain > 0:
+                sanity -= drain
+            elif hunger > 80 and thirst > 80 and temp >= 36.5:
+                sanity += 1
+            if sanity < lowest_sanity:
+                lowest_sanity = sanity
+
+            # Sleep drains
+            if temp < 35.0:
+                health -= 2 # Lose health if sleeping cold
+            if temp < 32.0:
+                health -= 5 # Critical cold
+            hunger -= SLEEP_HUNGER_DRAIN
+            thirst -= SLEEP_THIRST_DRAIN
+            if hunger < 10 or thirst < 10:
+                sanity -= 0.5
+
+            stamina = max(0, min(MAX_STAMINA, stamina))
+            hunger = max(0, min(MAX_HUNGER, hunger))
+            thirst = max(0, min(MAX_THIRST, thirst))
+            sanity = max(0, min(MAX_SANITY, sanity))
+            health = max(0, min(MAX_HEALTH, health))
+            temp = max(30.0, min(MAX_TEMP, temp))
+            elapsed += 1
+
+            if health <= 0:
+                break # Died in sleep
+
+            # Steady state: if a whole day passed without any change, every
+            # further whole day is identical too, so jump over them.
+            if elapsed % 24 == 0:
+                snapshot = (stamina, hunger, thirst, temp, sanity, health, lowest_temp, lowest_sanity, weather)
+                if snapshot == day_mark:
+                    skip_days = (hours - elapsed) // 24
+                    game_time += skip_days
+                    elapsed += skip_days * 24
+                day_mark = snapshot
+
+        s.stamina = stamina
+        s.hunger = hunger
+        s.thirst = thirst
+        s.temperature = temp
+        s.sanity = sanity
+        s.health = health
+        s.lowest_temp = lowest_temp
+        s.lowest_sanity = lowest_sanity
+        s.weather = weather
+        s.day_time = day_time
+        s.game_time = game_time
+        s.action_points = action_points
+        s.env_temp = env_temp
+        s.wind_level = wind
+        return elapsed
+
+    # --- Actions ---
+
+    def hike_warnings(self):
+        warnings = []
+        if self.state.health < WARN_HEALTH: warnings.append("健康值过低")
+        if self.state.stamina < WARN_STAMINA: warnings.append("体力过低") # Use fixed threshold for warning
+        if self.state.sanity < WARN_SANITY: warnings.append("SAN值过低")
+        return warnings
+
+    def hike_step(self):
+        # One hour of hiking. Caller checks action points / stamina first.
+        s = self.state
+        base_speed = 2.0 # km/h
+
+        # Modifiers
+        current_node = self.map_system.get_node(s.current_node_id)
+        terrain = current_node.get('terrain', 'normal')
+        altitude = current_node.get('altitude', 2000)
+
+        terrain_factor = TERRAIN_FACTORS.get(terrain, 1.0)
+        altitude_factor = max(MIN_ALTITUDE_FACTOR, 1.0 - (max(0, altitude - ALTITUDE_SLOW_START) / ALTITUDE_SLOW_RANGE))
+
+        weight = self.item_system.calculate_weight(s.inventory)
+        weight_factor = 1.0
+        if weight > MAX_WEIGHT_BASE:
+            overweight = weight - MAX_WEIGHT_BASE
+            weight_factor = max(0.5, 1.0 - (overweight * 0.05))
+
+        weather_effects = self.weather_system.get_weather_effects(s.weather)
+
+        # Wind Factor
+        wind_factor = 1.0
+        if s.wind_level >= 6: wind_factor = 0.8
+        if s.wind_level >= 8: wind_factor = 0.5
+
+        # Temp Factor
+        temp_factor = 1.0
+        if s.env_temp < -10: temp_factor = 0.9
+        if s.env_temp < -20: temp_factor = 0.7
+
+        # If weight is low, give bonus
+        if weight < MAX_WEIGHT_BASE * 0.8:
+            weight_factor = 1.1 # 10% faster if light
+
+        # Random Factor (0.8 - 1.2)
+        random_factor = self.rng.uniform(0.8, 1.2)
+
+        # Status Factor
+        status_factor = 1.0
+        if s.health > 80 and s.stamina > 80:
+            status_factor += 0.2
+        if s.health < 50:
+            status_factor -= 0.2
+        if s.hunger < 30:
+            status_factor -= 0.1
+        if s.thirst < 30:
+            status_factor -= 0.1
+
+        # Character Buffs: Move Speed
+        char_buffs = CHARACTERS[s.character_id]['buffs']
+        if 'move_speed_mult' in char_buffs:
+            status_factor *= char_buffs['move_speed_mult']
+
+        dist = base_speed * terrain_factor * altitude_factor * weight_factor * wind_factor * temp_factor * random_factor * status_factor
+
+        s.distance_to_next_node -= dist
+        if s.distance_to_next_node < 0: s.distance_to_next_node = 0
+
+        # Stamina Cost
+        wind_cost = 1.0 + (s.wind_level * 0.05)
+        cold_cost = 1.0
+        if s.env_temp < 0: cold_cost += abs(s.env_temp) * 0.02
+
+        stamina_cost = 15 * (1.0 + (1.0 - terrain_factor) + (1.0 - altitude_factor)) * weather_effects.get('stamina_cost', 1.0) * wind_cost * cold_cost
+
+        # Character Buffs: Stamina Cost
+        if 'stamina_cost_mult' in char_buffs:
+            stamina_cost *= char_buffs['stamina_cost_mult']
+
+        s.stamina -= stamina_cost
+        s.action_points -= 1
+        s.update_time(1)
+        self.update_environment()
+        return dist
+
+    def rest_step(self):
+        s = self.state
+        s.stamina = min(s.stamina + 15, MAX_STAMINA)
+        # Rest restores some body temp if not starving
+        if s.hunger > 30:
+            s.temperature = min(s.temperature + 0.5, 37.0)
+
+        s.update_time(1)
+        self.update_environment()
+        s.action_points -= 1
+
+    def turn_end(self):
+        # Passive drain, returns True if the game is over
+        hunger_drain = TURN_HUNGER_DRAIN
+        thirst_drain = TURN_THIRST_DRAIN
+
+        # Character Buffs: Hunger Drain
+        char_buffs = CHARACTERS[self.state.character_id]['buffs']
+        if 'hunger_drain_mult' in char_buffs:
+            hunger_drain *= char_buffs['hunger_drain_mult']
+
+        self.state.hunger -= hunger_drain
+        self.state.thirst -= thirst_drain
+        self.state.clamp_stats()
+        return self.state.check_game_over()
+
+    def check_event(self, phase):
+        if self.event_system is None:
+            return None
+        return self.event_system.check_event(self.state, self.map_system, context={'phase': phase}, rng=self.rng)
+
+    def camp(self, hours_to_sleep=12):
+        self._record("camp", hours_to_sleep)
+        s = self.state
+        result = {'hours': 0, 'poor_rest': False, 'spoiled': [], 'event': None}
+
+        # Base Restoration
+        rest_stamina = 40
+        rest_sanity = 10
+
+        # Penalties for poor condition
+        if s.hunger < 30 or s.thirst < 30:
+            rest_stamina *= 0.5
+            rest_sanity *= 0.5
+            result['poor_rest'] = True
+
+        s.stamina += rest_stamina
+        s.sanity += rest_sanity
+
+        # Temperature Restoration
+        # If Hunger > 20 -> Restore to near max, hungry bodies barely warm up
+        if s.hunger > 20:
+             if s.temperature < 35:
+                 s.temperature += 2.0
+             else:
+                 s.temperature = min(37.0, s.temperature + 1.0)
+        else:
+            if s.temperature < 35:
+                s.temperature += 0.5
+
+        s.clamp_stats()
+
+        # Sleep, with the hourly drain integrated in one step
+        result['hours'] = self.fast_forward(hours_to_sleep)
+
+        s.weather = self.weather_system.next_weather(s.weather, s.season, self.rng)
+        s.action_points = DAILY_ACTION_POINTS
+
+        # Daily Spoilage Check
+        spoil_chances = self.item_system.spoil_chances
+        for item_id in list(s.inventory.keys()):
+            if item_id in spoil_chances:
+                if self.rng.random() < spoil_chances[item_id]:
+                    s.remove_item(item_id, 1)
+                    result['spoiled'].append(self.item_system.get_item(item_id)['name'])
+
+        self._turn_stats()
+
+        # Camp events; no passive drain after sleeping, only the death check
+        result['event'] = self.check_event('camp')
+        if result['event']:
+            self.trigger_event(result['event'])
+        else:
+            s.check_game_over()
+        return result
+
+    # --- Turn actions ---
+    # One method per player action. Each is recorded in self.log, so replaying
+    # the log from the same seed calls exactly the same rules in the same order.
+    # Actions return what the UI needs to report; phases stay on Game.
+
+    def _record(self, *action):
+        if self.log is not None:
+            self.log.append(action)
+
+    def _turn_stats(self, dist=None):
+        # After the hour-taking actions (hike, rest, camp)
+        stats = self.stats
+        if stats is not None:
+            stats.turn(self.state, self.item_system.calculate_weight(self.state.inventory))
+            if dist is not None:
+                stats.hike(dist)
+
+    def start(self, character_id, season):
+        # Character and season picked on the setup screen (state already reset)
+        s = self.state
+        s.character_id = character_id
+        s.season = season
+        if self.stats is not None:
+            self.stats.reset()
+
+        buffs = CHARACTERS[character_id]['buffs']
+        if 'max_stamina' in buffs:
+            s.stamina = buffs['max_stamina']
+        s.env_temp = SEASONS[season]['base_temp']
+
+    def checkout(self, cart):
+        # Buys the cart and sets off. Returns False if it is over budget.
+        s = self.state
+        total_cost = sum(self.item_system.get_item(i)['price'] * c for i, c in cart.items())
+        if total_cost > s.money:
+            return False
+        self._record("buy", dict(cart))
+
+        s.money -= total_cost
+        for item_id, count in cart.items():
+            s.add_item(item_id, count)
+
+        # Initialize distance for the first node
+        current_node = self.map_system.get_node(s.current_node_id)
+        if current_node and 'distance_to_next' in current_node:
+            s.distance_to_next_node = current_node['distance_to_next']
+        else:
+            s.distance_to_next_node = 0
+        self.update_environment()
+        return True
+
+    def trigger_event(self, event):
+        self.current_event = event
+        self.state.triggered_events.add(event['event_id'])
+
+    def hike(self):
+        # One hour of hiking plus its event roll / passive drain.
+        # Returns (distance, event or None).
+        self._record("hike")
+        dist = self.hike_step()
+        event = self.check_event('hike')
+        if event:
+            self.trigger_event(event)
+        else:
+            self.turn_end()
+        self._turn_stats(dist)
+        return dist, event
+
+    def rest(self):
+        self._record("rest")
+        self.rest_step()
+        event = self.check_event('rest')
+        if event:
+            self.trigger_event(event)
+        else:
+            self.turn_end()
+        self._turn_stats()
+        return event
+
+    def choose(self, choice_index):
+        # Applies a choice of the pending event.
+        # Returns {'effect': EffectResult or None, 'scavenge': scavenge() result or None}
+        self._record("choose", choice_index)
+        effect = self.event_system.get_choice_effect(self.current_event, choice_index).resolve(self.rng)
+
+        # Special Action: Scavenge (ends the event itself)
+        if effect.special_action == 'scavenge':
+            return {'effect': None, 'scavenge': self.scavenge()}
+
+        result = effect.apply(self.state)
+        if result.weather_changed:
+            self.update_environment()
+        return {'effect': result, 'scavenge': None}
+
+    def close_event(self):
+        # Leaving the event result screen ends the turn
+        self._record("close")
+        self.current_event = None
+        return self.turn_end()
+
+    def scavenge(self):
+        # Costs 1h (the event has no action_points effect of its own).
+        # Returns {'ok': False} without AP, else {'ok': True, 'item': item_id or None}.
+        s = self.state
+        if s.action_points < 1:
+            return {'ok': False, 'item': None}
+
+        s.action_points -= 1
+        s.update_time(1)
+
+        # Karma affects luck: 20 Karma = +0.1 to the roll
+        luck_modifier = s.karma * 0.005
+        roll = self.rng.random() + luck_modifier
+
+        found_item = None
+        if roll < 0.1:
+            pass # Nothing found
+        elif roll < 0.5: # 40% Common
+            found_item = self.rng.choice(SCAVENGE_COMMON)
+        elif roll < 0.8: # 30% Rare
+            found_item = self.rng.choice(SCAVENGE_RARE)
+        else: # 20% Precious
+            found_item = self.rng.choice(SCAVENGE_PRECIOUS)
+
+        if found_item:
+            s.add_item(found_item)
+
+        self.current_event = None
+        self.turn_end()
+        return {'ok': True, 'item': found_item}
+
+    def consume(self, item_id, cooked=True):
+        # Eats / uses one item. Uncooked food only gives half. Returns True if used.
+        self._record("use", item_id, cooked)
+        s = self.state
+        item = self.item_system.get_item(item_id)
+        if not s.consume_item(item, self.item_system.get_item_effect(item_id)):
+            return False
+        s.remove_item(item_id)
+
+        if not cooked:
+            # consume_item applied the full effect, take half of it back
+            for effect, value in item['effects'].items():
+                if isinstance(value, (int, float)) and effect in ['hunger', 'sanity', 'health', 'stamina']:
+                    half_val = value * 0.5
+                    if effect == 'hunger': s.hunger -= half_val
+                    elif effect == 'sanity': s.sanity -= half_val
+                    elif effect == 'health': s.health -= half_val
+                    elif effect == 'stamina': s.stamina -= half_val
+        return True
+
+    def eat_snow(self):
+        self._record("snow")
+        s = self.state
+        s.thirst = min(s.thirst + 20, MAX_THIRST)
+        s.temperature -= 2.0
+        s.health -= 5
+        s.sanity -= 10
+        return self.turn_end()
+
+    def travel(self, node_id):
+        # Arrive at the node and set up the next leg
+        self._record("travel", node_id)
+        return self._arrive(node_id)
+
+    def _arrive(self, node_id):
+        target_node = self.map_system.get_node(node_id)
+        self.state.current_node_id = node_id
+        self.state.distance_to_next_node = target_node.get('distance_to_next', 0)
+        return target_node
+
+    def teleport(self):
+        # Student ability: jump to the first connection (usually the only one).
+        # Returns the node arrived at, or None.
+        connections = self.map_system.get_connections(self.state.current_node_id)
+        if self.state.teleport_used or not connections:
+            return None
+        self._record("teleport")
+        self.state.teleport_used = True
+        return self._arrive(connections[0]['node_id'])
+
+    def retreat(self):
+        self._record("retreat")
+        self.state.game_won = True # Technically survived
+        self.state.status_message = f"你选择了下撤，保住了性命。剩余资金 {self.state.money} 已保存。"
+
+    def finish(self):
+        self._record("finish")
+        self.state.game_won = True
+        self.state.status_message = "恭喜你完成了鳌太穿越！"
+
+    def apply(self, action):
+        # Runs a logged action tuple, e.g. ("hike",) or ("use", "candy", True)
+        return getattr(self, ACTIONS[action[0]])(*action[1:])
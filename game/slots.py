@@ -0,0 +1,168 @@
+import os
+import json
+import time
+from . import save
+from .replay import log_filename
+
+# Save slots.
+# Each slot is a normal save file (plus its action log and a small PNG
+# thumbnail). A single index file keeps the metadata the menu shows, so the
+# slot list costs one read no matter how many slots there are; the full save
+# is only read once the player picks a slot.
+#
+#   saves/index.json  {"version": 1, "next_id": 3, "slots": {"1": {...}, "2": {...}}}
+#   saves/slot_1.json, saves/slot_1.log, saves/slot_1.png
+
+SAVE_DIR = "saves"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+LEGACY_SAVE = "savegame.json" # Single-slot saves from older versions
+
+THUMBNAIL_SIZE = (160, 90)
+SLOTS_PER_PAGE = 5 # Rows on the menu's slot list
+
+
+class SlotManager:
+    def __init__(self, directory=SAVE_DIR):
+        self.directory = directory
+        self.index_file = os.path.join(directory, INDEX_NAME)
+        self._index = None # Loaded on first use
+        self._thumbnails = {} # slot_id -> PNG bytes (or None), read lazily
+
+    # --- Index ---
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _load_index(self):
+        if save.exists(self.index_file):
+            try:
+                index = json.loads(save.read_file(self.index_file).decode("utf-8"))
+                if index.get("version") == INDEX_VERSION:
+                    return index
+            except (OSError, ValueError) as e:
+                print(f"Error loading slot index: {e}")
+            # Unreadable index: rebuild it from the slot files themselves
+            return self.rebuild_index()
+
+        index = {"version": INDEX_VERSION, "next_id": 1, "slots": {}}
+        if save.exists(LEGACY_SAVE):
+            # Adopt the old savegame.json as the first slot, in place
+            try:
+                meta = slot_metadata(save.read_state(LEGACY_SAVE), time.time())
+                meta["file"] = LEGACY_SAVE
+                index["slots"]["1"] = meta
+                index["next_id"] = 2
+            except (OSError, save.SaveError) as e:
+                print(f"Error importing {LEGACY_SAVE}: {e}")
+        return index
+
+    def rebuild_index(self):
+        # Slow path: reads every slot file once
+        index = {"version": INDEX_VERSION, "next_id": 1, "slots": {}}
+        prefix = os.path.join(self.directory, "slot_")
+        for path in save.storage.keys(prefix):
+            if not path.endswith(".json"):
+                continue
+            slot_id = path[len(prefix):-len(".json")]
+            try:
+                meta = slot_metadata(save.read_state(path), 0)
+            except (OSError, save.SaveError) as e:
+                print(f"Skipping unreadable slot {path}: {e}")
+                continue
+            meta["file"] = path
+            index["slots"][slot_id] = meta
+            if slot_id.isdigit():
+                index["next_id"] = max(index["next_id"], int(slot_id) + 1)
+        return index
+
+    def _write_index(self, background):
+        data = json.dumps(self.index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        save.write(self.index_file, data, background)
+
+    # --- Slots ---
+
+    def list_slots(self):
+        # [(slot_id, metadata)], most recently played first. Only the index is read.
+        slots = self.index["slots"]
+        return sorted(slots.items(), key=lambda kv: kv[1].get("last_played", 0), reverse=True)
+
+    def has_slots(self):
+        return bool(self.index["slots"])
+
+    def new_slot_id(self):
+        slot_id = str(self.index["next_id"])
+        self.index["next_id"] += 1
+        return slot_id
+
+    def slot_file(self, slot_id):
+        meta = self.index["slots"].get(slot_id)
+        if meta and "file" in meta:
+            return meta["file"]
+        return os.path.join(self.directory, f"slot_{slot_id}.json")
+
+    def save(self, slot_id, state, log=None, thumbnail=None, background=True):
+        # Writes the slot (save, action log, thumbnail PNG bytes) and updates the index.
+        # Returns False if the save could not be encoded.
+        filename = self.slot_file(slot_id)
+        if not state.save_game(filename, background=background):
+            return False
+        if log is not None:
+            log.save(log_filename(filename), background=background)
+
+        meta = slot_metadata(state.to_dict(), time.time())
+        meta["file"] = filename
+        if thumbnail is not None:
+            thumb_file = os.path.splitext(filename)[0] + ".png"
+            save.write(thumb_file, thumbnail, background)
+            meta["thumbnail"] = thumb_file
+            self._thumbnails[slot_id] = thumbnail
+        self.index["slots"][slot_id] = meta
+        self._write_index(background)
+        return True
+
+    def load(self, slot_id, state):
+        # The only place a full save file is read
+        if slot_id not in self.index["slots"]:
+            return False
+        return state.load_game(self.slot_file(slot_id))
+
+    def delete(self, slot_id):
+        meta = self.index["slots"].pop(slot_id, None)
+        if meta is None:
+            return
+        self._thumbnails.pop(slot_id, None)
+        filename = meta.get("file", self.slot_file(slot_id))
+        for path in (filename, log_filename(filename), meta.get("thumbnail")):
+            if path:
+                try:
+                    save.storage.delete(path)
+                except OSError as e:
+                    print(f"Error deleting {path}: {e}")
+        self._write_index(background=False)
+
+    def thumbnail(self, slot_id):
+        # PNG bytes or None, read on first request and cached
+        if slot_id not in self._thumbnails:
+            data = None
+            path = self.index["slots"].get(slot_id, {}).get("thumbnail")
+            if path and save.exists(path):
+                try:
+                    data = save.read_file(path)
+                except OSError as e:
+                    print(f"Error loading thumbnail {path}: {e}")
+            self._thumbnails[slot_id] = data
+        return self._thumbnails[slot_id]
+
+
+def slot_metadata(state_dict, last_played):
+    return {
+        "character": state_dict.get("character_id", "xiaomou"),
+        "season": state_dict.get("season", "spring"),
+        "day": state_dict.get("game_time", 0) + 1,
+        "node": state_dict.get("current_node_id", "start"),
+        "last_played": last_played,
+    }
@@ -1,11 +1,45 @@
 import json
-import os
+import struct
+import zlib
 from .config import *
+from .effects import compile_item_effect
+from . import save
+
+# Body heat per hour (update_body_temp; Simulation.fast_forward inlines the same rules)
+COLD_HEAT_LOSS = 0.02 # Per degree the environment is below what the gear handles
+HUNGRY_HEAT_LOSS = 0.05 # Hunger below 20
+STARVING_HEAT_LOSS = 0.1 # Hunger at 0
 
 class GameState:
+    # Fixed attribute layout: smaller, faster attribute access and a cheap clone()
+    __slots__ = (
+        "stamina", "hunger", "thirst", "temperature", "sanity", "health",
+        "current_node_id", "distance_traveled", "distance_to_next_node", "total_distance",
+        "action_points", "money", "karma", "game_time", "day_time",
+        "inventory", "equipment",
+        "weather", "weather_duration", "env_temp", "wind_level",
+        "game_over", "game_won", "status_message", "triggered_events", "statuses",
+        "character_id", "season", "teleport_used",
+        "max_altitude", "lowest_temp", "lowest_sanity", "days_survived",
+    )
+
+    # Containers that need their own copy in clone()
+    _CONTAINERS = ("inventory", "equipment", "triggered_events", "statuses")
+
     def __init__(self):
         self.reset()
 
+    def clone(self):
+        # O(fields) copy for lookahead / tree search, no deepcopy
+        other = GameState.__new__(GameState)
+        for name in GameState.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.inventory = dict(self.inventory)
+        other.equipment = list(self.equipment)
+        other.triggered_events = set(self.triggered_events)
+        other.statuses = list(self.statuses)
+        return other
+
     def reset(self):
         # Player Stats
         self.stamina = MAX_STAMINA
@@ -96,14 +130,14 @@ class GameState:
         # Assume gear_warmth is the temperature limit (e.g. -10).
         # If env_temp < gear_warmth, we lose heat.
         if env_temp < gear_warmth:
-            heat_loss += (gear_warmth - env_temp) * 0.02 # Reduced from 0.05
+            heat_loss += (gear_warmth - env_temp) * COLD_HEAT_LOSS
             
         # Hunger factor
         # User Request: Hunger < 20, slow drop.
         if self.hunger < 20:
-            heat_loss += 0.05 # Reduced from 0.1
+            heat_loss += HUNGRY_HEAT_LOSS
         if self.hunger <= 0:
-            heat_loss += 0.1 # Reduced from 0.2
+            heat_loss += STARVING_HEAT_LOSS
             
         # Apply loss
         if heat_loss > 0:
@@ -209,114 +243,221 @@ class GameState:
         
         return self.game_over
 
-    def save_game(self, filename="savegame.json"):
-        data = {
-            "stamina": self.stamina,
-            "hunger": self.hunger,
-            "thirst": self.thirst,
-            "temperature": self.temperature,
-            "sanity": self.sanity,
-            "health": self.health,
-            "current_node_id": self.current_node_id,
-            "distance_traveled": self.distance_traveled,
-            "distance_to_next_node": self.distance_to_next_node,
-            "total_distance": self.total_distance,
-            "action_points": self.action_points,
-            "money": self.money,
-            "karma": self.karma,
-            "game_time": self.game_time,
-            "day_time": self.day_time,
-            "inventory": self.inventory,
-            "equipment": self.equipment,
-            "weather": self.weather,
-            "weather_duration": self.weather_duration,
-            "env_temp": self.env_temp,
-            "wind_level": self.wind_level,
-            "triggered_events": list(self.triggered_events),
-            "max_altitude": self.max_altitude,
-            "lowest_temp": self.lowest_temp,
-            "lowest_sanity": self.lowest_sanity,
-            "days_survived": self.days_survived,
-            "character_id": self.character_id,
-            "season": self.season
-        }
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in GameState.__slots__}
+        data["inventory"] = dict(self.inventory)
+        data["equipment"] = list(self.equipment)
+        data["triggered_events"] = sorted(self.triggered_events)
+        data["statuses"] = list(self.statuses)
+        return data
+
+    def apply_dict(self, data):
+        # Only known fields are restored; missing ones keep their reset() value
+        self.reset()
+        for key in GameState.__slots__:
+            if key not in data:
+                continue
+            value = data[key]
+            if key == "triggered_events":
+                value = set(value)
+            elif key == "inventory":
+                value = {str(k): v for k, v in value.items()}
+            elif key in ("equipment", "statuses"):
+                value = list(value)
+            setattr(self, key, value)
+
+    def save_game(self, filename="savegame.json", background=False):
+        # Snapshot + encode now, on the caller's thread; the write itself can go
+        # to the background writer (see game/save.py)
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            save.write(filename, save.encode(self.to_dict()), background)
             return True
-        except Exception as e:
+        except (OSError, TypeError, ValueError) as e:
             print(f"Save failed: {e}")
             return False
 
     def load_game(self, filename="savegame.json"):
-        if not os.path.exists(filename):
+        if not save.exists(filename):
             return False
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            for key, value in data.items():
-                if key == "triggered_events":
-                    setattr(self, key, set(value))
-                else:
-                    setattr(self, key, value)
+            self.apply_dict(save.read_state(filename))
             return True
-        except Exception as e:
+        except (OSError, save.SaveError) as e:
             print(f"Load failed: {e}")
             return False
 
     def save_cart(self, cart, filename="last_cart.json"):
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(cart, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+            save.write(filename, json.dumps(cart, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            print(f"Saving cart failed: {e}")
 
     def load_cart(self, filename="last_cart.json"):
-        if not os.path.exists(filename):
+        if not save.exists(filename):
             return {}
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
+            cart = json.loads(save.read_file(filename).decode("utf-8"))
+            return cart if isinstance(cart, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f"Loading cart failed: {e}")
             return {}
 
-    def consume_item(self, item):
-        effects = item.get('effects', {})
-        used = False
-        
-        # Items directly modify stats
+    def consume_item(self, item, effect=None):
+        # Items directly modify stats through the compiled effect engine
         # Positive = Restore/Increase
         # Negative = Drain/Decrease
-        
-        if 'hunger' in effects:
-            self.hunger += effects['hunger']
-            used = True
-            
-        if 'thirst' in effects:
-            self.thirst += effects['thirst']
-            used = True
-            
-        if 'stamina' in effects:
-            self.stamina += effects['stamina']
-            used = True
-        if 'sanity' in effects:
-            self.sanity += effects['sanity']
-            used = True
-        if 'heal' in effects:
-            self.health += effects['heal']
-            used = True
-            
-        if 'status_cure' in effects:
-            target_status = effects['status_cure']
-            if target_status in self.statuses:
-                self.statuses.remove(target_status)
-                used = True
-            
-        # Medicine item special handling (e.g. bandages)
-        # If it's not a food item (no hunger/thirst) but has heal/sanity, treat as used.
-        if item.get('type') == 'consumable' and ('heal' in effects or 'status_cure' in effects): # Medicine
-             used = True
+        if effect is None:
+            effect = compile_item_effect(item)
+        return effect.apply(self).used
 
-        self.clamp_stats()
-        return used
+
+def data_statuses(events, items):
+    # Every status the data can add or cure (event "status", item "status_cure")
+    found = set()
+
+    def scan(effects):
+        if 'status' in effects:
+            found.add(effects['status'])
+        for outcome in effects.get('random_outcome', []):
+            scan(outcome.get('effects', {}))
+
+    for event in events:
+        for choice in event.get('choices', []):
+            scan(choice.get('effects', {}))
+    for item in items:
+        if 'status_cure' in item.get('effects', {}):
+            found.add(item['effects']['status_cure'])
+    return found
+
+
+class StateCodec:
+    # Compact fixed-layout binary snapshot of a GameState, for shipping
+    # states to worker processes (see game/mcts.py).
+    # Item, event, node and status ids are interned to small integers, so a
+    # typical state packs into ~200 bytes. Both sides must build the codec
+    # from the same data files; the table checksum in the header catches
+    # mismatches. status_message goes last, as UTF-8.
+
+    MAGIC = b"AS"
+    VERSION = 2
+
+    # magic, version, table crc
+    HEADER = struct.Struct("<2sBI")
+    # 16 floats, 5 ints, node/weather/season/character ids, flags,
+    # then inventory / equipment / event / status counts and the message length
+    BODY = struct.Struct("<16d5iHBBBBHHHBH")
+
+    FLOAT_FIELDS = (
+        "stamina", "hunger", "thirst", "temperature", "sanity", "health",
+        "distance_traveled", "distance_to_next_node", "total_distance",
+        "action_points", "karma", "env_temp", "lowest_temp", "lowest_sanity", "max_altitude",
+        "money", # Prices may be fractional
+    )
+    INT_FIELDS = ("game_time", "day_time", "weather_duration", "wind_level", "days_survived")
+
+    def __init__(self, item_ids, event_ids, node_ids, weather_types, statuses):
+        self.items = sorted(set(item_ids))
+        self.events = sorted(set(event_ids))
+        self.nodes = list(node_ids)
+        self.weathers = list(weather_types)
+        self.seasons = list(SEASONS)
+        self.characters = list(CHARACTERS)
+        self.statuses = sorted(set(statuses))
+
+        self.item_index = {v: i for i, v in enumerate(self.items)}
+        self.event_index = {v: i for i, v in enumerate(self.events)}
+        self.node_index = {v: i for i, v in enumerate(self.nodes)}
+        self.weather_index = {v: i for i, v in enumerate(self.weathers)}
+        self.season_index = {v: i for i, v in enumerate(self.seasons)}
+        self.character_index = {v: i for i, v in enumerate(self.characters)}
+        self.status_index = {v: i for i, v in enumerate(self.statuses)}
+
+        tables = [self.items, self.events, self.nodes, self.weathers, self.seasons, self.characters, self.statuses]
+        self.checksum = zlib.crc32("\n".join("|".join(t) for t in tables).encode("utf-8"))
+        self._header = self.HEADER.pack(self.MAGIC, self.VERSION, self.checksum)
+
+    @classmethod
+    def from_systems(cls, item_system, map_system, event_system, weather_system):
+        events = event_system.events if event_system is not None else []
+        return cls(
+            item_system.items.keys(),
+            [e['event_id'] for e in events],
+            [n['node_id'] for n in map_system.node_list],
+            weather_system.weather_types,
+            data_statuses(events, item_system.items.values()),
+        )
+
+    def pack(self, state):
+        # ValueError if the state holds an id the data tables don't have
+        try:
+            return self._pack(state)
+        except KeyError as e:
+            raise ValueError(f"Can't pack a state holding {e}: not in the data tables")
+
+    def _pack(self, state):
+        flags = (state.game_over and 1) | (state.game_won and 2) | (state.teleport_used and 4)
+        message = state.status_message.encode("utf-8")
+        body = self.BODY.pack(
+            *[getattr(state, name) for name in self.FLOAT_FIELDS],
+            *[int(getattr(state, name)) for name in self.INT_FIELDS],
+            self.node_index[state.current_node_id],
+            self.weather_index[state.weather],
+            self.season_index[state.season],
+            self.character_index[state.character_id],
+            flags,
+            len(state.inventory),
+            len(state.equipment),
+            len(state.triggered_events),
+            len(state.statuses),
+            len(message),
+        )
+        item_index = self.item_index
+        tail = []
+        for item_id, count in state.inventory.items():
+            tail.append(item_index[item_id])
+            tail.append(count)
+        tail.extend(item_index[item_id] for item_id in state.equipment)
+        tail.extend(self.event_index[event_id] for event_id in state.triggered_events)
+        tail.extend(self.status_index[status] for status in state.statuses)
+        fmt = "<" + "Hi" * len(state.inventory) + "H" * (len(state.equipment) + len(state.triggered_events)) + "B" * len(state.statuses)
+        return self._header + body + struct.pack(fmt, *tail) + message
+
+    def unpack(self, data):
+        magic, version, checksum = self.HEADER.unpack_from(data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("Not a GameState snapshot")
+        if checksum != self.checksum:
+            raise ValueError("Snapshot was packed with different data files")
+
+        offset = self.HEADER.size
+        values = self.BODY.unpack_from(data, offset)
+        offset += self.BODY.size
+
+        state = GameState.__new__(GameState)
+        n_float = len(self.FLOAT_FIELDS)
+        n_int = len(self.INT_FIELDS)
+        for name, value in zip(self.FLOAT_FIELDS, values):
+            setattr(state, name, value)
+        for name, value in zip(self.INT_FIELDS, values[n_float:]):
+            setattr(state, name, value)
+        node, weather, season, character, flags, n_inv, n_equip, n_events, n_status, n_message = values[n_float + n_int:]
+        state.current_node_id = self.nodes[node]
+        state.weather = self.weathers[weather]
+        state.season = self.seasons[season]
+        state.character_id = self.characters[character]
+        state.game_over = bool(flags & 1)
+        state.game_won = bool(flags & 2)
+        state.teleport_used = bool(flags & 4)
+
+        fmt = "<" + "Hi" * n_inv + "H" * (n_equip + n_events) + "B" * n_status
+        tail = struct.unpack_from(fmt, data, offset)
+        state.inventory = {self.items[tail[i]]: tail[i + 1] for i in range(0, 2 * n_inv, 2)}
+        pos = 2 * n_inv
+        state.equipment = [self.items[i] for i in tail[pos:pos + n_equip]]
+        pos += n_equip
+        state.triggered_events = {self.events[i] for i in tail[pos:pos + n_events]}
+        pos += n_events
+        state.statuses = [self.statuses[i] for i in tail[pos:pos + n_status]]
+        offset += struct.calcsize(fmt)
+        state.status_message = bytes(data[offset:offset + n_message]).decode("utf-8")
+        return state
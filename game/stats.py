@@ -0,0 +1,155 @@
+import math
+from .config import MAX_TEMP, MAX_SANITY, MAX_STAMINA
+
+# Streaming statistics of per-turn stats (body temperature, sanity, stamina,
+# pack weight, distance per hour of hiking).
+# Each stat is a fixed-bin histogram: adding a value is one bin increment,
+# two histograms of the same stat merge by adding their counts (so worker
+# processes each keep their own and the parent sums them), and quantiles
+# are read off the cumulative counts, exact to within one bin width. Values
+# outside the range land in an underflow/overflow bin and are bounded by the
+# exact min and max. Pure Python and a few hundred ints per run, so the game
+# updates it every turn as well as the simulators.
+
+# stat -> (low, high, bin width)
+BINS = {
+    "temperature": (30.0, 40.0, 0.1),
+    "sanity": (0.0, 100.0, 1.0),
+    "stamina": (0.0, 100.0, 1.0),
+    "weight": (0.0, 40.0, 0.5),
+    "hike_km": (0.0, 4.0, 0.05),
+}
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+class Histogram:
+    __slots__ = ("low", "high", "width", "counts", "count", "total", "min", "max")
+
+    def __init__(self, low, high, width):
+        self.low = low
+        self.high = high
+        self.width = width
+        self.reset()
+
+    def reset(self):
+        # counts[0] is below low, counts[-1] at or above high
+        self.counts = [0] * (int(round((self.high - self.low) / self.width)) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        if value < self.low:
+            index = 0
+        elif value >= self.high:
+            index = len(self.counts) - 1
+        else:
+            index = min(int((value - self.low) / self.width) + 1, len(self.counts) - 2)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if (other.low, other.high, other.width) != (self.low, self.high, self.width):
+            raise ValueError("Histograms with different bins")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        # Linear within the bin the q-th value falls in (None if empty)
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        last = len(self.counts) - 1
+        for index, n in enumerate(self.counts):
+            if n and seen + n >= target:
+                lo = self.min if index == 0 else self.low + (index - 1) * self.width
+                hi = self.max if index == last else self.low + index * self.width
+                lo, hi = max(lo, self.min), min(hi, self.max)
+                return lo + (hi - lo) * (target - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self):
+        # JSON-friendly (reports, caches); the infinities of an empty one become None
+        return {"bins": [self.low, self.high, self.width], "counts": self.counts, "count": self.count,
+                "total": self.total, "min": self.min if self.count else None,
+                "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        h = cls(*data["bins"])
+        h.counts = list(data["counts"])
+        h.count = data["count"]
+        h.total = data["total"]
+        if h.count:
+            h.min = data["min"]
+            h.max = data["max"]
+        return h
+
+
+class TurnStats:
+    # One histogram per stat in BINS. turn() after every hour-taking action
+    # (Simulation does it when sim.stats is set), hike() per hour hiked.
+    def __init__(self):
+        self.histograms = {name: Histogram(*bins) for name, bins in BINS.items()}
+
+    def reset(self):
+        for h in self.histograms.values():
+            h.reset()
+
+    def turn(self, state, weight):
+        # Clamped like GameState.clamp_stats: an event's effects can leave a
+        # stat past its range until the choice is resolved
+        h = self.histograms
+        h["temperature"].add(max(30.0, min(MAX_TEMP, state.temperature)))
+        h["sanity"].add(max(0, min(MAX_SANITY, state.sanity)))
+        h["stamina"].add(max(0, min(MAX_STAMINA, state.stamina)))
+        h["weight"].add(weight)
+
+    def hike(self, km):
+        self.histograms["hike_km"].add(km)
+
+    @property
+    def turns(self):
+        return self.histograms["temperature"].count
+
+    def merge(self, other):
+        for name, h in self.histograms.items():
+            h.merge(other.histograms[name])
+        return self
+
+    def summary(self, quantiles=QUANTILES):
+        # {stat: {count, mean, min, max, p10, p50, p90}} (stats without values left out)
+        result = {}
+        for name, h in self.histograms.items():
+            if h.count:
+                row = {"count": h.count, "mean": h.mean(), "min": h.min, "max": h.max}
+                for q in quantiles:
+                    row[f"p{q * 100:g}"] = h.quantile(q)
+                result[name] = row
+        return result
+
+    def to_dict(self):
+        return {name: h.to_dict() for name, h in self.histograms.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name, h in data.items():
+            if name in stats.histograms:
+                stats.histograms[name] = Histogram.from_dict(h)
+        return stats
@@ -0,0 +1,255 @@
+import os
+import sys
+import time
+import base64
+import tempfile
+
+# Storage backends for saves, action logs, thumbnails and the slot index.
+# All of them store bytes under a path-like name ("saves/slot_1.json") and
+# share the same methods:
+#
+#   read(name)               -> bytes, raises FileNotFoundError if missing
+#   exists(name)             -> bool
+#   write(name, data, done)  done(name, ok, error) is called once it is stored
+#   delete(name)
+#   keys(prefix)             -> names starting with prefix
+#   flush()                  store anything still pending, synchronously
+#   pump()                   coroutine the game loop runs as a task
+#
+# FileStorage is the desktop backend. BrowserStorage keeps data in the
+# browser's LocalStorage for the pygbag build; its writes are debounced,
+# batched and committed from pump() so saving never blocks a frame.
+# MemoryStorage keeps everything in a dict (tools, tests, headless runs).
+
+DEBOUNCE_SECONDS = 0.5   # Commit once writes have been quiet this long...
+MAX_WRITE_DELAY = 2.0    # ...or this long after the first pending write
+BATCH_SIZE = 4           # Writes per slice before yielding to the event loop
+PUMP_INTERVAL = 0.1
+
+
+def atomic_write(filename, data):
+    # Write a temp file next to the target, fsync, then rename, so a crash
+    # mid-save never leaves a truncated file behind. The temp name is unique,
+    # so concurrent writers of one file don't write into each other's.
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{os.path.basename(filename)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            try:
+                os.fsync(f.fileno())
+            except OSError:
+                pass # Not supported on every filesystem (e.g. browser FS)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class Storage:
+    def flush(self):
+        pass
+
+    async def pump(self):
+        pass # Only deferred backends have work to do here
+
+
+class FileStorage(Storage):
+    def __init__(self, root="."):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def read(self, name):
+        with open(self._path(name), "rb") as f:
+            return f.read()
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def write(self, name, data, done=None):
+        path = self._path(name)
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            atomic_write(path, data)
+        except OSError as e:
+            if done is None:
+                raise
+            done(name, False, e)
+            return
+        if done is not None:
+            done(name, True, None)
+
+    def delete(self, name):
+        if os.path.exists(self._path(name)):
+            os.remove(self._path(name))
+
+    def keys(self, prefix=""):
+        directory = os.path.dirname(prefix)
+        full = self._path(directory)
+        if not os.path.isdir(full):
+            return []
+        names = [os.path.join(directory, n) if directory else n for n in sorted(os.listdir(full))]
+        return [n for n in names if n.startswith(prefix)]
+
+
+class MemoryStorage(Storage):
+    def __init__(self):
+        self.data = {}
+
+    def read(self, name):
+        if name not in self.data:
+            raise FileNotFoundError(name)
+        return self.data[name]
+
+    def exists(self, name):
+        return name in self.data
+
+    def write(self, name, data, done=None):
+        self.data[name] = bytes(data)
+        if done is not None:
+            done(name, True, None)
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+    def keys(self, prefix=""):
+        return sorted(n for n in self.data if n.startswith(prefix))
+
+
+class BrowserStorage(Storage):
+    # LocalStorage only holds strings, so values are stored base64-encoded
+    KEY_PREFIX = "aotai/"
+
+    def __init__(self, window=None):
+        if window is None:
+            from platform import window # pygbag's bridge to the page's JS globals
+        self.local_storage = window.localStorage
+        self._pending = {} # name -> bytes, or None for a delete
+        self._callbacks = [] # [(name, done)] waiting for the next commit
+        self._first_pending = None
+        self._last_write = 0
+
+    def read(self, name):
+        # Pending writes win, so a save can be read back before it is committed
+        if name in self._pending:
+            data = self._pending[name]
+            if data is None:
+                raise FileNotFoundError(name)
+            return data
+        value = self.local_storage.getItem(self.KEY_PREFIX + name)
+        if value is None:
+            raise FileNotFoundError(name)
+        return base64.b64decode(value)
+
+    def exists(self, name):
+        if name in self._pending:
+            return self._pending[name] is not None
+        return self.local_storage.getItem(self.KEY_PREFIX + name) is not None
+
+    def write(self, name, data, done=None):
+        self._queue(name, bytes(data))
+        if done is not None:
+            self._callbacks.append((name, done))
+
+    def delete(self, name):
+        self._queue(name, None)
+
+    def _queue(self, name, data):
+        now = time.monotonic()
+        if not self._pending:
+            self._first_pending = now
+        self._pending[name] = data # Newer writes replace queued ones
+        self._last_write = now
+
+    def keys(self, prefix=""):
+        names = set()
+        for i in range(self.local_storage.length):
+            key = self.local_storage.key(i)
+            if key and key.startswith(self.KEY_PREFIX + prefix):
+                names.add(key[len(self.KEY_PREFIX):])
+        for name, data in self._pending.items():
+            if name.startswith(prefix):
+                if data is None:
+                    names.discard(name)
+                else:
+                    names.add(name)
+        return sorted(names)
+
+    def due(self, now):
+        if not self._pending:
+            return False
+        return now - self._last_write >= DEBOUNCE_SECONDS or now - self._first_pending >= MAX_WRITE_DELAY
+
+    def _take_batch(self):
+        # The writes stay in _pending, where read() sees them, until
+        # _committed() drops them
+        batch = list(self._pending.items())
+        callbacks, self._callbacks = self._callbacks, []
+        return batch, callbacks
+
+    def _committed(self, name, data):
+        # Unless a newer write to name was queued meanwhile (it stays pending)
+        if name in self._pending and self._pending[name] is data:
+            del self._pending[name]
+
+    def _commit(self, name, data):
+        try:
+            if data is None:
+                self.local_storage.removeItem(self.KEY_PREFIX + name)
+            else:
+                self.local_storage.setItem(self.KEY_PREFIX + name, base64.b64encode(data).decode("ascii"))
+            return None
+        except Exception as e: # JS errors (e.g. quota exceeded) surface as generic exceptions
+            print(f"Browser storage write failed for {name}: {e}")
+            return e
+
+    def _report(self, callbacks, errors):
+        for name, done in callbacks:
+            error = errors.get(name)
+            done(name, error is None, error)
+
+    def flush(self):
+        batch, callbacks = self._take_batch()
+        errors = {}
+        for name, data in batch:
+            error = self._commit(name, data)
+            if error:
+                errors[name] = error
+            self._committed(name, data)
+        self._report(callbacks, errors)
+
+    async def pump(self):
+        # Runs for the whole game as an asyncio task (see Game.run); asyncio
+        # is imported here so headless tools don't pay for it
+        import asyncio
+        while True:
+            await asyncio.sleep(PUMP_INTERVAL)
+            if not self.due(time.monotonic()):
+                continue
+            batch, callbacks = self._take_batch()
+            errors = {}
+            for i, (name, data) in enumerate(batch):
+                error = self._commit(name, data)
+                if error:
+                    errors[name] = error
+                self._committed(name, data)
+                if i % BATCH_SIZE == BATCH_SIZE - 1:
+                    await asyncio.sleep(0) # Let a frame through between slices
+            self._report(callbacks, errors)
+
+
+def default_storage():
+    if sys.platform == "emscripten":
+        try:
+            return BrowserStorage()
+        except (ImportError, AttributeError) as e:
+            print(f"Browser storage unavailable, using files: {e}")
+    return FileStorage()
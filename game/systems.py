@@ -1,37 +1,147 @@
 import json
-import os
 import random
 from .config import *
+from .effects import compile_event_effect, compile_item_effect
+from . import bundle as data_bundle
+from . import resources
+
+# Temperature offset and hiking stamina cost multiplier per weather
+WEATHER_EFFECTS = {
+    "sunny": {"temp": 2, "stamina_cost": 1.0},
+    "cloudy": {"temp": 0, "stamina_cost": 1.0},
+    "fog": {"temp": -1, "stamina_cost": 1.1},
+    "rain": {"temp": -3, "stamina_cost": 1.3},
+    "snow": {"temp": -5, "stamina_cost": 1.5},
+    "storm": {"temp": -10, "stamina_cost": 2.0}
+}
+NO_WEATHER_EFFECTS = {"temp": 0, "stamina_cost": 1.0}
 
 class DataLoader:
+    DATA_DIR = "data" # Resource directory (see game/resources.py)
+    _bundle_raw = None
+    _bundle_checked = False
+
     @staticmethod
     def load_json(filename):
-        path = os.path.join("data", filename)
-        if not os.path.exists(path):
-            print(f"Error: {path} not found.")
+        name = f"{DataLoader.DATA_DIR}/{filename}"
+        text = resources.loader.read_text(name)
+        if text is None:
+            print(f"Error: {name} not found.")
             return []
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return json.loads(text)
+
+    @staticmethod
+    def bundle():
+        # The compiled bundle (see game/bundle.py), None in dev. The file is
+        # read once; each call decodes new records, so systems (and the
+        # simulations built on them) never share mutable data.
+        if not DataLoader._bundle_checked:
+            DataLoader._bundle_checked = True
+            name = f"{DataLoader.DATA_DIR}/{data_bundle.BUNDLE_NAME}"
+            if resources.loader.exists(name):
+                try:
+                    if data_bundle.bundle_is_stale(resources.loader, DataLoader.DATA_DIR):
+                        print("Data bundle is older than the JSON files, loading JSON.")
+                    else:
+                        raw = resources.loader.read(name)
+                        data_bundle.decode_bundle(raw)
+                        DataLoader._bundle_raw = raw
+                except (ValueError, KeyError) as e:
+                    print(f"Error loading data bundle, loading JSON: {e}")
+        if DataLoader._bundle_raw is None:
+            return None
+        return data_bundle.decode_bundle(DataLoader._bundle_raw)
+
+    @staticmethod
+    def load(name):
+        # Records for "items", "events" or "map_nodes"
+        bundle = DataLoader.bundle()
+        if bundle is not None:
+            return bundle[name]
+        return data_bundle.intern_ids(name, DataLoader.load_json(data_bundle.SOURCES[name]))
+
+    @staticmethod
+    def index(name, builder, *args):
+        # Precomputed index from the bundle, else built from the loaded data
+        bundle = DataLoader.bundle()
+        if bundle is not None:
+            return bundle["indexes"][name]
+        return builder(*args)
 
 class ItemSystem:
     def __init__(self):
-        self.items = {item['id']: item for item in DataLoader.load_json("items.json")}
+        self.items = {item['id']: item for item in DataLoader.load("items")}
+        # Consumable effects compiled once at load time
+        self.item_effects = {item_id: compile_item_effect(item) for item_id, item in self.items.items()}
+        # Per-item lookups used every turn (weight, warmth, spoilage, consumable)
+        aggregates = DataLoader.index("item_aggregates", data_bundle.item_aggregates, self.items)
+        self.weights = aggregates["weights"]
+        self.temp_protection = aggregates["temp_protection"]
+        self.spoil_chances = aggregates["spoil_chances"]
+        self.consumables = aggregates["consumables"]
+
+    def reload(self, records):
+        # Hot reload (dev, see game/hotreload.py): only added, edited or
+        # removed items are recompiled and re-aggregated. Returns their ids.
+        items = {item['id']: item for item in records}
+        changed = {i for i in items if self.items.get(i) != items[i]} | (self.items.keys() - items.keys())
+        aggregates = data_bundle.item_aggregates({i: items[i] for i in changed if i in items})
+        for item_id in changed:
+            self.item_effects.pop(item_id, None)
+            self.weights.pop(item_id, None)
+            self.temp_protection.pop(item_id, None)
+            self.spoil_chances.pop(item_id, None)
+            self.consumables.discard(item_id)
+            if item_id in items:
+                self.item_effects[item_id] = compile_item_effect(items[item_id])
+        self.weights.update(aggregates["weights"])
+        self.temp_protection.update(aggregates["temp_protection"])
+        self.spoil_chances.update(aggregates["spoil_chances"])
+        self.consumables.update(aggregates["consumables"])
+        # Same dict, in file order (the shop lists items in this order)
+        self.items.clear()
+        self.items.update(items)
+        return changed
 
     def get_item(self, item_id):
         return self.items.get(item_id)
 
+    def get_item_effect(self, item_id):
+        return self.item_effects.get(item_id)
+
     def calculate_weight(self, inventory):
         total_weight = 0
+        weights = self.weights
         for item_id, count in inventory.items():
-            item = self.get_item(item_id)
-            if item:
-                total_weight += item['weight'] * count
+            if item_id in weights:
+                total_weight += weights[item_id] * count
         return total_weight
 
 class MapSystem:
     def __init__(self):
-        self.node_list = DataLoader.load_json("map_nodes.json")
+        self.node_list = DataLoader.load("map_nodes")
         self.nodes = {node['node_id']: node for node in self.node_list}
+        # Route position / distance from the start per node
+        route = DataLoader.index("route", data_bundle.route_index, self.node_list)
+        self.node_index = route["node_index"]
+        self.km_from_start = route["km_from_start"]
+        self.total_km = route["total_km"]
+
+    def reload(self, records):
+        # Hot reload: swaps the node records in place. Returns the changed ids.
+        nodes = {node['node_id']: node for node in records}
+        changed = {n for n in nodes if self.nodes.get(n) != nodes[n]} | (self.nodes.keys() - nodes.keys())
+        self.node_list[:] = records
+        self.nodes.clear()
+        self.nodes.update(nodes)
+        # Distances are cumulative: one edited segment shifts every node after it
+        route = data_bundle.route_index(self.node_list)
+        self.node_index.clear()
+        self.node_index.update(route["node_index"])
+        self.km_from_start.clear()
+        self.km_from_start.update(route["km_from_start"])
+        self.total_km = route["total_km"]
+        return changed
 
     def get_node(self, node_id):
         return self.nodes.get(node_id)
@@ -54,8 +164,9 @@ class WeatherSystem:
             "storm": {"snow": 0.5, "cloudy": 0.5}
         }
 
-    def next_weather(self, current_weather, season="spring"):
-        # Adjust probabilities based on season
+    def transition_probs(self, current_weather, season="spring"):
+        # Next-day weather distribution {weather: probability}, in draw order;
+        # empty if the weather has no transitions
         probs = self.transitions.get(current_weather, {}).copy()
         
         # Season Modifiers
@@ -75,13 +186,18 @@ class WeatherSystem:
             
         # Normalize
         total = sum(probs.values())
-        if total > 0:
-            for k in probs:
-                probs[k] /= total
-        else:
+        if total <= 0:
+            return {}
+        for k in probs:
+            probs[k] /= total
+        return probs
+
+    def next_weather(self, current_weather, season="spring", rng=random):
+        probs = self.transition_probs(current_weather, season)
+        if not probs:
             return "sunny" # Fallback
             
-        rand = random.random()
+        rand = rng.random()
         cumulative = 0
         for weather, prob in probs.items():
             cumulative += prob
@@ -90,25 +206,71 @@ class WeatherSystem:
         return "sunny"
 
     def get_weather_effects(self, weather):
-        effects = {
-            "sunny": {"temp": 2, "stamina_cost": 1.0},
-            "cloudy": {"temp": 0, "stamina_cost": 1.0},
-            "fog": {"temp": -1, "stamina_cost": 1.1},
-            "rain": {"temp": -3, "stamina_cost": 1.3},
-            "snow": {"temp": -5, "stamina_cost": 1.5},
-            "storm": {"temp": -10, "stamina_cost": 2.0}
-        }
-        return effects.get(weather, {"temp": 0, "stamina_cost": 1.0})
+        # Shared dicts: read, don't modify
+        return WEATHER_EFFECTS.get(weather, NO_WEATHER_EFFECTS)
 
 class EventSystem:
-    def __init__(self):
-        self.events = DataLoader.load_json("events.json")
+    def __init__(self, item_system=None):
+        self.events = DataLoader.load("events")
+        # phase -> candidate events, in file order
+        buckets = DataLoader.index("event_buckets", data_bundle.event_trigger_buckets, self.events)
+        self.phase_buckets = data_bundle.bucket_events(buckets, self.events)
+        # id(event) -> [CompiledEffect per choice]
+        # (keyed by the event dict itself: event_ids are not unique in events.json)
+        self.choice_effects = {}
+        for event in self.events:
+            self.choice_effects[id(event)] = self.compile_choices(event, item_system)
+
+    def compile_choices(self, event, item_system=None):
+        return [compile_event_effect(choice.get('effects', {}), item_system) for choice in event.get('choices', [])]
+
+    def reload(self, records, item_system=None, stale=(), pending=None):
+        # Hot reload: events whose record is unchanged keep their dict and
+        # compiled effects; new or edited ones, and those in stale (ids of
+        # event dicts, e.g. removing an item that changed), are compiled.
+        # Returns how many events were compiled.
+        unchanged = {}
+        for event in self.events:
+            if id(event) not in stale:
+                unchanged.setdefault(json.dumps(event, sort_keys=True), []).append(event)
+        events = []
+        choice_effects = {}
+        compiled = 0
+        for record in records:
+            same = unchanged.get(json.dumps(record, sort_keys=True))
+            if same:
+                event = same.pop(0)
+                choice_effects[id(event)] = self.choice_effects[id(event)]
+            else:
+                event = record
+                choice_effects[id(event)] = self.compile_choices(event, item_system)
+                compiled += 1
+            events.append(event)
+        # The event on screen is resolved with the choices it was shown with
+        if pending is not None and id(pending) not in choice_effects:
+            choice_effects[id(pending)] = self.choice_effects[id(pending)]
+        self.events[:] = events
+        self.choice_effects = choice_effects
+        buckets = data_bundle.bucket_events(data_bundle.event_trigger_buckets(self.events), self.events)
+        self.phase_buckets.clear()
+        self.phase_buckets.update(buckets)
+        return compiled
 
-    def check_event(self, game_state, map_system, context=None):
+    def get_choice_effect(self, event, choice_index):
+        return self.choice_effects[id(event)][choice_index]
+
+    def check_event(self, game_state, map_system, context=None, rng=random):
         valid_events = []
         current_node = map_system.get_node(game_state.current_node_id)
+
+        # Phase condition (e.g. camp, rest, hike) is resolved by the bucket:
+        # only events for this phase or without a phase condition are scanned
+        if context:
+            candidates = self.phase_buckets.get(context.get('phase'), self.phase_buckets[None])
+        else:
+            candidates = self.events
         
-        for event in self.events:
+        for event in candidates:
             # Check if unique and already triggered
             if event.get("unique", False) and event['event_id'] in game_state.triggered_events:
                 continue
@@ -153,21 +315,16 @@ class EventSystem:
                 if game_state.sanity > conditions['sanity_max']:
                     continue
 
-            # Check phase condition (e.g. camp, rest, hike)
-            if "phase" in conditions and context:
-                if context.get('phase') != conditions['phase']:
-                    continue
-            
             valid_events.append(event)
         
         # Pick one event based on its individual chance
         final_events = []
         for ev in valid_events:
             chance = ev.get('trigger_conditions', {}).get('chance', 0.1)
-            if random.random() < chance:
+            if rng.random() < chance:
                 final_events.append(ev)
         
         if final_events:
-            return random.choice(final_events)
+            return rng.choice(final_events)
             
         return None
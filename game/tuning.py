@@ -0,0 +1,370 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from .config import *
+from . import simulation, systems as data_systems, state as body_rules
+from .effects import compile_item_effect
+from .autoplay import AutoPlayer, DEFAULT_CART, load_systems, survival_policy
+
+# Automatic difficulty tuning and sensitivity analysis.
+# A parameter is a number the rules read at call time (a module constant,
+# an event's trigger chance, an item effect), so a candidate is applied by
+# setting it and undone by setting the default back. Candidates are scored
+# by seeded survival-policy games per (character, season) cell; every
+# candidate of a generation plays the same seeds (common random numbers), so
+# the differences between them are the parameters', not the dice.
+#
+# The search is a separable CMA-ES (diagonal covariance) over log(value /
+# default): 0 is the shipped balance, and a step changes a parameter by a
+# factor, whatever its scale.
+
+DRAINS = simulation.BALANCE_CONSTANTS
+MAX_FACTOR = 4.0 # A parameter stays within default / 4 .. default * 4
+MIN_CHANCE = 0.001
+SEEDS = 16 # Games per cell and candidate
+GENERATIONS = 20
+SIGMA = 0.3 # Initial step (log factor)
+REGULARIZATION = 0.01 # Pull towards the shipped values, per squared log factor
+STEP = 0.1 # Sensitivity: relative change each way
+ITEM_STATS = ["hunger", "thirst", "stamina", "sanity", "heal", "temp_protection"]
+
+# Win rate the bot should reach, per season (every character)
+DEFAULT_TARGETS = {"spring": 0.6, "summer": 0.5, "autumn": 0.4, "winter": 0.15}
+
+
+class Parameter:
+    # One tunable: get() / set(value) on the loaded systems
+    def __init__(self, name, label, getter, setter, low=None, high=None):
+        self.name = name
+        self.label = label
+        self.get = getter
+        self.set = setter
+        self.default = getter()
+        bounds = sorted((self.default / MAX_FACTOR, self.default * MAX_FACTOR))
+        self.low = low if low is not None else bounds[0]
+        self.high = high if high is not None else bounds[1]
+
+
+def constant_parameter(group, module, constant):
+    return Parameter(f"{group}.{constant}", constant,
+                     lambda: getattr(module, constant),
+                     lambda value: setattr(module, constant, value))
+
+
+def entry_parameter(name, label, table, key):
+    # A number in a dict the rules look up
+    return Parameter(name, label, lambda: table[key], lambda value: table.__setitem__(key, value))
+
+
+def drain_parameters():
+    return [constant_parameter("drain", simulation, c) for c in DRAINS]
+
+
+def terrain_parameters():
+    return [entry_parameter(f"terrain.{t}", f"TERRAIN_FACTORS[{t}]", simulation.TERRAIN_FACTORS, t)
+            for t in simulation.TERRAIN_FACTORS]
+
+
+def altitude_parameters():
+    return [constant_parameter("altitude", simulation, c)
+            for c in ("ALTITUDE_SLOW_START", "ALTITUDE_SLOW_RANGE", "MIN_ALTITUDE_FACTOR")]
+
+
+def weather_parameters():
+    return [entry_parameter(f"weather.{w}", f"{w} stamina_cost", effects, "stamina_cost")
+            for w, effects in data_systems.WEATHER_EFFECTS.items()]
+
+
+def body_temp_parameters():
+    return [constant_parameter("body", body_rules, c)
+            for c in ("COLD_HEAT_LOSS", "HUNGRY_HEAT_LOSS", "STARVING_HEAT_LOSS")]
+
+
+def item_parameters(item_system):
+    # Consumable stats and warmth; setting one recompiles the item's effect
+    def setter(item_id, stat):
+        def set_value(value):
+            item = item_system.items[item_id]
+            item['effects'][stat] = value
+            if stat == "temp_protection":
+                item_system.temp_protection[item_id] = value
+            else:
+                item_system.item_effects[item_id] = compile_item_effect(item)
+        return set_value
+
+    params = []
+    for item_id, item in item_system.items.items():
+        effects = item.get('effects', {})
+        for stat in ITEM_STATS:
+            if effects.get(stat):
+                params.append(Parameter(f"item.{item_id}.{stat}", f"{item_id} {stat}",
+                                        lambda e=effects, k=stat: e[k], setter(item_id, stat)))
+    return params
+
+
+def chance_parameters(event_system):
+    # Events by index: two entries share an event_id
+    params = []
+    for index, event in enumerate(event_system.events):
+        conditions = event.get('trigger_conditions')
+        if conditions is None or 'chance' not in conditions:
+            continue
+        params.append(Parameter(f"chance.{index}", f"{event['event_id']}#{index}",
+                                lambda c=conditions: c['chance'],
+                                lambda value, c=conditions: c.__setitem__('chance', value),
+                                low=max(MIN_CHANCE, conditions['chance'] / MAX_FACTOR),
+                                high=min(1.0, conditions['chance'] * MAX_FACTOR)))
+    return params
+
+
+# name -> function(systems) -> [Parameter]
+GROUPS = {
+    "drains": lambda systems: drain_parameters(),
+    "chances": lambda systems: chance_parameters(systems[3]),
+    "terrain": lambda systems: terrain_parameters(),
+    "altitude": lambda systems: altitude_parameters(),
+    "weather": lambda systems: weather_parameters(),
+    "body": lambda systems: body_temp_parameters(),
+    "items": lambda systems: item_parameters(systems[0]),
+}
+
+
+def parameters(systems, groups=("drains", "chances")):
+    params = []
+    for group in groups:
+        params.extend(GROUPS[group](systems))
+    return params
+
+
+def to_values(params, x):
+    # Search point (log factors) -> {name: value}, within bounds
+    values = {}
+    for p, xi in zip(params, x):
+        values[p.name] = min(p.high, max(p.low, p.default * math.exp(xi)))
+    return values
+
+
+def play_cell(player, params, values, character_id, season, seeds, cart=None):
+    # (wins, games, km, days of the won games) with values applied
+    by_name = {p.name: p for p in params}
+    try:
+        for name, value in values.items():
+            by_name[name].set(value)
+        wins = 0
+        km = 0.0
+        days = 0
+        for seed in seeds:
+            run = player.play(seed, character_id, season, cart, survival_policy)
+            if run.state.game_won:
+                wins += 1
+                days += run.state.game_time
+            km += run.km()
+        return wins, len(seeds), km, days
+    finally:
+        for p in params:
+            p.set(p.default)
+
+
+# --- Worker processes ---
+
+_player = None
+_params = None
+
+
+def _init_worker(groups):
+    global _player, _params
+    systems = load_systems()
+    _player = AutoPlayer(*systems)
+    _params = parameters(systems, groups)
+
+
+def _play_worker(values, character_id, season, seeds, cart):
+    return play_cell(_player, _params, values, character_id, season, seeds, cart)
+
+
+class Evaluator:
+    # Plays batches of (values, character, season, seeds) in this process
+    # (workers=1) or a process pool (call close() when done). With a cache
+    # (game/simcache.py) only the cells it has not seen are played.
+    def __init__(self, groups, workers=1, cart=None, cache=None):
+        self.groups = groups
+        self.cart = cart
+        self.cache = cache
+        self.pool = None
+        self.games = 0 # Played, not from the cache
+        self.cached_games = 0
+        if workers > 1:
+            self.pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(groups,))
+        else:
+            systems = load_systems()
+            self.player = AutoPlayer(*systems)
+            self.params = parameters(systems, groups)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.cache is not None:
+            self.cache.evict()
+
+    def configuration(self, values, character_id, season, seeds):
+        # Cache key of a play_cell() call
+        return ["tuning.play_cell", sorted(values.items()), character_id, season, list(seeds),
+                sorted((DEFAULT_CART if self.cart is None else self.cart).items())]
+
+    def run(self, jobs):
+        # jobs: [(values, character_id, season, seeds)] -> results in order
+        results = [None] * len(jobs)
+        todo = []
+        for i, job in enumerate(jobs):
+            found = self.cache.get(self.configuration(*job)) if self.cache is not None else None
+            if found is None:
+                todo.append(i)
+            else:
+                results[i] = tuple(found)
+                self.cached_games += found[1]
+        if self.pool is None:
+            played = [play_cell(self.player, self.params, *jobs[i], self.cart) for i in todo]
+        else:
+            futures = [self.pool.submit(_play_worker, jobs[i][0], jobs[i][1], jobs[i][2], list(jobs[i][3]), self.cart)
+                       for i in todo]
+            played = [f.result() for f in futures]
+        for i, result in zip(todo, played):
+            results[i] = result
+            if self.cache is not None:
+                self.cache.put(self.configuration(*jobs[i]), list(result))
+        self.games += sum(r[1] for r in played)
+        return results
+
+
+class SepCMA:
+    # Separable CMA-ES (Ros & Hansen 2008), minimizing over R^n from 0
+    def __init__(self, n, sigma=SIGMA, rng=None, popsize=None):
+        self.n = n
+        self.rng = rng or random.Random()
+        self.popsize = popsize or 4 + int(3 * math.log(n))
+        mu = self.popsize // 2
+        weights = [math.log(mu + 0.5) - math.log(i + 1) for i in range(mu)]
+        total = sum(weights)
+        self.weights = [w / total for w in weights]
+        self.mueff = 1.0 / sum(w * w for w in self.weights)
+        mueff = self.mueff
+        self.cs = (mueff + 2) / (n + mueff + 5)
+        self.ds = 1 + 2 * max(0.0, math.sqrt((mueff - 1) / (n + 1)) - 1) + self.cs
+        self.cc = (4 + mueff / n) / (n + 4 + 2 * mueff / n)
+        # Diagonal learning rates are (n + 2) / 3 times the full-matrix ones
+        self.c1 = 2 / ((n + 1.3) ** 2 + mueff) * (n + 2) / 3
+        self.cmu = min(1 - self.c1, 2 * (mueff - 2 + 1 / mueff) / ((n + 2) ** 2 + mueff) * (n + 2) / 3)
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+        self.mean = [0.0] * n
+        self.sigma = sigma
+        self.diag = [1.0] * n # Covariance diagonal
+        self.ps = [0.0] * n
+        self.pc = [0.0] * n
+        self.generation = 0
+
+    def ask(self):
+        scale = [self.sigma * math.sqrt(d) for d in self.diag]
+        return [[m + s * self.rng.gauss(0, 1) for m, s in zip(self.mean, scale)]
+                for _ in range(self.popsize)]
+
+    def tell(self, xs, scores):
+        n = self.n
+        ranked = [xs[k] for k in sorted(range(len(xs)), key=lambda k: scores[k])]
+        old = self.mean
+        self.mean = [sum(w * x[i] for w, x in zip(self.weights, ranked)) for i in range(n)]
+        step = [(m - o) / self.sigma for m, o in zip(self.mean, old)]
+
+        c = math.sqrt(self.cs * (2 - self.cs) * self.mueff)
+        self.ps = [(1 - self.cs) * p + c * y / math.sqrt(d) for p, y, d in zip(self.ps, step, self.diag)]
+        ps_norm = math.sqrt(sum(p * p for p in self.ps))
+        self.generation += 1
+        hsig = ps_norm / math.sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n < 1.4 + 2 / (n + 1)
+        c = math.sqrt(self.cc * (2 - self.cc) * self.mueff)
+        self.pc = [(1 - self.cc) * p + hsig * c * y for p, y in zip(self.pc, step)]
+
+        for i in range(n):
+            rank_mu = sum(w * ((x[i] - old[i]) / self.sigma) ** 2 for w, x in zip(self.weights, ranked))
+            self.diag[i] = ((1 - self.c1 - self.cmu) * self.diag[i]
+                            + self.c1 * (self.pc[i] ** 2 + (not hsig) * self.cc * (2 - self.cc) * self.diag[i])
+                            + self.cmu * rank_mu)
+        self.sigma *= math.exp(self.cs / self.ds * (ps_norm / self.chi_n - 1))
+
+
+def cell_seeds(generation, seeds):
+    # Seeds for one generation: shared by all its candidates and cells
+    return range(generation * seeds, (generation + 1) * seeds)
+
+
+class Tuner:
+    # Fits the parameters to targets {(character_id, season): win rate}
+    def __init__(self, evaluator, params, targets, seeds=SEEDS, popsize=None, sigma=SIGMA, seed=0):
+        self.evaluator = evaluator
+        self.params = params
+        self.targets = targets
+        self.seeds = seeds
+        self.cma = SepCMA(len(params), sigma, random.Random(seed), popsize)
+        self.history = [] # (generation, best loss, mean loss, sigma)
+
+    def loss(self, rates, x):
+        error = sum((rates[cell] - target) ** 2 for cell, target in self.targets.items()) / len(self.targets)
+        return error + REGULARIZATION * sum(xi * xi for xi in x) / len(x)
+
+    def win_rates(self, value_sets, seeds):
+        # [{cell: win rate}] for each {name: value} set, on the same seeds
+        cells = list(self.targets)
+        jobs = [(values, c, s, seeds) for values in value_sets for c, s in cells]
+        results = self.evaluator.run(jobs)
+        rates = []
+        for k in range(len(value_sets)):
+            chunk = results[k * len(cells):(k + 1) * len(cells)]
+            rates.append({cell: wins / games for cell, (wins, games, _, _) in zip(cells, chunk)})
+        return rates
+
+    def step(self):
+        # One generation; returns (losses, rates) of its candidates
+        xs = self.cma.ask()
+        seeds = cell_seeds(self.cma.generation, self.seeds)
+        rates = self.win_rates([to_values(self.params, x) for x in xs], seeds)
+        losses = [self.loss(r, x) for r, x in zip(rates, xs)]
+        self.cma.tell(xs, losses)
+        self.history.append((self.cma.generation, min(losses), sum(losses) / len(losses), self.cma.sigma))
+        return losses, rates
+
+    def result(self):
+        return to_values(self.params, self.cma.mean)
+
+
+# --- Sensitivity ---
+
+def cell_metrics(results):
+    # Summed play_cell results -> win rate, mean km, mean days of won games
+    wins = sum(r[0] for r in results)
+    games = sum(r[1] for r in results)
+    return {"win_rate": wins / games, "km": sum(r[2] for r in results) / games,
+            "days": sum(r[3] for r in results) / wins if wins else None}
+
+
+def sensitivity(evaluator, params, cells, seeds, step=STEP):
+    # Central differences: each parameter at default * (1 -/+ step), every
+    # run on the same seeds. Returns (base metrics, [(param, minus, plus,
+    # effect)]), effect being the change in each metric per +step.
+    jobs = [({}, c, s, seeds) for c, s in cells]
+    for p in params:
+        for factor in (1 - step, 1 + step):
+            jobs.extend(({p.name: p.default * factor}, c, s, seeds) for c, s in cells)
+    results = evaluator.run(jobs)
+    n = len(cells)
+    base = cell_metrics(results[:n])
+    rows = []
+    for k, p in enumerate(params):
+        minus = cell_metrics(results[n * (1 + 2 * k):n * (2 + 2 * k)])
+        plus = cell_metrics(results[n * (2 + 2 * k):n * (3 + 2 * k)])
+        effect = {}
+        for metric in ("win_rate", "km", "days"):
+            if minus[metric] is None or plus[metric] is None:
+                effect[metric] = None
+            else:
+                effect[metric] = (plus[metric] - minus[metric]) / 2
+        rows.append((p, minus, plus, effect))
+    return base, rows
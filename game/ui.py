@@ -1,7 +1,6 @@
 import pygame
-import os
 from .config import *
-from .visualizer import EnvironmentVisualizer
+from . import resources
 
 EFFECT_TRANSLATIONS = {
     "night_temperature_loss": "夜间失温减少",
@@ -51,6 +50,16 @@ WEATHER_TRANSLATIONS = {
     "storm": "暴风雪"
 }
 
+# Bundled font files, in order of preference, and the fonts the UI uses.
+# load_fonts yields once per entry of FONT_SIZES (see LOADING_STEPS in main.py)
+FONT_PATHS = ["simhei.ttf", "msyh.ttc", "arial.ttf"]
+FONT_SIZES = [
+    ("font", FONT_SIZE_NORMAL),
+    ("title_font", FONT_SIZE_TITLE),
+    ("small_font", FONT_SIZE_SMALL),
+    ("large_font", FONT_SIZE_LARGE),
+]
+
 class Button:
     def __init__(self, x, y, width, height, text, callback, color=PANEL_COLOR, hover_color=ACCENT_COLOR, text_color=TEXT_COLOR, icon=None, tooltip=None, icon_size=24, render_func=None):
         self.rect = pygame.Rect(x, y, width, height)
@@ -174,46 +183,76 @@ class Slider:
         self.update_handle()
 
 class UI:
-    def __init__(self, screen):
+    def __init__(self, screen, fonts=True):
         self.screen = screen
-        
-        # Font initialization with web/local fallback
-        font_paths = ["simhei.ttf", "msyh.ttc", "arial.ttf"]
         self.font = None
-        
-        # Try local files first (essential for web)
-        for path in font_paths:
-            if os.path.exists(path):
-                try:
-                    self.font = pygame.font.Font(path, FONT_SIZE_NORMAL)
-                    self.title_font = pygame.font.Font(path, FONT_SIZE_TITLE)
-                    self.small_font = pygame.font.Font(path, FONT_SIZE_SMALL)
-                    self.large_font = pygame.font.Font(path, FONT_SIZE_LARGE)
-                    break
-                except:
-                    continue
-        
-        if not self.font:
-            try:
-                # Try to load a font that supports Chinese from system
-                self.font = pygame.font.SysFont("Microsoft YaHei", FONT_SIZE_NORMAL)
-                self.title_font = pygame.font.SysFont("Microsoft YaHei", FONT_SIZE_TITLE, bold=True)
-                self.small_font = pygame.font.SysFont("Microsoft YaHei", FONT_SIZE_SMALL)
-                self.large_font = pygame.font.SysFont("Microsoft YaHei", FONT_SIZE_LARGE)
-            except:
-                self.font = pygame.font.SysFont("SimHei", FONT_SIZE_NORMAL)
-                self.title_font = pygame.font.SysFont("SimHei", FONT_SIZE_TITLE)
-                self.small_font = pygame.font.SysFont("SimHei", FONT_SIZE_SMALL)
-                self.large_font = pygame.font.SysFont("SimHei", FONT_SIZE_LARGE)
+        self.title_font = None
+        self.small_font = None
+        self.large_font = None
+        self.loading_font = None # pygame's default font, for the loading screen
+        if fonts:
+            for _ in self.load_fonts():
+                pass
             
         self.buttons = []
         self.sliders = []
         self.message_log = []
         self.emoji_cache = {} # (emoji_str, size) -> surface
-        
-        # Initialize Visualizer
+        self._visualizer = None
+
+    def load_fonts(self):
+        # Generator: loads one font per step, so the game's loading screen can
+        # draw a frame in between (see Game.loading_steps). One step per font
+        # whichever way it is found
+        font_path = None # The bundled file in use, once one has loaded
+        for attr, size in FONT_SIZES:
+            font = None
+            # Try bundled files first (essential for web); each Font reads from its own file object
+            for path in ([font_path] if font_path else FONT_PATHS):
+                if resources.loader.exists(path):
+                    try:
+                        font = pygame.font.Font(resources.loader.open(path), size)
+                        font_path = path
+                        break
+                    except:
+                        continue
+            if font is None:
+                font = self.system_font(size, bold=(attr == "title_font"))
+            setattr(self, attr, font)
+            yield
+
+    def system_font(self, size, bold=False):
+        try:
+            # Try to load a font that supports Chinese from system
+            return pygame.font.SysFont("Microsoft YaHei", size, bold=bold)
+        except:
+            return pygame.font.SysFont("SimHei", size)
+
+    def draw_loading(self, progress):
+        # Drawn before the game's fonts exist: pygame's built-in font has no
+        # Chinese glyphs, so just a bar and a percentage
+        if self.loading_font is None:
+            self.loading_font = pygame.font.Font(None, FONT_SIZE_LARGE)
+        self.screen.fill(BG_COLOR)
+        bar_w, bar_h = 480, 24
+        bar_x = (SCREEN_WIDTH - bar_w) // 2
+        bar_y = SCREEN_HEIGHT // 2
+        pygame.draw.rect(self.screen, PANEL_COLOR, (bar_x, bar_y, bar_w, bar_h), border_radius=8)
+        fill_w = int(bar_w * min(progress, 1))
+        if fill_w > 0:
+            pygame.draw.rect(self.screen, ACCENT_COLOR, (bar_x, bar_y, fill_w, bar_h), border_radius=8)
+        pygame.draw.rect(self.screen, LIGHT_GRAY, (bar_x, bar_y, bar_w, bar_h), 2, border_radius=8)
+        text = self.loading_font.render(f"Aotai Walker  {int(min(progress, 1) * 100)}%", True, TEXT_COLOR)
+        self.screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, bar_y - 30)))
+
+    @property
+    def visualizer(self):
+        # Created on first use: the menu doesn't need it
         # Position will be updated in draw_main_view if needed, but we set initial here
-        self.visualizer = EnvironmentVisualizer(40, 320, 640, 150)
+        if self._visualizer is None:
+            from .visualizer import EnvironmentVisualizer
+            self._visualizer = EnvironmentVisualizer(40, 320, 640, 150)
+        return self._visualizer
 
     def get_emoji_surface(self, emoji_str, size=24):
         cache_key = (emoji_str, size)
@@ -236,10 +275,10 @@ class UI:
         ]
         
         for fname in filenames:
-            path = os.path.join(EMOJI_DIR, f"{fname}.svg")
-            if os.path.exists(path):
+            data = resources.loader.open(f"{EMOJI_DIR}/{fname}.svg")
+            if data is not None:
                 try:
-                    surf = pygame.image.load(path)
+                    surf = pygame.image.load(data, f"{fname}.svg")
                     surf = pygame.transform.smoothscale(surf, (size, size))
                     self.emoji_cache[cache_key] = surf
                     return surf
@@ -662,11 +701,7 @@ class UI:
         if total_nodes < 2: return
 
         # Find current index
-        current_idx = 0
-        for i, node in enumerate(nodes):
-            if node['node_id'] == game_state.current_node_id:
-                current_idx = i
-                break
+        current_idx = map_system.node_index.get(game_state.current_node_id, 0)
         
         # Draw Nodes
         for i, node in enumerate(nodes):
@@ -758,7 +793,7 @@ class UI:
             self.draw_text(text, panel_x + 60 + icon_w + 10, y + 5, self.font)
             y += 40
 
-    def draw_game_over(self, game_state):
+    def draw_game_over(self, game_state, turn_stats=None):
         color = GREEN if game_state.game_won else RED
         
         # Title with Icon
@@ -782,10 +817,20 @@ class UI:
             f"最低SAN值: {getattr(game_state, 'lowest_sanity', 100)}",
             f"剩余资金: {game_state.money}"
         ]
-        
+        if turn_stats is not None and turn_stats.turns:
+            # Spread over the trip (game/stats.py), not just the extremes
+            h = turn_stats.histograms
+            stats.append(f"体温中位数: {h['temperature'].quantile(0.5):.1f}°C（最冷一成时间低于 "
+                         f"{h['temperature'].quantile(0.1):.1f}°C），SAN值中位数: {h['sanity'].quantile(0.5):.0f}")
+            line = f"体力中位数: {h['stamina'].quantile(0.5):.0f}"
+            if h['hike_km'].count:
+                line += f"，徒步 {h['hike_km'].count} 小时，平均每小时 {h['hike_km'].mean():.2f} km"
+            stats.append(line)
+        
+        line_height = 30 if len(stats) <= 4 else 25 # Room for the title above the button
         for stat in stats:
             self.draw_text(stat, center_x, y, self.font, center=True)
-            y += 30
+            y += line_height
             
         # Rank/Title
         y += 20
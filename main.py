@@ -1,12 +1,30 @@
+import time
+START_TIME = time.perf_counter() # Startup report (see Game.run)
 import pygame
 import sys
 import random
 import os
 import asyncio
+import io
 from game.config import *
 from game.state import GameState
 from game.systems import ItemSystem, MapSystem, WeatherSystem, EventSystem
-from game.ui import UI, EFFECT_TRANSLATIONS
+from game.simulation import Simulation
+from game import save
+from game.replay import ActionLog, Replayer, log_filename, new_seed, LAST_RUN_LOG
+from game.slots import SlotManager, THUMBNAIL_SIZE, SLOTS_PER_PAGE
+from game.hotreload import DataWatcher, dev_mode
+from game.ui import UI, EFFECT_TRANSLATIONS, FONT_SIZES
+from game import forecast
+from game.stats import TurnStats
+IMPORT_SECONDS = time.perf_counter() - START_TIME
+
+LOADING_STEPS = len(FONT_SIZES) + 3 # Fonts, items, map, save slots (see Game.loading_steps)
+RECOMMEND_FRAME_BUDGET = 0.008 # Seconds of loadout simulation per frame (see Game.run_optimizer)
+FORECAST_FRAME_BUDGET = 0.004 # Seconds of risk forecast samples per frame (see Game.run_forecast)
+RISK_WARNING = 0.25 # Hiking warns if the forecast death chance within 12h is at least this
+AUTO_HIKE_SAMPLES = 50 # Futures per hour when auto hike re-checks the risk (about 0.1s)
+FORECAST_LABELS = {"hike": "徒步", "rest": "休息", "camp": "扎营"}
 
 class Game:
     def __init__(self):
@@ -16,13 +34,18 @@ class Game:
         self.clock = pygame.time.Clock()
         
         self.state = GameState()
-        self.item_system = ItemSystem()
-        self.map_system = MapSystem()
-        self.weather_system = WeatherSystem()
-        self.event_system = EventSystem()
-        self.ui = UI(self.screen)
-        
-        self.game_phase = "MENU" # MENU, SHOP, EXPLORE, EVENT, EVENT_RESULT, GAME_OVER
+        # Data systems, fonts and save slots are loaded by loading_steps
+        # (run() shows a progress bar meanwhile); event data after the menu
+        self.item_system = None
+        self.map_system = None
+        self.weather_system = None
+        self.event_system = None
+        self.sim = None
+        self.slots = None
+        self.ui = UI(self.screen, fonts=False)
+        
+        self.game_phase = "LOADING" # LOADING, MENU, SHOP, EXPLORE, EVENT, EVENT_RESULT, GAME_OVER
+        self.loading_done = 0 # Steps finished, out of LOADING_STEPS
         self.current_event = None
         self.event_result_data = {} # {text: str, changes: [{icon: str, text: str}]}
         
@@ -31,30 +54,183 @@ class Game:
         self.selected_shop_item = None
         self.shop_scroll_x = 0
         self.shop_slider = None
-        
+        self.recommend_task = None # Loadout optimizer running between frames
+
+        # Save slots
+        self.current_slot = None # Slot this run saves to (new slot on first save)
+        self.slot_page = 0
+        self.slot_thumbnails = {} # slot_id -> Surface, decoded when first shown
+
+        self.data_watcher = None
+
+        # Risk forecast for the explore screen, sampled between frames
+        self.forecast = None
+        self.forecast_task = None
+
+    def loading_steps(self):
+        # Everything the menu needs, in small steps (one per frame in run())
+        for _ in self.ui.load_fonts():
+            yield
+        self.item_system = ItemSystem()
+        yield
+        self.map_system = MapSystem()
+        self.weather_system = WeatherSystem()
+        self.sim = Simulation(self.state, self.item_system, self.map_system, self.weather_system, self.event_system)
+        self.sim.stats = TurnStats() # Per-turn histograms for the summary screen
+        yield
+        self.slots = SlotManager() # Reads the slot index
+        self.game_phase = "MENU"
         self.setup_menu()
+        yield
+
+    def load_all(self):
+        # Synchronous startup for headless use (tools): no loading screen
+        for _ in self.loading_steps():
+            pass
+        self.ensure_loaded()
+
+    def ensure_loaded(self):
+        # Everything past the menu needs the event data; load it right away
+        # if the background task hasn't got to it yet
+        if self.event_system is None:
+            self.event_system = EventSystem(self.item_system)
+            self.sim.event_system = self.event_system
+            # Dev mode: reload edited data files while the game runs
+            if dev_mode():
+                self.data_watcher = DataWatcher(self.sim)
+
+    async def load_deferred(self):
+        # Started once the menu is up: event data, the visualizer and the
+        # shop's item icons, one piece per frame so the menu stays responsive
+        start = time.perf_counter()
+        self.ensure_loaded()
+        await asyncio.sleep(0)
+        self.ui.visualizer # Created on first access
+        await asyncio.sleep(0)
+        for item in self.item_system.items.values():
+            if 'icon' in item:
+                self.ui.get_emoji_surface(item['icon'], 24) # Shop button icon size
+                await asyncio.sleep(0)
+        print(f"Deferred loading done in {(time.perf_counter() - start) * 1000:.0f}ms.")
 
     def setup_menu(self):
         self.ui.clear_buttons()
         self.ui.add_button("开始新游戏", self.start_setup_phase, SCREEN_WIDTH//2 - 100, 300, color=GREEN)
         
-        # Check for save game
-        if os.path.exists("savegame.json"):
-            self.ui.add_button("继续游戏", self.load_and_start, SCREEN_WIDTH//2 - 100, 360, color=BLUE)
+        # Check for save games (reads only the slot index)
+        if self.slots.has_slots():
+            self.ui.add_button("继续游戏", self.open_slot_list, SCREEN_WIDTH//2 - 100, 360, color=BLUE)
             
         self.ui.add_button("退出", self.quit_game, SCREEN_WIDTH//2 - 100, 420, color=RED)
 
-    def load_and_start(self):
-        if self.state.load_game():
+    # --- SAVE SLOTS ---
+
+    def open_slot_list(self):
+        self.game_phase = "LOAD"
+        self.slot_page = 0
+        self.setup_slot_ui()
+
+    def slot_rows(self):
+        # (slot_id, metadata, y) for the slots on the current page
+        slots = self.slots.list_slots()
+        start = self.slot_page * SLOTS_PER_PAGE
+        return [(slot_id, meta, 150 + i * 100) for i, (slot_id, meta) in enumerate(slots[start:start + SLOTS_PER_PAGE])]
+
+    def setup_slot_ui(self):
+        self.ui.clear_buttons()
+        panel_x = (SCREEN_WIDTH - 800) // 2
+        
+        for slot_id, meta, y in self.slot_rows():
+            char_name = CHARACTERS.get(meta['character'], {}).get('name', meta['character'])
+            season_name = SEASONS.get(meta['season'], {}).get('name', meta['season'])
+            node = self.map_system.get_node(meta['node'])
+            node_name = node['name'] if node else meta['node']
+            played = time.strftime("%m-%d %H:%M", time.localtime(meta.get('last_played', 0)))
+            text = f"{char_name} · {season_name} · 第{meta['day']}天 · {node_name}  ({played})"
+            
+            self.ui.add_button(text, lambda i=slot_id: self.load_slot(i), panel_x + 180, y + 20, 500, 50, color=BLUE)
+            self.ui.add_button("删除", lambda i=slot_id: self.delete_slot(i), panel_x + 700, y + 20, 100, 50, color=RED)
+        
+        page_count = (len(self.slots.list_slots()) - 1) // SLOTS_PER_PAGE + 1
+        if self.slot_page > 0:
+            self.ui.add_button("上一页", lambda: self.change_slot_page(-1), panel_x, 670, 150, 40, color=GRAY)
+        if self.slot_page < page_count - 1:
+            self.ui.add_button("下一页", lambda: self.change_slot_page(1), panel_x + 650, 670, 150, 40, color=GRAY)
+        self.ui.add_button("返回", self.setup_menu_phase, SCREEN_WIDTH//2 - 75, 670, 150, 40, color=RED)
+
+    def change_slot_page(self, delta):
+        self.slot_page += delta
+        self.setup_slot_ui()
+
+    def delete_slot(self, slot_id):
+        self.slots.delete(slot_id)
+        self.slot_thumbnails.pop(slot_id, None)
+        if not self.slots.has_slots():
+            self.setup_menu_phase()
+            return
+        page_count = (len(self.slots.list_slots()) - 1) // SLOTS_PER_PAGE + 1
+        self.slot_page = min(self.slot_page, page_count - 1)
+        self.setup_slot_ui()
+
+    def get_slot_thumbnail(self, slot_id):
+        if slot_id not in self.slot_thumbnails:
+            surface = None
+            data = self.slots.thumbnail(slot_id)
+            if data:
+                try:
+                    surface = pygame.image.load(io.BytesIO(data), "thumb.png").convert()
+                except pygame.error as e:
+                    print(f"Error loading thumbnail for slot {slot_id}: {e}")
+            self.slot_thumbnails[slot_id] = surface
+        return self.slot_thumbnails[slot_id]
+
+    def draw_slot_list(self):
+        panel_x = (SCREEN_WIDTH - 800) // 2
+        self.ui.draw_text("选择存档", SCREEN_WIDTH//2, 100, self.ui.title_font, center=True)
+        for slot_id, meta, y in self.slot_rows():
+            self.ui.draw_panel(panel_x, y, 160, 90)
+            thumb = self.get_slot_thumbnail(slot_id)
+            if thumb:
+                self.screen.blit(thumb, (panel_x, y))
+
+    def load_slot(self, slot_id):
+        self.ensure_loaded()
+        if self.slots.load(slot_id, self.state):
+            self.current_slot = slot_id
+            self.resume_log(self.slots.slot_file(slot_id))
             self.game_phase = "EXPLORE"
             self.setup_explore_ui()
             self.ui.add_message("存档已加载。")
         else:
             self.ui.add_message("加载存档失败！")
 
+    def resume_log(self, save_filename):
+        # Continue the save's action log if it replays to exactly the saved
+        # state (the RNG then carries on as if the game never stopped).
+        # Otherwise start a new log from a snapshot of the loaded state.
+        self.sim.current_event = None
+        if self.sim.stats is not None:
+            self.sim.stats.reset() # Covers the turns played since loading
+        log = None
+        if save.exists(log_filename(save_filename)):
+            log = ActionLog.load(log_filename(save_filename))
+        if log is not None:
+            replayer = Replayer(self.item_system, self.map_system, self.weather_system, self.event_system)
+            replayed = replayer.replay(log)
+            if self.state.to_dict() == replayed.state.to_dict():
+                self.sim.rng = replayed.rng
+                self.sim.log = log
+                return
+            print("Action log does not match the save, starting a new one")
+
+        seed = new_seed()
+        self.sim.rng = random.Random(seed)
+        self.sim.log = ActionLog(seed, snapshot=self.state.to_dict())
+
     # --- SETUP PHASE (Character & Season) ---
     
     def start_setup_phase(self):
+        self.ensure_loaded()
         self.game_phase = "SETUP"
         self.state.reset()
         self.setup_selection_ui()
@@ -137,19 +313,13 @@ class Game:
         self.setup_selection_ui()
         
     def confirm_setup(self):
-        # Apply Character Buffs
-        char_data = CHARACTERS[self.state.character_id]
-        buffs = char_data['buffs']
-        
-        if 'max_stamina' in buffs:
-            self.state.stamina = buffs['max_stamina']
-            # Note: MAX_STAMINA constant is global, so we might need to handle cap logic carefully
-            # For now, let's just set current stamina. 
-            # Ideally, we should have self.state.max_stamina.
-            
-        # Apply Season Effects
-        season_data = SEASONS[self.state.season]
-        self.state.env_temp = season_data['base_temp']
+        # New run: fresh seed and action log, then character buffs / season
+        self.current_slot = None
+        seed = new_seed()
+        self.sim.rng = random.Random(seed)
+        self.sim.log = ActionLog(seed, self.state.character_id, self.state.season)
+        self.sim.current_event = None
+        self.sim.start(self.state.character_id, self.state.season)
         
         self.start_shop_phase()
 
@@ -280,6 +450,8 @@ class Game:
         # Checkout Button (Fixed position)
         self.ui.add_button("结账出发", self.checkout, SCREEN_WIDTH - 250, SCREEN_HEIGHT - 80, color=GREEN, icon="💳")
         self.ui.add_button("清空购物车", self.clear_cart, SCREEN_WIDTH - 460, SCREEN_HEIGHT - 80, color=RED, icon="❌")
+        self.ui.add_button("推荐装备", self.recommend_loadout, SCREEN_WIDTH - 670, SCREEN_HEIGHT - 80, color=BLUE, icon="✨",
+                           tooltip="按当前角色和季节模拟对局，自动填入存活率最高的装备")
 
     def select_shop_item(self, item_id):
         self.selected_shop_item = item_id
@@ -353,20 +525,59 @@ class Game:
         self.cart = {}
         self.setup_shop_ui()
 
-    def checkout(self):
-        total_cost = sum(self.item_system.get_item(i)['price'] * c for i, c in self.cart.items())
-        if total_cost > self.state.money:
-            self.ui.add_message("预算不足，无法结账！")
+    def recommend_loadout(self):
+        # Fills the cart with the optimizer's loadout (game/loadout.py): from
+        # the cache right away, else simulated between frames
+        if self.recommend_task is not None and not self.recommend_task.done():
+            self.ui.add_message("推荐装备正在计算中...")
             return
-            
+        from game import loadout # numpy is slow to import and only needed here
+        from game.autoplay import AutoPlayer
+        if loadout.np is None:
+            self.ui.add_message("推荐装备需要安装 numpy。")
+            return
+        self.ensure_loaded()
+        player = AutoPlayer(self.item_system, self.map_system, self.weather_system, self.event_system)
+        optimizer = loadout.LoadoutOptimizer(player, self.state.character_id, self.state.season, self.state.money)
+        if optimizer.load() is not None:
+            self.apply_recommendation(optimizer.result)
+            return
+        self.ui.add_message("正在模拟对局计算推荐装备，可继续采购...")
+        self.recommend_task = asyncio.create_task(self.run_optimizer(optimizer))
+
+    async def run_optimizer(self, optimizer):
+        # Simulated games until the frame budget is used up, then a frame
+        deadline = time.perf_counter() + RECOMMEND_FRAME_BUDGET
+        try:
+            for _ in optimizer.steps():
+                if time.perf_counter() > deadline:
+                    await asyncio.sleep(0)
+                    deadline = time.perf_counter() + RECOMMEND_FRAME_BUDGET
+        except Exception as e:
+            print(f"Loadout optimizer failed: {e}")
+            self.ui.add_message("推荐装备计算失败！")
+            return
+        optimizer.save()
+        # Only if the player is still shopping for the same trip
+        if self.game_phase == "SHOP" and (self.state.character_id, self.state.season) == \
+                (optimizer.character_id, optimizer.season):
+            self.apply_recommendation(optimizer.result)
+
+    def apply_recommendation(self, result):
+        self.cart = {i: n for i, n in result['cart'].items() if i in self.item_system.items}
+        self.setup_shop_ui()
+        self.ui.add_message(f"已填入推荐装备：{result['price']}元，{result['weight']:.1f}kg。")
+        self.ui.add_message(f"模拟{result['seeds']}局：通关率 {result['win_rate']:.0%}，平均前进 {result['mean_km']:.1f}km。")
+
+    def checkout(self):
         if not self.cart:
             self.ui.add_message("购物车为空！")
             # Allow starting without items? Maybe warn.
-            
-        # Deduct money and add items
-        self.state.money -= total_cost
-        for item_id, count in self.cart.items():
-            self.state.add_item(item_id, count)
+
+        # Deduct money, add items and set off
+        if not self.sim.checkout(self.cart):
+            self.ui.add_message("预算不足，无法结账！")
+            return
         
         # Save cart for next time
         self.state.save_cart(self.cart)
@@ -376,73 +587,11 @@ class Game:
     # --- EXPLORE PHASE ---
 
     def update_environment(self):
-        node = self.map_system.get_node(self.state.current_node_id)
-        if not node: return
-        
-        altitude = node['altitude']
-        
-        # Temp: Base 20C, -6.5C per 1000m
-        # Season Base Temp
-        season_base = SEASONS[self.state.season]['base_temp']
-        base_temp = season_base - (altitude / 1000.0) * 6.5
-        
-        # Weather effect
-        weather_effects = self.weather_system.get_weather_effects(self.state.weather)
-        weather_temp = weather_effects.get('temp', 0)
-        
-        # Time of day effect (Night is colder)
-        time_temp = 0
-        if self.state.day_time < 6 or self.state.day_time > 20:
-            time_temp = -5
-            
-        self.state.env_temp = base_temp + weather_temp + time_temp
-        
-        # Logic: If temp < 0 and raining, turn to snow
-        if self.state.env_temp < 0 and self.state.weather == 'rain':
-            self.state.weather = 'snow'
-            # Re-calculate weather effects since weather changed
-            weather_effects = self.weather_system.get_weather_effects(self.state.weather)
-            weather_temp = weather_effects.get('temp', 0)
-            self.state.env_temp = base_temp + weather_temp + time_temp
-
-        # Wind
-        base_wind = 1
-        if altitude > 2500: base_wind += 1
-        if altitude > 3000: base_wind += 1
-        if altitude > 3400: base_wind += 1
-        
-        if self.state.weather == "storm": base_wind += 4
-        elif self.state.weather == "snow": base_wind += 2
-        elif self.state.weather == "rain": base_wind += 1
-        
-        self.state.wind_level = min(10, base_wind)
-
-        # Update Body Temp & Sanity
-        # Calculate gear warmth based on items in inventory
-        total_protection = 0
-        for item_id in self.state.inventory:
-            item = self.item_system.get_item(item_id)
-            if item and 'temp_protection' in item.get('effects', {}):
-                total_protection += item['effects']['temp_protection']
-        
-        # Base comfort threshold is 10C. Gear lowers this threshold.
-        gear_warmth = 10.0 - total_protection
-        
-        self.state.update_body_temp(self.state.env_temp, gear_warmth)
-        self.state.update_sanity_drain()
+        self.sim.update_environment()
 
     def start_explore_phase(self):
         self.game_phase = "EXPLORE"
         self.ui.add_message("徒步开始！")
-        
-        # Initialize distance for the first node
-        current_node = self.map_system.get_node(self.state.current_node_id)
-        if current_node and 'distance_to_next' in current_node:
-            self.state.distance_to_next_node = current_node['distance_to_next']
-        else:
-            self.state.distance_to_next_node = 0
-            
-        self.update_environment()
         self.setup_explore_ui()
 
     def setup_explore_ui(self):
@@ -460,8 +609,11 @@ class Game:
         
         # Hiking Controls
         if self.state.distance_to_next_node > 0:
-            self.ui.add_button("继续徒步 (1h)", self.hike, btn_x, y, btn_w, 50, color=GREEN, icon="🚶")
+            self.ui.add_button("继续徒步 (1h)", self.hike, btn_x, y, btn_w, 50, color=GREEN, icon="🚶",
+                               tooltip=self.risk_tooltip(("hike",)))
             y += 60
+            self.ui.add_button("自动徒步 (直到抵达/警告)", self.auto_hike, btn_x, y, btn_w, 40, color=GREEN, icon="👣")
+            y += 50
             
             # Student Teleport Ability
             if self.state.character_id == "student" and not self.state.teleport_used:
@@ -487,13 +639,24 @@ class Game:
         half_w = (btn_w - 10) // 2
         
         if self.state.action_points > 0:
-            self.ui.add_button("休息 (1h)", self.rest, btn_x, y, half_w, 40, color=BLUE, icon="💤")
+            self.ui.add_button("休息 (1h)", self.rest, btn_x, y, half_w, 40, color=BLUE, icon="💤",
+                               tooltip=self.risk_tooltip(("rest",)))
         else:
             self.ui.add_button("休息 (1h)", lambda: None, btn_x, y, half_w, 40, color=GRAY, icon="💤")
             
-        self.ui.add_button("扎营 (过夜)", self.camp, btn_x + half_w + 10, y, half_w, 40, color=PURPLE, icon="⛺")
+        self.ui.add_button("扎营 (过夜)", self.camp, btn_x + half_w + 10, y, half_w, 40, color=PURPLE, icon="⛺",
+                           tooltip=self.risk_tooltip(("camp", 12)))
         
         y += 50
+
+        if self.state.action_points > 0 and self.state.stamina < 80:
+            self.ui.add_button("休息至体力80", self.rest_until, btn_x, y, half_w, 40, color=BLUE, icon="💤")
+        else:
+            self.ui.add_button("休息至体力80", lambda: None, btn_x, y, half_w, 40, color=GRAY, icon="💤")
+
+        self.ui.add_button("睡到天亮", self.camp_until_morning, btn_x + half_w + 10, y, half_w, 40, color=PURPLE, icon="⛺")
+
+        y += 50
         
         # Eat Snow (Conditional)
         if self.state.thirst <= 30:
@@ -513,8 +676,7 @@ class Game:
         
         consumables = []
         for item_id, count in sorted(self.state.inventory.items()):
-            item = self.item_system.get_item(item_id)
-            if item and any(k in item['effects'] for k in ['hunger', 'thirst', 'heal', 'sanity', 'stamina']):
+            if item_id in self.item_system.consumables:
                 consumables.append(item_id)
         
         for i, item_id in enumerate(consumables):
@@ -546,6 +708,59 @@ class Game:
         self.ui.add_button("保存进度", self.manual_save, btn_x, 660, btn_w, 40, color=BLUE, icon="💾")
         self.ui.add_button("返回主菜单", self.setup_menu_phase, btn_x, 710, btn_w, 40, color=RED, icon="🏠")
 
+        self.request_forecast()
+
+    # --- Risk forecast (game/forecast.py) ---
+
+    def current_forecast(self):
+        # The forecast for the state on screen, possibly still sampling
+        if self.forecast is not None and self.forecast.signature == forecast.signature(self.state):
+            return self.forecast
+        return None
+
+    def request_forecast(self):
+        if self.current_forecast() is not None or self.state.game_over:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return # Headless (tools, benchmarks): no forecast
+        if self.forecast_task is not None:
+            self.forecast_task.cancel()
+        self.forecast = forecast.Forecast(forecast.playthrough(self.sim))
+        self.forecast_task = asyncio.create_task(self.run_forecast(self.forecast))
+
+    async def run_forecast(self, f):
+        # A few samples per frame; the explore buttons get their tooltips at the end
+        deadline = time.perf_counter() + FORECAST_FRAME_BUDGET
+        for _ in f.steps():
+            if time.perf_counter() > deadline:
+                await asyncio.sleep(0)
+                deadline = time.perf_counter() + FORECAST_FRAME_BUDGET
+        if self.game_phase == "EXPLORE" and self.current_forecast() is f:
+            self.setup_explore_ui()
+
+    def risk_tooltip(self, action):
+        f = self.current_forecast()
+        if f is None or not f.complete or action not in f.actions:
+            return None
+        lines = [f"{f.horizon}小时内死亡概率: {f.death_probability(action):.0%}（模拟{f.done}次）"]
+        for stat, label in (("health", "健康"), ("sanity", "SAN"), ("temperature", "体温")):
+            q = f.quantiles(action, f.horizon, stat)
+            if q:
+                lines.append(f"{f.horizon}小时后{label}: 中位 {q[1]:.0f}，较差情况 {q[0]:.0f}")
+        return "\n".join(lines)
+
+    def risk_summary(self):
+        # One line for the warning dialog
+        f = self.current_forecast()
+        if f is None:
+            return None
+        if not f.complete:
+            return f"正在评估风险... ({f.done}/{f.samples})"
+        parts = [f"{FORECAST_LABELS[a[0]]} {f.death_probability(a):.0%}" for a in f.actions]
+        return f"{f.horizon}小时内死亡概率: " + "，".join(parts)
+
     def confirm_eat_snow(self):
         self.game_phase = "EAT_SNOW_CONFIRM"
         self.setup_eat_snow_ui()
@@ -566,12 +781,9 @@ class Game:
         self.setup_explore_ui()
 
     def perform_eat_snow(self):
-        self.state.thirst = min(self.state.thirst + 20, MAX_THIRST)
-        self.state.temperature -= 2.0
-        self.state.health -= 5
-        self.state.sanity -= 10
+        game_over = self.sim.eat_snow()
         self.ui.add_message("你吃了一口雪，解了渴，但身体冻得发抖。")
-        self.check_turn_end()
+        self.check_game_over_state(game_over)
         if self.game_phase != "GAME_OVER":
             self.game_phase = "EXPLORE"
             self.setup_explore_ui()
@@ -621,82 +833,24 @@ class Game:
         self.setup_explore_ui()
 
     def consume_item(self, item_id, cooked=True):
-        item = self.item_system.get_item(item_id)
-        if self.state.consume_item(item):
-            self.state.remove_item(item_id)
-            
-            # Apply cooked modifier if false
-            if not cooked:
-                # Revert and re-apply half? Or just hack the stats?
-                # Since state.consume_item already applied full effects, we need to undo half
-                # This is tricky. Better to modify state.consume_item or handle effects manually here.
-                # Let's manually adjust for now since consume_item is generic.
-                # Actually, state.consume_item returns True if used.
-                # We can check the item effects and reverse half.
-                for effect, value in item['effects'].items():
-                    if isinstance(value, (int, float)) and effect in ['hunger', 'sanity', 'health', 'stamina']:
-                        # Reverse half of the gain (so we only get half)
-                        # e.g. hunger +80. We want +40. So we subtract 40.
-                        half_val = value * 0.5
-                        if effect == 'hunger': self.state.hunger -= half_val
-                        elif effect == 'sanity': self.state.sanity -= half_val
-                        elif effect == 'health': self.state.health -= half_val
-                        elif effect == 'stamina': self.state.stamina -= half_val
-            
+        if self.sim.consume(item_id, cooked):
+            item = self.item_system.get_item(item_id)
             self.ui.add_message(f"使用了 {item['name']}")
             self.setup_explore_ui()
 
-    def eat_snow(self):
-        self.state.thirst = min(self.state.thirst + 20, MAX_THIRST)
-        self.state.temperature -= 2
-        self.state.health -= 2
-        self.state.sanity -= 2
-        self.state.action_points -= 0.5 # Takes 30 mins?
-        self.ui.add_message("你抓了一把雪塞进嘴里，透心凉。")
-        self.check_turn_end()
-        if self.game_phase != "GAME_OVER":
-            self.setup_explore_ui()
-
-    def scavenge(self):
-        # This is now triggered by an event, so AP/Time cost is handled by the event description or here?
-        # The event says "Consume 1h". So we should deduct here.
-        # But if called from event, we might want to be careful about double deduction if event effects also deduct.
-        # The event JSON says "special_action": "scavenge", but NO other effects like action_points: -1.
-        # So we deduct here.
-        
-        if self.state.action_points < 1:
+    def show_scavenge_result(self, result):
+        # Scavenge is an event special action, resolved in Simulation.scavenge
+        if not result['ok']:
             self.ui.add_message("行动点不足！")
             return
-            
-        self.state.action_points -= 1
-        self.state.update_time(1)
-        
-        # Karma affects luck
-        # Karma ranges roughly -10 to 50?
-        # Add karma * 0.005 to the roll. 20 Karma = +0.1
-        luck_modifier = self.state.karma * 0.005
-        roll = random.random() + luck_modifier
-        
-        found_item = None
-        
-        if roll < 0.1:
-            self.ui.add_message("你搜寻了一番，什么也没找到。")
-        elif roll < 0.5: # 40% Common
-            common_items = ["water_bottle", "food_instant_noodles", "food_naan", "candy"]
-            found_item = random.choice(common_items)
-        elif roll < 0.8: # 30% Rare
-            rare_items = ["gas", "batteries", "medicine", "food_beef_jerky"]
-            found_item = random.choice(rare_items)
-        else: # 20% Precious
-            precious_items = ["first_aid_kit", "liquor", "food_high_energy"] 
-            found_item = random.choice(precious_items)
-            
-        if found_item:
-            item = self.item_system.get_item(found_item)
-            self.state.add_item(found_item)
+
+        if result['item']:
+            item = self.item_system.get_item(result['item'])
             self.ui.add_message(f"你找到了: {item['name']}！")
-            
-        self.check_turn_end()
+        else:
+            self.ui.add_message("你搜寻了一番，什么也没找到。")
+
+        self.check_game_over_state()
         # Return to explore UI
         if self.game_phase != "GAME_OVER":
             self.game_phase = "EXPLORE" # Force explore phase
@@ -722,8 +876,7 @@ class Game:
         self.setup_explore_ui()
 
     def retreat(self):
-        self.state.game_won = True # Technically survived
-        self.state.status_message = f"你选择了下撤，保住了性命。剩余资金 {self.state.money} 已保存。"
+        self.sim.retreat()
         self.game_phase = "GAME_OVER"
         self.setup_game_over_ui()
 
@@ -736,24 +889,11 @@ class Game:
             self.ui.add_message("体力耗尽，无法继续前行！")
             return
 
-        # Character Buffs: Stamina Cost
-        stamina_cost = 10
-        char_buffs = CHARACTERS[self.state.character_id]['buffs']
-        if 'stamina_cost_mult' in char_buffs:
-            stamina_cost *= char_buffs['stamina_cost_mult']
-            
         # Warning Check
         if not getattr(self, 'warning_confirmed', False):
-            warnings = []
-            if self.state.health < 30: warnings.append("健康值过低")
-            if self.state.stamina < 20: warnings.append("体力过低") # Use fixed threshold for warning
-            if self.state.sanity < 20: warnings.append("SAN值过低")
-            
+            warnings = self.hike_warnings()
             if warnings:
-                # Show warning dialog logic
-                # Since we don't have a modal system, we can use a special phase or just a message + flag
-                # Let's use a simple toggle button approach or a message
-                # Better: Switch to a WARNING phase
+                # Switch to a WARNING phase
                 self.game_phase = "WARNING"
                 self.warning_msg = f"警告: {', '.join(warnings)}！\n强行赶路可能导致死亡。"
                 self.setup_warning_ui()
@@ -761,98 +901,110 @@ class Game:
 
         self.warning_confirmed = False # Reset for next time
 
-        # Calculate distance
-        base_speed = 2.0 # km/h (Reduced from 3.0)
-        
-        # Modifiers
-        current_node = self.map_system.get_node(self.state.current_node_id)
-        terrain = current_node.get('terrain', 'normal')
-        altitude = current_node.get('altitude', 2000)
-        
-        terrain_factor = 1.0
-        if terrain == 'forest': terrain_factor = 0.8
-        elif terrain == 'rocky': terrain_factor = 0.6
-        elif terrain == 'ridge': terrain_factor = 0.5
-        elif terrain == 'danger': terrain_factor = 0.4
-        elif terrain == 'meadow': terrain_factor = 1.0
-        
-        altitude_factor = max(0.5, 1.0 - (max(0, altitude - 2500) / 5000))
-        
-        weight = self.item_system.calculate_weight(self.state.inventory)
-        weight_factor = 1.0
-        if weight > MAX_WEIGHT_BASE:
-            overweight = weight - MAX_WEIGHT_BASE
-            weight_factor = max(0.5, 1.0 - (overweight * 0.05))
-            
-        weather_effects = self.weather_system.get_weather_effects(self.state.weather)
-        
-        # Wind Factor
-        wind_factor = 1.0
-        if self.state.wind_level >= 6: wind_factor = 0.8
-        if self.state.wind_level >= 8: wind_factor = 0.5
-        
-        # Temp Factor
-        temp_factor = 1.0
-        if self.state.env_temp < -10: temp_factor = 0.9
-        if self.state.env_temp < -20: temp_factor = 0.7
-        
-        # Weight Bonus/Penalty
-        # If weight is low, give bonus
-        if weight < MAX_WEIGHT_BASE * 0.8:
-            weight_factor = 1.1 # 10% faster if light
-        
-        # Random Factor (0.8 - 1.2)
-        random_factor = random.uniform(0.8, 1.2)
-        
-        # Status Factor
-        status_factor = 1.0
-        if self.state.health > 80 and self.state.stamina > 80:
-            status_factor += 0.2
-        if self.state.health < 50:
-            status_factor -= 0.2
-        if self.state.hunger < 30:
-            status_factor -= 0.1
-        if self.state.thirst < 30:
-            status_factor -= 0.1
-            
-        # Character Buffs: Move Speed
-        char_buffs = CHARACTERS[self.state.character_id]['buffs']
-        if 'move_speed_mult' in char_buffs:
-            status_factor *= char_buffs['move_speed_mult']
-
-        dist = base_speed * terrain_factor * altitude_factor * weight_factor * wind_factor * temp_factor * random_factor * status_factor
-        
-        # Update State
-        self.state.distance_to_next_node -= dist
-        if self.state.distance_to_next_node < 0: self.state.distance_to_next_node = 0
-        
-        # Stamina Cost
-        wind_cost = 1.0 + (self.state.wind_level * 0.05)
-        cold_cost = 1.0
-        if self.state.env_temp < 0: cold_cost += abs(self.state.env_temp) * 0.02
-        
-        stamina_cost = 15 * (1.0 + (1.0 - terrain_factor) + (1.0 - altitude_factor)) * weather_effects.get('stamina_cost', 1.0) * wind_cost * cold_cost
-        
-        # Character Buffs: Stamina Cost (Apply again here for calculation)
-        if 'stamina_cost_mult' in char_buffs:
-            stamina_cost *= char_buffs['stamina_cost_mult']
-            
-        self.state.stamina -= stamina_cost
-        self.state.action_points -= 1
-        self.state.update_time(1)
-        self.update_environment()
-        
+        # Hike, roll events, passive drain
+        dist, event = self.sim.hike()
         self.ui.add_message(f"徒步1小时，前进了 {dist:.1f}km。")
         
-        # Check Events
-        event = self.event_system.check_event(self.state, self.map_system, context={'phase': 'hike'})
         if event:
             self.trigger_event(event)
         else:
-            self.check_turn_end()
+            self.check_game_over_state()
             if self.game_phase != "GAME_OVER":
                 self.setup_explore_ui()
 
+    # --- Macro Actions ---
+    # Run many turns in the simulation core and rebuild the UI once at the end.
+    # They stop on events, game over and the hike warning thresholds.
+
+    def hike_warnings(self):
+        # Stat thresholds, plus the forecast's risk once it is complete
+        warnings = self.sim.hike_warnings()
+        f = self.current_forecast()
+        if f is not None and f.complete and ("hike",) in f.actions \
+                and f.death_probability(("hike",)) >= RISK_WARNING:
+            warnings.append("死亡风险高")
+        return warnings
+
+    def hike_risk_warning(self):
+        # The forecast's hike risk for the state reached now. The on-screen
+        # forecast is only for the hour auto hike started at, so this one is
+        # sampled on the spot (hike only, fewer futures)
+        f = forecast.Forecast(forecast.playthrough(self.sim), actions=[("hike",)],
+                              samples=AUTO_HIKE_SAMPLES).finish()
+        return f.death_probability(("hike",)) >= RISK_WARNING
+
+    def auto_hike(self):
+        # Hike until arrival, a warning (as for one hour), an event or out of action points
+        if self.hike_warnings() or self.state.action_points <= 0 or self.state.stamina <= 10:
+            self.hike() # Shows the usual warning / error
+            return
+        # The risk is re-checked every hour if the game forecasts at all (not headless)
+        check_risk = self.current_forecast() is not None
+
+        hours = 0
+        total_dist = 0
+        stop_reason = None
+        event = None
+        while self.state.distance_to_next_node > 0:
+            if self.state.action_points <= 0:
+                stop_reason = "行动点耗尽"
+                break
+            if self.state.stamina <= 10:
+                stop_reason = "体力耗尽"
+                break
+            warnings = self.hike_warnings()
+            if hours and check_risk and self.hike_risk_warning():
+                warnings.append("死亡风险高")
+            if warnings:
+                stop_reason = ', '.join(warnings)
+                break
+
+            dist, event = self.sim.hike()
+            total_dist += dist
+            hours += 1
+            if event or self.state.game_over:
+                break
+
+        msg = f"自动徒步{hours}小时，前进了 {total_dist:.1f}km。"
+        if stop_reason:
+            msg += f" 停止: {stop_reason}。"
+        elif self.state.distance_to_next_node <= 0:
+            msg += " 已走完本段路程。"
+        self.ui.add_message(msg)
+        self.finish_macro(event)
+
+    def rest_until(self, stamina_target=80):
+        hours = 0
+        event = None
+        while self.state.action_points > 0 and self.state.stamina < stamina_target:
+            event = self.sim.rest()
+            hours += 1
+            if event or self.state.game_over:
+                break
+
+        if hours == 0:
+            self.ui.add_message("行动点不足，无法休息。" if self.state.action_points <= 0 else "体力已充足。")
+            return
+        self.ui.add_message(f"休息了{hours}小时，体力恢复到 {int(self.state.stamina)}。")
+        self.finish_macro(event)
+
+    def camp_until_morning(self):
+        # Sleep until 6:00 (the start of "day" for events); at night only
+        # (before 6:00 or after 19:00, as for events), so at most 10 hours
+        if 6 <= self.state.day_time <= 19:
+            self.ui.add_message("天还亮着，不必睡到天亮。")
+            return
+        self.camp((6 - self.state.day_time) % 24)
+
+    def finish_macro(self, event):
+        if event:
+            self.trigger_event(event)
+        elif self.state.game_over:
+            self.game_phase = "GAME_OVER"
+            self.setup_game_over_ui()
+        else:
+            self.setup_explore_ui()
+
     def setup_warning_ui(self):
         self.ui.clear_buttons()
         
@@ -877,16 +1029,10 @@ class Game:
         self.hike() # Call hike again, this time it will pass the check
 
     def travel_to_node(self, node_id):
-        # Arrive at the node logic
-        target_node = self.map_system.get_node(node_id)
-        self.state.current_node_id = node_id
-        
-        # Set up next leg
-        if 'distance_to_next' in target_node:
-            self.state.distance_to_next_node = target_node['distance_to_next']
-        else:
-            self.state.distance_to_next_node = 0
-            
+        # Arrive at the node and set up the next leg
+        self.show_arrival(self.sim.travel(node_id))
+
+    def show_arrival(self, target_node):
         self.ui.add_message(f"抵达 {target_node['name']}。")
         
         # Check for 2800 Camp Retreat Prompt
@@ -897,8 +1043,7 @@ class Game:
         self.setup_explore_ui()
 
     def finish_game(self):
-        self.state.game_won = True
-        self.state.status_message = "恭喜你完成了鳌太穿越！"
+        self.sim.finish()
         self.game_phase = "GAME_OVER"
         self.setup_game_over_ui()
 
@@ -907,179 +1052,55 @@ class Game:
             self.ui.add_message("行动点不足，无法休息。")
             return
 
-        self.state.stamina = min(self.state.stamina + 15, MAX_STAMINA)
-        # Rest restores some body temp if not starving
-        if self.state.hunger > 30:
-            self.state.temperature = min(self.state.temperature + 0.5, 37.0)
-            
-        self.state.update_time(1)
-        self.update_environment()
-        self.state.action_points -= 1
+        # Rest, roll events (Rest phase), passive drain
+        event = self.sim.rest()
         self.ui.add_message("休息了一会儿，体力恢复。")
         
-        # Check for events (Rest phase)
-        event = self.event_system.check_event(self.state, self.map_system, context={'phase': 'rest'})
         if event:
             self.trigger_event(event)
             return
 
-        self.check_turn_end()
+        self.check_game_over_state()
         if self.game_phase != "GAME_OVER":
             self.setup_explore_ui()
 
-    def camp(self):
+    def camp(self, hours_to_sleep=12):
         if not self.state.has_item("tent"):
             self.ui.add_message("没有帐篷，无法扎营！")
             return
-            
-        # Base Restoration
-        rest_stamina = 40
-        rest_sanity = 10
-        
-        # Penalties for poor condition
-        if self.state.hunger < 30 or self.state.thirst < 30:
-            rest_stamina *= 0.5
-            rest_sanity *= 0.5
-            self.ui.add_message("饱腹感或水分不足让你难以入眠，恢复效果减半。")
-            
-        self.state.stamina += rest_stamina
-        self.state.sanity += rest_sanity
-        
-        # Temperature Restoration
-        # Tent adds virtual warmth, but doesn't guarantee 37.0 if extremely cold/hungry
-        # Gear warmth helps here
-        gear_warmth = 10.0 # Base tent warmth bonus
-        for i_id in self.state.inventory:
-            # Sleeping bags?
-            item = self.item_system.get_item(i_id)
-            if item and 'temp_protection' in item['effects']:
-                gear_warmth += item['effects']['temp_protection']
 
-        # If hungry, body generates less heat
-        body_heat_gen = 1.0
-        if self.state.hunger < 20: body_heat_gen = 0.5
-        if self.state.health < 50: body_heat_gen *= 0.8
-        
-        # Calculate overnight recovery based on Environment and Gear
-        # Assume tent + sleeping bag creates a micro-climate
-        # If micro-climate > 15C, we recover to 37.
-        # If micro-climate < 0C, we might lose heat!
-        
-        # Simplified:
-        # If Hunger > 20 and Gear is decent -> Restore to near max
-        if self.state.hunger > 20:
-             # Good condition
-             if self.state.temperature < 35:
-                 self.state.temperature += 2.0
-             else:
-                 self.state.temperature = min(37.0, self.state.temperature + 1.0)
-        else:
-            # Hungry
-            if self.state.temperature < 35:
-                # Barely warming up
-                self.state.temperature += 0.5
-            else:
-                 # Maintain
-                 pass
-                 
-        self.state.clamp_stats()
+        # Sleep (restoration, hourly drain integrated in one step, spoilage, camp events)
+        result = self.sim.camp(hours_to_sleep)
 
-        # Sleep for 12 hours
-        hours_to_sleep = 12
-        
-        # Iterate hours to apply continuous drain/effects
-        for _ in range(hours_to_sleep):
-            self.state.update_time(1)
-            self.update_environment() # Updates temp based on time of day
-            
-            # Additional Drain while sleeping
-            # Passive drain is usually handled in check_turn_end, but that runs once per ACTION.
-            # Overnight is 12 hours. We should apply 12x distinct drains or a lump sum,
-            # BUT check_turn_end logic might be too harsh if applied 12 times recursively with UI updates.
-            # We will manually apply simplified hourly drain here.
-            
-            # Hunger/Thirst drain slower while sleeping (0.5x)
-            h_drain = 1.0
-            t_drain = 1.5
-            
-            # Hypothermia Check
-            if self.state.temperature < 35.0:
-                 self.state.health -= 2 # Lose health if sleeping cold
-            if self.state.temperature < 32.0:
-                 self.state.health -= 5 # Critical cold
-                 
-            self.state.hunger -= h_drain
-            self.state.thirst -= t_drain
-            
-            # Sanity Drain from conditions
-            if self.state.hunger < 10 or self.state.thirst < 10:
-                self.state.sanity -= 0.5
-                
-            self.state.clamp_stats()
-            if self.state.health <= 0:
-                break # Died in sleep
+        if result['poor_rest']:
+            self.ui.add_message("饱腹感或水分不足让你难以入眠，恢复效果减半。")
 
-        self.state.weather = self.weather_system.next_weather(self.state.weather, self.state.season)
-        self.state.action_points = DAILY_ACTION_POINTS
-        
-        # Daily Spoilage Check
-        spoiled_items = []
-        for item_id in list(self.state.inventory.keys()):
-            item = self.item_system.get_item(item_id)
-            if item and 'spoil_chance' in item['effects']:
-                chance = item['effects']['spoil_chance']
-                if random.random() < chance:
-                    self.state.remove_item(item_id, 1)
-                    spoiled_items.append(item['name'])
-        
         msg = f"扎营休息了{hours_to_sleep}小时。"
-        if spoiled_items:
-            msg += f"\n注意：{', '.join(spoiled_items)} 变质了，已丢弃。"
+        if result['spoiled']:
+            msg += f"\n注意：{', '.join(result['spoiled'])} 变质了，已丢弃。"
         
         self.ui.add_message(msg)
         
-        # Check for events (Camp phase)
-        event = self.event_system.check_event(self.state, self.map_system, context={'phase': 'camp'})
-        if event:
-            self.trigger_event(event)
+        if result['event']:
+            self.trigger_event(result['event'])
             return
             
-        self.check_game_over_state() # Use dedicated check instead of check_turn_end to avoid double drain
+        self.check_game_over_state() # No passive drain after sleeping
         if self.game_phase != "GAME_OVER":
             self.setup_explore_ui()
 
-    def check_game_over_state(self):
-         if self.state.check_game_over():
-             self.game_phase = "GAME_OVER"
-             self.setup_game_over_ui()
-
-    def check_turn_end(self):
-        # Passive drain
-        hunger_drain = 2
-        thirst_drain = 3
-        
-        # Character Buffs: Hunger Drain
-        char_buffs = CHARACTERS[self.state.character_id]['buffs']
-        if 'hunger_drain_mult' in char_buffs:
-            hunger_drain *= char_buffs['hunger_drain_mult']
-            
-        self.state.hunger -= hunger_drain
-        self.state.thirst -= thirst_drain
-        self.state.clamp_stats()
-        
-        # Spoilage Check (Daily or per turn? "Daily spoil chance" implies daily)
-        # But check_turn_end runs often. Let's do it when day changes in camp/rest?
-        # Or just small chance every turn?
-        # Let's do it on day change.
-        
-        if self.state.check_game_over():
+    def check_game_over_state(self, game_over=None):
+        # The simulation has already run the death check for the turn
+        if game_over is None:
+            game_over = self.state.game_over
+        if game_over:
             self.game_phase = "GAME_OVER"
             self.setup_game_over_ui()
 
     def trigger_event(self, event):
+        # Simulation.trigger_event has already marked it as triggered
         self.game_phase = "EVENT"
         self.current_event = event
-        self.state.triggered_events.add(event['event_id'])
         self.setup_event_ui()
 
     def setup_event_ui(self):
@@ -1094,7 +1115,7 @@ class Game:
         btn_x = panel_x + (panel_w - btn_w) // 2
         y = panel_y + 250
         
-        for choice in self.current_event['choices']:
+        for idx, choice in enumerate(self.current_event['choices']):
             # Check requirements
             reqs = choice.get('requirements', {})
             can_choose = True
@@ -1105,117 +1126,27 @@ class Game:
                         break
             
             if can_choose:
-                self.ui.add_button(choice['text'], lambda c=choice: self.handle_event_choice(c), btn_x, y, btn_w, 50, color=BLUE)
+                self.ui.add_button(choice['text'], lambda i=idx: self.handle_event_choice(i), btn_x, y, btn_w, 50, color=BLUE)
             else:
                 self.ui.add_button(choice['text'] + " (条件不足)", lambda: None, btn_x, y, btn_w, 50, color=GRAY)
             
             y += 60
 
-    def handle_event_choice(self, choice):
-        effects = choice.get('effects', {})
-        
-        # Handle Random Outcomes (Select one effect set based on chance)
-        if 'random_outcome' in effects:
-            rand = random.random()
-            acc = 0
-            for outcome in effects['random_outcome']:
-                acc += outcome['chance']
-                if rand <= acc:
-                    effects = outcome['effects']
-                    break
+    def handle_event_choice(self, choice_index):
+        # Random outcome, effects and weather update happen in the simulation
+        outcome = self.sim.choose(choice_index)
 
         # Special Action: Scavenge
-        if effects.get('special_action') == 'scavenge':
-            self.scavenge()
-            # scavenge handles UI updates, but we are in EVENT phase.
-            # We need to transition back to EXPLORE or show result.
-            # scavenge() calls setup_explore_ui() at the end.
-            # But we are currently in EVENT phase loop.
-            # We should probably let scavenge run, then set phase to EVENT_RESULT to show what we found?
-            # Or just let scavenge show a message and return to explore.
-            # The issue is scavenge() sets phase to EXPLORE.
-            # But we want to see the result.
-            # Let's modify scavenge to return the item found, and we display it here.
-            # OR, we just let scavenge do its thing and we exit the event.
-            # But scavenge() checks turn end and updates time.
-            # Let's just call it. It will switch phase to EXPLORE.
-            # But we might want to see "Event Result" screen.
-            # Actually, scavenge() prints a message to the log.
-            # If we switch to EXPLORE immediately, the user sees the log.
-            # That's acceptable.
+        if outcome['scavenge'] is not None:
+            self.show_scavenge_result(outcome['scavenge'])
             return
 
-        # Build detailed result message
-        changes = []
-        
-        if 'stamina' in effects: 
-            val = effects['stamina']
-            self.state.stamina += val
-            changes.append({'icon': '⚡', 'text': f"体力 {'+' if val>0 else ''}{val}"})
-            
-        if 'sanity' in effects: 
-            val = effects['sanity']
-            self.state.sanity += val
-            changes.append({'icon': '🧠', 'text': f"SAN值 {'+' if val>0 else ''}{val}"})
-            
-        if 'health' in effects:
-            val = effects['health']
-            self.state.health += val
-            changes.append({'icon': '❤️', 'text': f"健康 {'+' if val>0 else ''}{val}"})
-            
-        if 'thirst' in effects:
-            val = effects['thirst']
-            self.state.thirst += val
-            changes.append({'icon': '💧', 'text': f"水分 {'+' if val>0 else ''}{val}"})
-            
-        if 'hunger' in effects:
-            val = effects['hunger']
-            self.state.hunger += val
-            changes.append({'icon': '🍗', 'text': f"饱腹感 {'+' if val>0 else ''}{val}"})
-            
-        if 'karma' in effects: 
-            val = effects['karma']
-            self.state.karma += val
-            changes.append({'icon': '🌟', 'text': f"人品 {'+' if val>0 else ''}{val}"})
-            
-        if 'temp' in effects:
-            val = effects['temp']
-            self.state.temperature += val
-            changes.append({'icon': '🌡️', 'text': f"体温 {'+' if val>0 else ''}{val}"})
-            
-        if 'remove_item' in effects:
-            item_id = effects['remove_item']
-            item = self.item_system.get_item(item_id)
-            if item:
-                self.state.remove_item(item_id)
-                changes.append({'icon': '🗑️', 'text': f"失去物品: {item['name']}"})
-        
-        if 'change_weather' in effects:
-            new_weather = effects['change_weather']
-            self.state.weather = new_weather
-            self.update_environment()
-            changes.append({'icon': '☁️', 'text': f"天气变为: {new_weather}"})
-                
-        if 'action_points' in effects:
-            val = effects['action_points']
-            self.state.action_points += val # Usually negative
-            changes.append({'icon': '👣', 'text': f"行动点 {'+' if val>0 else ''}{val}"})
-            
-        if 'stamina_cost_multiplier' in effects:
-            changes.append({'icon': '⚠️', 'text': "体力消耗增加"})
-            
-        if 'status' in effects:
-            status = effects['status']
-            if status not in self.state.statuses:
-                self.state.statuses.append(status)
-                status_names = {"sick": "疾病", "lost": "迷路", "injured": "受伤"}
-                changes.append({'icon': '🤢', 'text': f"获得状态: {status_names.get(status, status)}"})
-
-        narrative = effects.get('message', "发生了什么？")
-        
+        result = outcome['effect']
+
+        # Result summary is only built here, when the UI needs it
         self.event_result_data = {
-            'text': narrative,
-            'changes': changes
+            'text': result.message,
+            'changes': result.changes
         }
             
         self.game_phase = "EVENT_RESULT"
@@ -1228,21 +1159,60 @@ class Game:
     def close_event_result(self):
         self.game_phase = "EXPLORE"
         self.current_event = None
-        self.check_turn_end()
+        self.check_game_over_state(self.sim.close_event())
         if self.game_phase != "GAME_OVER":
             self.setup_explore_ui()
 
     def setup_game_over_ui(self):
         self.ui.clear_buttons()
+        # Keep the whole run around so it can be replayed (tools/replay.py)
+        if self.sim.log is not None:
+            self.sim.log.save(LAST_RUN_LOG, background=True)
         # Moved button down to avoid overlap with summary stats
         self.ui.add_button("返回主菜单", self.setup_menu_phase, SCREEN_WIDTH//2 - 100, 550, color=BLUE)
 
+    def capture_thumbnail(self):
+        # PNG bytes of the current screen, scaled down for the slot list
+        try:
+            buffer = io.BytesIO()
+            pygame.image.save(pygame.transform.smoothscale(self.screen, THUMBNAIL_SIZE), buffer, "thumb.png")
+            return buffer.getvalue()
+        except pygame.error as e:
+            print(f"Thumbnail failed: {e}")
+            return None
+
     def manual_save(self):
-        if self.state.save_game():
-            self.ui.add_message("进度已保存。")
+        # Written on the background save thread; the result shows up via poll_saves()
+        if self.current_slot is None:
+            self.current_slot = self.slots.new_slot_id()
+        thumbnail = self.capture_thumbnail()
+        if self.slots.save(self.current_slot, self.state, self.sim.log, thumbnail):
+            self.slot_thumbnails.pop(self.current_slot, None)
+            self.ui.add_message("正在保存...")
         else:
             self.ui.add_message("保存失败！")
 
+    def poll_saves(self):
+        for filename, ok, error in save.writer.poll():
+            if self.current_slot is None or filename != self.slots.slot_file(self.current_slot):
+                continue # Logs, thumbnails and the index have no message of their own
+            self.ui.add_message("进度已保存。" if ok else "保存失败！")
+
+    def poll_data_files(self):
+        messages = self.data_watcher.poll()
+        if not messages:
+            return
+        for message in messages:
+            self.ui.add_message(message)
+        # Drop anything that refers to items that no longer exist
+        self.cart = {item_id: n for item_id, n in self.cart.items() if item_id in self.item_system.items}
+        if self.selected_shop_item not in self.item_system.items:
+            self.selected_shop_item = None
+        if self.game_phase == "SHOP":
+            self.setup_shop_ui()
+        elif self.game_phase == "EXPLORE":
+            self.setup_explore_ui()
+
     def check_explore_clicks(self, pos):
         x, y = pos
         # Coordinates based on ui.py draw_main_view
@@ -1333,26 +1303,157 @@ class Game:
             self.ui.add_message("瞬移能力已使用过！")
             return
             
-        # Find next node
-        current_node = self.map_system.get_node(self.state.current_node_id)
-        connections = self.map_system.get_connections(self.state.current_node_id)
-        
-        if not connections:
+        # Teleport to first connection (usually only one in linear path)
+        target_node = self.sim.teleport()
+        if target_node is None:
             self.ui.add_message("没有下一站可以传送！")
             return
             
-        # Teleport to first connection (usually only one in linear path)
-        target_node_id = connections[0]['node_id']
-        
-        self.state.teleport_used = True
         self.ui.add_message("发动超能力！瞬间移动！")
-        self.travel_to_node(target_node_id)
+        self.show_arrival(target_node)
 
     def quit_game(self):
+        save.writer.flush() # Don't lose a save that is still being written
+        save.storage.flush()
         pygame.quit()
         sys.exit()
 
+    def draw(self):
+        # One frame of the current phase (without flipping the display)
+        self.screen.fill(BG_COLOR)
+        
+        if self.game_phase == "MENU":
+            self.ui.draw_text(TITLE, SCREEN_WIDTH//2, 150, self.ui.title_font, center=True)
+            self.ui.draw_text("一款硬核生存策略游戏", SCREEN_WIDTH//2, 200, self.ui.font, center=True)
+
+        elif self.game_phase == "LOAD":
+            self.draw_slot_list()
+        
+        elif self.game_phase == "SHOP":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            self.ui.draw_shop_view(self.state, self.item_system, self.cart, self.selected_shop_item)
+            
+        elif self.game_phase == "EXPLORE":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            self.ui.draw_main_view(self.state, self.map_system)
+            
+        elif self.game_phase == "EVENT":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            # Draw Event Panel (Centered)
+            panel_w = 800
+            panel_x = (SCREEN_WIDTH - panel_w) // 2
+            panel_y = 150
+            panel_h = 500
+            self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h)
+
+        # ... rest of the draw logic ... (I should be careful not to skip too much)
+        # Actually I'll just add the await at the end of the loop in a separate replacement
+        # and change the def run(self) to async def run(self)
+            
+            # Header
+            icon_w = self.ui.draw_emoji("⚠️", panel_x + 30, panel_y + 30, 48)
+            self.ui.draw_text(f"事件: {self.current_event['name']}", panel_x + 30 + icon_w + 10, panel_y + 40, self.ui.title_font, color=ORANGE)
+            
+            # Description
+            self.ui.draw_text(self.current_event['description'], panel_x + 40, panel_y + 100, self.ui.large_font)
+            
+        elif self.game_phase == "EVENT_RESULT":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            self.ui.draw_event_result(self.event_result_data)
+
+        elif self.game_phase == "WARNING":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            
+            panel_w = 500
+            panel_h = 300
+            panel_x = (SCREEN_WIDTH - panel_w) // 2
+            panel_y = 200
+            
+            self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=(50, 0, 0), border_color=RED)
+            
+            self.ui.draw_emoji("⚠️", panel_x + 220, panel_y + 30, 64)
+            self.ui.draw_text("生命警告", panel_x + 250, panel_y + 110, self.ui.title_font, color=RED, center=True)
+            
+            # Draw multiline warning message
+            lines = self.warning_msg.split('\n')
+            y_off = 160
+            for line in lines:
+                self.ui.draw_text(line, panel_x + 250, panel_y + y_off, self.ui.large_font, color=WHITE, center=True)
+                y_off += 30
+
+            risk = self.risk_summary()
+            if risk:
+                self.ui.draw_text(risk, panel_x + 250, panel_y + 265, self.ui.small_font, color=ORANGE, center=True)
+
+        elif self.game_phase == "COOKING_CHOICE":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            
+            panel_w = 400
+            panel_h = 200
+            panel_x = (SCREEN_WIDTH - panel_w) // 2
+            panel_y = 250
+            
+            self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=PANEL_COLOR, border_color=GREEN)
+            self.ui.draw_text("烹饪选择", panel_x + 200, panel_y + 30, self.ui.title_font, center=True)
+            self.ui.draw_text("你有全套炊具，是否煮熟食用？", panel_x + 200, panel_y + 70, self.ui.font, center=True)
+
+        elif self.game_phase == "RETREAT_CONFIRM":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            
+            panel_w = 400
+            panel_h = 200
+            panel_x = (SCREEN_WIDTH - panel_w) // 2
+            panel_y = 250
+            
+            self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=PANEL_COLOR, border_color=RED)
+            self.ui.draw_text("下撤确认", panel_x + 200, panel_y + 30, self.ui.title_font, center=True)
+            self.ui.draw_text("确定要结束游戏并下撤吗？", panel_x + 200, panel_y + 70, self.ui.font, center=True)
+            self.ui.draw_text("当前进度将保存为存活结局。", panel_x + 200, panel_y + 95, self.ui.small_font, color=GRAY, center=True)
+
+        elif self.game_phase == "EAT_SNOW_CONFIRM":
+            self.ui.draw_status_panel(self.state, self.item_system)
+            
+            panel_w = 400
+            panel_h = 250
+            panel_x = (SCREEN_WIDTH - panel_w) // 2
+            panel_y = 250
+            
+            self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=PANEL_COLOR, border_color=CYAN)
+            self.ui.draw_text("吃雪确认", panel_x + 200, panel_y + 30, self.ui.title_font, center=True)
+            self.ui.draw_text("直接吃雪会导致体温骤降！", panel_x + 200, panel_y + 70, self.ui.font, center=True, color=RED)
+            self.ui.draw_text("体温-2, 健康-5, SAN-10", panel_x + 200, panel_y + 100, self.ui.font, center=True)
+
+        elif self.game_phase == "GAME_OVER":
+            self.ui.draw_game_over(self.state, self.sim.stats)
+
+        self.ui.draw_buttons()
+
+    async def show_loading(self):
+        # Progress bar while loading_steps runs; yields a frame after each step
+        # so the browser tab paints and stays responsive
+        self.ui.draw_loading(0)
+        pygame.display.flip()
+        first_frame = time.perf_counter() - START_TIME
+        await asyncio.sleep(0)
+        for _ in self.loading_steps():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.quit_game()
+            self.loading_done += 1
+            self.ui.draw_loading(self.loading_done / LOADING_STEPS)
+            pygame.display.flip()
+            await asyncio.sleep(0)
+        print(f"Startup: imports {IMPORT_SECONDS * 1000:.0f}ms, first frame {first_frame * 1000:.0f}ms, "
+              f"menu {(time.perf_counter() - START_TIME) * 1000:.0f}ms.")
+
     async def run(self):
+        # Deferred storage (browser) commits saves from this task between frames
+        self.storage_task = asyncio.create_task(save.storage.pump())
+
+        await self.show_loading()
+        # Not needed for the menu: event data, visualizer, shop icons
+        self.loading_task = asyncio.create_task(self.load_deferred())
+
         while True:
             self.clock.tick(FPS)
             
@@ -1365,112 +1466,17 @@ class Game:
                     if self.game_phase == "EXPLORE":
                         self.check_explore_clicks(event.pos)
             
+            self.poll_saves()
+            if self.data_watcher:
+                self.poll_data_files()
+
             # Handle Slider Updates
             if self.game_phase == "SHOP" and self.shop_slider:
                 if abs(self.shop_slider.value - self.shop_scroll_x) > 1:
                     self.shop_scroll_x = self.shop_slider.value
                     self.setup_shop_ui()
 
-            self.screen.fill(BG_COLOR)
-            
-            if self.game_phase == "MENU":
-                self.ui.draw_text(TITLE, SCREEN_WIDTH//2, 150, self.ui.title_font, center=True)
-                self.ui.draw_text("一款硬核生存策略游戏", SCREEN_WIDTH//2, 200, self.ui.font, center=True)
-            
-            elif self.game_phase == "SHOP":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                self.ui.draw_shop_view(self.state, self.item_system, self.cart, self.selected_shop_item)
-                
-            elif self.game_phase == "EXPLORE":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                self.ui.draw_main_view(self.state, self.map_system)
-                
-            elif self.game_phase == "EVENT":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                # Draw Event Panel (Centered)
-                panel_w = 800
-                panel_x = (SCREEN_WIDTH - panel_w) // 2
-                panel_y = 150
-                panel_h = 500
-                self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h)
-
-            # ... rest of the draw logic ... (I should be careful not to skip too much)
-            # Actually I'll just add the await at the end of the loop in a separate replacement
-            # and change the def run(self) to async def run(self)
-                
-                # Header
-                icon_w = self.ui.draw_emoji("⚠️", panel_x + 30, panel_y + 30, 48)
-                self.ui.draw_text(f"事件: {self.current_event['name']}", panel_x + 30 + icon_w + 10, panel_y + 40, self.ui.title_font, color=ORANGE)
-                
-                # Description
-                self.ui.draw_text(self.current_event['description'], panel_x + 40, panel_y + 100, self.ui.large_font)
-                
-            elif self.game_phase == "EVENT_RESULT":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                self.ui.draw_event_result(self.event_result_data)
-
-            elif self.game_phase == "WARNING":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                
-                panel_w = 500
-                panel_h = 300
-                panel_x = (SCREEN_WIDTH - panel_w) // 2
-                panel_y = 200
-                
-                self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=(50, 0, 0), border_color=RED)
-                
-                self.ui.draw_emoji("⚠️", panel_x + 220, panel_y + 30, 64)
-                self.ui.draw_text("生命警告", panel_x + 250, panel_y + 110, self.ui.title_font, color=RED, center=True)
-                
-                # Draw multiline warning message
-                lines = self.warning_msg.split('\n')
-                y_off = 160
-                for line in lines:
-                    self.ui.draw_text(line, panel_x + 250, panel_y + y_off, self.ui.large_font, color=WHITE, center=True)
-                    y_off += 30
-
-            elif self.game_phase == "COOKING_CHOICE":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                
-                panel_w = 400
-                panel_h = 200
-                panel_x = (SCREEN_WIDTH - panel_w) // 2
-                panel_y = 250
-                
-                self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=PANEL_COLOR, border_color=GREEN)
-                self.ui.draw_text("烹饪选择", panel_x + 200, panel_y + 30, self.ui.title_font, center=True)
-                self.ui.draw_text("你有全套炊具，是否煮熟食用？", panel_x + 200, panel_y + 70, self.ui.font, center=True)
-
-            elif self.game_phase == "RETREAT_CONFIRM":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                
-                panel_w = 400
-                panel_h = 200
-                panel_x = (SCREEN_WIDTH - panel_w) // 2
-                panel_y = 250
-                
-                self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=PANEL_COLOR, border_color=RED)
-                self.ui.draw_text("下撤确认", panel_x + 200, panel_y + 30, self.ui.title_font, center=True)
-                self.ui.draw_text("确定要结束游戏并下撤吗？", panel_x + 200, panel_y + 70, self.ui.font, center=True)
-                self.ui.draw_text("当前进度将保存为存活结局。", panel_x + 200, panel_y + 95, self.ui.small_font, color=GRAY, center=True)
-
-            elif self.game_phase == "EAT_SNOW_CONFIRM":
-                self.ui.draw_status_panel(self.state, self.item_system)
-                
-                panel_w = 400
-                panel_h = 250
-                panel_x = (SCREEN_WIDTH - panel_w) // 2
-                panel_y = 250
-                
-                self.ui.draw_panel(panel_x, panel_y, panel_w, panel_h, color=PANEL_COLOR, border_color=CYAN)
-                self.ui.draw_text("吃雪确认", panel_x + 200, panel_y + 30, self.ui.title_font, center=True)
-                self.ui.draw_text("直接吃雪会导致体温骤降！", panel_x + 200, panel_y + 70, self.ui.font, center=True, color=RED)
-                self.ui.draw_text("体温-2, 健康-5, SAN-10", panel_x + 200, panel_y + 100, self.ui.font, center=True)
-
-            elif self.game_phase == "GAME_OVER":
-                self.ui.draw_game_over(self.state)
-
-            self.ui.draw_buttons()
+            self.draw()
             pygame.display.flip()
             await asyncio.sleep(0)
 
@@ -0,0 +1,158 @@
+import pytest
+from game.state import GameState
+from game.systems import ItemSystem, EventSystem
+from game.effects import compile_event_effect, compile_item_effect
+
+# Compiled effects against the if-chains they replaced (Game.handle_event_choice
+# and GameState.consume_item before game/effects.py), on every event choice,
+# every random_outcome branch and every item in the data.
+
+
+class FixedRoll:
+    def __init__(self, roll):
+        self.roll = roll
+
+    def random(self):
+        return self.roll
+
+
+def old_choice_effects(effects, roll):
+    # The random_outcome pick of the old handle_event_choice
+    if 'random_outcome' in effects:
+        acc = 0
+        for outcome in effects['random_outcome']:
+            acc += outcome['chance']
+            if roll <= acc:
+                return outcome['effects']
+    return effects
+
+
+def old_apply_event(state, effects, item_system):
+    # The old handle_event_choice, minus the UI
+    changes = []
+    for key, attr, icon, label in [
+        ('stamina', 'stamina', '⚡', "体力"),
+        ('sanity', 'sanity', '🧠', "SAN值"),
+        ('health', 'health', '❤️', "健康"),
+        ('thirst', 'thirst', '💧', "水分"),
+        ('hunger', 'hunger', '🍗', "饱腹感"),
+        ('karma', 'karma', '🌟', "人品"),
+        ('temp', 'temperature', '🌡️', "体温"),
+    ]:
+        if key in effects:
+            val = effects[key]
+            setattr(state, attr, getattr(state, attr) + val)
+            changes.append({'icon': icon, 'text': f"{label} {'+' if val>0 else ''}{val}"})
+    if 'remove_item' in effects:
+        item = item_system.get_item(effects['remove_item'])
+        if item:
+            state.remove_item(effects['remove_item'])
+            changes.append({'icon': '🗑️', 'text': f"失去物品: {item['name']}"})
+    if 'change_weather' in effects:
+        state.weather = effects['change_weather']
+        changes.append({'icon': '☁️', 'text': f"天气变为: {effects['change_weather']}"})
+    if 'action_points' in effects:
+        val = effects['action_points']
+        state.action_points += val
+        changes.append({'icon': '👣', 'text': f"行动点 {'+' if val>0 else ''}{val}"})
+    if 'stamina_cost_multiplier' in effects:
+        changes.append({'icon': '⚠️', 'text': "体力消耗增加"})
+    if 'status' in effects:
+        status = effects['status']
+        if status not in state.statuses:
+            state.statuses.append(status)
+            status_names = {"sick": "疾病", "lost": "迷路", "injured": "受伤"}
+            changes.append({'icon': '🤢', 'text': f"获得状态: {status_names.get(status, status)}"})
+    return changes, effects.get('message', "发生了什么？"), effects.get('special_action')
+
+
+def old_consume_item(state, item):
+    # The old GameState.consume_item
+    effects = item.get('effects', {})
+    used = False
+    for key, attr in [('hunger', 'hunger'), ('thirst', 'thirst'), ('stamina', 'stamina'),
+                      ('sanity', 'sanity'), ('heal', 'health')]:
+        if key in effects:
+            setattr(state, attr, getattr(state, attr) + effects[key])
+            used = True
+    if 'status_cure' in effects:
+        if effects['status_cure'] in state.statuses:
+            state.statuses.remove(effects['status_cure'])
+            used = True
+    if item.get('type') == 'consumable' and ('heal' in effects or 'status_cure' in effects):
+        used = True
+    state.clamp_stats()
+    return used
+
+
+def stocked_state(item_system):
+    # Mid-game state that owns every item and has every status, so removals
+    # and cures all have something to act on
+    state = GameState()
+    state.stamina = state.sanity = state.health = state.hunger = state.thirst = 50
+    state.temperature = 36.0
+    for item_id in item_system.items:
+        state.add_item(item_id, 2)
+    state.statuses = ["sick", "lost", "injured"]
+    return state
+
+
+@pytest.fixture(scope="module")
+def systems():
+    item_system = ItemSystem()
+    return item_system, EventSystem(item_system)
+
+
+def rolls(effects):
+    # One roll inside every random_outcome branch, on its upper edge, and past them all
+    values = [0.0, 0.999999]
+    acc = 0
+    for outcome in effects.get('random_outcome', []):
+        acc += outcome['chance']
+        values.extend([acc, max(0.0, acc - 1e-6)])
+    return values
+
+
+def test_event_choices_match_old_chain(systems):
+    item_system, event_system = systems
+    checked = 0
+    for event in event_system.events:
+        for choice in event['choices']:
+            effects = choice.get('effects', {})
+            compiled = compile_event_effect(effects, item_system)
+            for roll in rolls(effects):
+                old_state = stocked_state(item_system)
+                old_changes, old_message, old_special = old_apply_event(
+                    old_state, old_choice_effects(effects, roll), item_system)
+
+                new_state = stocked_state(item_system)
+                result = compiled.resolve(FixedRoll(roll)).apply(new_state)
+
+                assert new_state.to_dict() == old_state.to_dict(), (event['event_id'], roll)
+                assert result.changes == old_changes
+                assert result.message == old_message
+                assert result.special_action == old_special
+                checked += 1
+    assert checked > 0
+
+
+def test_consumables_match_old_chain(systems):
+    item_system, _ = systems
+    for item_id, item in item_system.items.items():
+        old_state = stocked_state(item_system)
+        old_used = old_consume_item(old_state, item)
+
+        new_state = stocked_state(item_system)
+        used = new_state.consume_item(item, item_system.get_item_effect(item_id))
+
+        assert used == old_used, item_id
+        assert new_state.to_dict() == old_state.to_dict(), item_id
+
+
+def test_cure_without_status_is_not_used_unless_medicine():
+    state = GameState()
+    state.statuses = []
+    food = {'type': 'food', 'effects': {'status_cure': 'sick'}}
+    medicine = {'type': 'consumable', 'effects': {'status_cure': 'sick'}}
+    assert not compile_item_effect(food).apply(state).used
+    assert compile_item_effect(medicine).apply(state).used
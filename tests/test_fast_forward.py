@@ -0,0 +1,75 @@
+import random
+import pytest
+from game.config import *
+from game.state import GameState
+from game.systems import ItemSystem, MapSystem, WeatherSystem
+from game.simulation import Simulation
+from game import simulation
+
+# Simulation.fast_forward(n) against n iterations of the hourly sleep loop it
+# replaced (update_time, update_environment, cold damage, sleep drains, clamp).
+
+FIELDS = ["stamina", "hunger", "thirst", "temperature", "sanity", "health", "lowest_temp", "lowest_sanity",
+          "weather", "day_time", "game_time", "action_points", "env_temp", "wind_level"]
+
+
+def hourly(sim, hours):
+    s = sim.state
+    for _ in range(hours):
+        s.update_time(1)
+        sim.update_environment()
+        if s.temperature < 35.0:
+            s.health -= 2
+        if s.temperature < 32.0:
+            s.health -= 5
+        s.hunger -= simulation.SLEEP_HUNGER_DRAIN
+        s.thirst -= simulation.SLEEP_THIRST_DRAIN
+        if s.hunger < 10 or s.thirst < 10:
+            s.sanity -= 0.5
+        s.clamp_stats()
+        if s.health <= 0:
+            break
+
+
+@pytest.fixture(scope="module")
+def systems():
+    return ItemSystem(), MapSystem(), WeatherSystem()
+
+
+def random_state(rng, maps, weather):
+    state = GameState()
+    state.season = rng.choice(list(SEASONS))
+    state.current_node_id = rng.choice(list(maps.nodes))
+    state.weather = rng.choice(weather.weather_types)
+    state.day_time = rng.randrange(24)
+    for stat in ["stamina", "hunger", "thirst", "sanity", "health"]:
+        setattr(state, stat, rng.choice([0, 5, 15, 25, 50, 75, 85, 95, 100, rng.uniform(0, 100)]))
+    state.temperature = rng.uniform(31, 38)
+    for item_id in rng.sample(["down_jacket", "fleece_jacket", "hardshell_jacket", "tent"], rng.randrange(4)):
+        state.add_item(item_id)
+    return state
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_fast_forward_matches_hourly_steps(systems, seed):
+    items, maps, weather = systems
+    rng = random.Random(seed)
+    state = random_state(rng, maps, weather)
+    other = state.clone()
+    hours = rng.choice([1, 5, 12, 24, 48, 100, 1000])
+
+    Simulation(state, items, maps, weather).fast_forward(hours)
+    hourly(Simulation(other, items, maps, weather), hours)
+
+    assert {f: getattr(state, f) for f in FIELDS} == {f: getattr(other, f) for f in FIELDS}
+
+
+def test_fast_forward_returns_hours_until_death(systems):
+    items, maps, weather = systems
+    state = GameState()
+    state.health = 5
+    state.temperature = 31.0 # Below 32: 7 health an hour until it warms up
+    elapsed = Simulation(state, items, maps, weather).fast_forward(12)
+    assert state.health == 0
+    assert elapsed == state.game_time * 24 + state.day_time - GameState().day_time
+    assert elapsed < 12
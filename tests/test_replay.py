@@ -0,0 +1,58 @@
+import random
+import pytest
+from game.autoplay import AutoPlayer, load_systems, random_policy, survival_policy
+from game.replay import ActionLog, Replayer, diff_states
+
+# Replay determinism: a recorded game replayed from its text log (seed, setup,
+# actions) ends in exactly the same state, every time.
+
+
+@pytest.fixture(scope="module")
+def systems():
+    return load_systems()
+
+
+def recorded_run(systems, seed, season, policy):
+    return AutoPlayer(*systems).play(seed, season=season, policy=policy, record=True)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("season", ["spring", "winter"])
+def test_replay_matches_survival_games(systems, seed, season):
+    run = recorded_run(systems, seed, season, survival_policy)
+    log = ActionLog.from_text(run.sim.log.to_text())
+    assert len(log) == len(run.sim.log) > 0
+    sim = Replayer(*systems).replay(log)
+    assert diff_states(run.state, sim.state) == []
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_replay_matches_random_games(systems, seed):
+    # Random legal actions do what the survival bot never would (any item, rests at odd times)
+    run = recorded_run(systems, seed, "summer", random_policy(random.Random(seed)))
+    sim = Replayer(*systems).replay(ActionLog.from_text(run.sim.log.to_text()))
+    assert diff_states(run.state, sim.state) == []
+
+
+def test_replay_is_repeatable_and_partial(systems):
+    run = recorded_run(systems, 42, "autumn", survival_policy)
+    log = run.sim.log
+    replayer = Replayer(*systems)
+    assert diff_states(replayer.replay(log).state, replayer.replay(log).state) == []
+
+    # states() passes through the same state replay(upto) stops at
+    upto = len(log) // 2
+    for i, _, state in replayer.states(log):
+        if i == upto - 1:
+            assert diff_states(state, replayer.replay(log, upto).state) == []
+            break
+
+
+def test_verify_reports_a_tampered_save(systems):
+    run = recorded_run(systems, 7, "spring", survival_policy)
+    replayer = Replayer(*systems)
+    saved = run.state.to_dict()
+    assert replayer.verify(run.sim.log, saved)[1] == []
+    saved["money"] += 100
+    differences = replayer.verify(run.sim.log, saved)[1]
+    assert [field for field, _, _ in differences] == ["money"]
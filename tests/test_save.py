@@ -0,0 +1,76 @@
+import json
+import zlib
+import pytest
+from game import save
+from game.state import GameState
+from game.storage import MemoryStorage
+
+# Save format: legacy flat savegame.json (v1) migrates to the current
+# envelope, round trips, compression and version checks.
+
+# A v1 save as the original GameState.save_game wrote it
+V1_SAVE = {
+    "stamina": 55, "hunger": 40, "thirst": 35, "temperature": 35.5, "sanity": 60, "health": 80,
+    "current_node_id": "start", "distance_traveled": 3.5, "distance_to_next_node": 1.5,
+    "total_distance": 3.5, "action_points": 6, "money": 120, "karma": 2,
+    "game_time": 1, "day_time": 14, "inventory": {"tent": 1, "water_bottle": 3},
+    "equipment": [], "weather": "fog", "weather_duration": 2, "env_temp": 4.0, "wind_level": 3,
+    "triggered_events": ["wild_boar"], "max_altitude": 3100, "lowest_temp": 35.2,
+    "lowest_sanity": 58, "days_survived": 1, "character_id": "xiaomou", "season": "autumn",
+}
+
+
+@pytest.fixture
+def storage():
+    previous = save.storage
+    backend = MemoryStorage()
+    save.set_storage(backend)
+    yield backend
+    save.set_storage(previous)
+
+
+def test_v1_save_migrates(storage):
+    storage.write("savegame.json", json.dumps(V1_SAVE).encode("utf-8"))
+    state = GameState()
+    assert state.load_game("savegame.json")
+    for key, value in V1_SAVE.items():
+        expected = set(value) if key == "triggered_events" else value
+        assert getattr(state, key) == expected, key
+    # Fields v1 never stored get the migration's defaults
+    assert state.statuses == []
+    assert state.teleport_used is False
+    assert state.game_over is False
+    assert state.game_won is False
+
+
+def test_v1_envelope_migrates():
+    data = json.dumps({"version": 1, "state": dict(V1_SAVE)}).encode("utf-8")
+    state = save.decode(data)
+    assert state["statuses"] == []
+    assert state["season"] == "autumn"
+
+
+def test_migrated_save_round_trips(storage):
+    storage.write("savegame.json", json.dumps(V1_SAVE).encode("utf-8"))
+    state = GameState()
+    state.load_game("savegame.json")
+    assert state.save_game("slot.json")
+    assert json.loads(storage.read("slot.json"))["version"] == save.SCHEMA_VERSION
+    other = GameState()
+    assert other.load_game("slot.json")
+    assert other.to_dict() == state.to_dict()
+
+
+def test_compressed_save_is_detected():
+    state = GameState()
+    state.statuses = ["sick"]
+    data = save.encode(state.to_dict(), compress=True)
+    assert data[:2] in save.ZLIB_MAGIC
+    assert save.decode(data) == json.loads(zlib.decompress(data))["state"]
+
+
+def test_newer_version_is_refused(storage):
+    storage.write("savegame.json", json.dumps({"version": save.SCHEMA_VERSION + 1, "state": {}}).encode("utf-8"))
+    with pytest.raises(save.SaveError):
+        save.decode(storage.read("savegame.json"))
+    assert not GameState().load_game("savegame.json")
@@ -0,0 +1,85 @@
+import os
+import time
+import pytest
+from game import simcache
+from game.simcache import SimCache
+
+# Simulation result cache: hits and misses by configuration, LRU eviction
+# past the size limit, and cleanup of temp files left by killed writers.
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SimCache(str(tmp_path / "sim"))
+
+
+def set_age(path, seconds):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def test_miss_then_hit(cache):
+    configuration = {"seed": 1, "character": "xiaomou", "season": "winter"}
+    assert cache.get(configuration) is None
+    cache.put(configuration, {"won": False, "days": 3})
+    assert cache.get(configuration) == {"won": False, "days": 3}
+    assert cache.get(dict(configuration, seed=2)) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_key_ignores_dict_order_and_follows_content(cache, monkeypatch):
+    a = {"seed": 1, "values": {"x": 1.0, "y": 2.0}}
+    b = {"values": {"y": 2.0, "x": 1.0}, "seed": 1}
+    assert cache.key(a) == cache.key(b)
+    before = cache.key(a)
+    monkeypatch.setattr(simcache, "_content_key", "other data and rules")
+    assert cache.key(a) != before
+
+
+def test_half_written_entry_is_a_miss(cache):
+    path = cache.entry_path(cache.key({"seed": 1}))
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"won": tr')
+    assert cache.get({"seed": 1}) is None
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = SimCache(str(tmp_path / "sim"), max_bytes=10 ** 9)
+    value = {"padding": "x" * 1000}
+    for seed in range(10):
+        cache.put({"seed": seed}, value)
+        set_age(cache.entry_path(cache.key({"seed": seed})), 1000 - seed) # seed 0 is the oldest
+    cache.get({"seed": 0}) # Reading makes it the most recently used
+    assert cache.evict() == 0 # Under the limit
+
+    entry_size = os.path.getsize(cache.entry_path(cache.key({"seed": 0})))
+    cache.max_bytes = entry_size * 5
+    removed = cache.evict()
+    assert removed == 6 # Down to EVICT_TO (80%) of 5 entries
+    kept = {seed for seed in range(10) if os.path.exists(cache.entry_path(cache.key({"seed": seed})))}
+    assert kept == {0, 7, 8, 9}
+    assert cache.size() <= cache.max_bytes * simcache.EVICT_TO
+
+
+def test_evict_sweeps_stale_temp_files(cache):
+    cache.put({"seed": 1}, {"won": True})
+    path = cache.entry_path(cache.key({"seed": 1}))
+    stale = f"{path}.tmp123_deadbeef"
+    fresh = f"{path}.tmp456_cafebabe"
+    for name in (stale, fresh):
+        with open(name, "w", encoding="utf-8") as f:
+            f.write("{")
+    set_age(stale, simcache.TEMP_MAX_AGE + 60)
+    cache.evict()
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh) # May be a put() still in progress
+    assert len(cache.entries()) == 1
+
+
+def test_clear(cache):
+    for seed in range(3):
+        cache.put({"seed": seed}, seed)
+    cache.clear()
+    assert cache.entries() == []
+    assert cache.get({"seed": 0}) is None
@@ -0,0 +1,76 @@
+import random
+import pytest
+from game.autoplay import AutoPlayer, load_systems, random_policy
+from game.replay import Replayer
+from game.state import GameState, StateCodec, data_statuses
+from game import mcts
+
+# StateCodec: pack/unpack gives back the same state (every field, including
+# statuses from the data and status_message), and refuses foreign snapshots.
+
+
+@pytest.fixture(scope="module")
+def systems():
+    return load_systems()
+
+
+@pytest.fixture(scope="module")
+def codec(systems):
+    return mcts.codec_for(systems)
+
+
+def assert_round_trip(codec, state):
+    again = codec.unpack(codec.pack(state))
+    assert again.to_dict() == state.to_dict()
+    assert again.status_message == state.status_message
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_round_trip_every_state_of_a_game(systems, codec, seed):
+    run = AutoPlayer(*systems).play(seed, season="winter", policy=random_policy(random.Random(seed)),
+                                    record=True)
+    for _, _, state in Replayer(*systems).states(run.sim.log):
+        assert_round_trip(codec, state)
+
+
+def test_round_trip_statuses_flags_and_message(systems, codec):
+    state = GameState()
+    state.statuses = list(codec.statuses)
+    state.triggered_events = set(codec.events[:3])
+    state.equipment = codec.items[:2]
+    state.money = 12.5
+    state.game_over = True
+    state.teleport_used = True
+    state.status_message = "你死于失温。"
+    assert_round_trip(codec, state)
+
+
+def test_statuses_come_from_the_data():
+    events = [{"choices": [{"effects": {"status": "frostbite"}},
+                           {"effects": {"random_outcome": [{"chance": 0.5, "effects": {"status": "lost"}}]}}]}]
+    items = [{"id": "splint", "effects": {"status_cure": "fracture"}}, {"id": "rope", "effects": {}}]
+    assert data_statuses(events, items) == {"frostbite", "lost", "fracture"}
+
+
+def test_unknown_status_is_a_value_error(codec):
+    state = GameState()
+    state.statuses = ["not_in_the_data"]
+    with pytest.raises(ValueError):
+        codec.pack(state)
+
+
+def test_snapshot_from_other_data_is_refused(systems, codec):
+    item_system, map_system, weather_system, event_system = systems
+    other = StateCodec(list(item_system.items) + ["extra_item"], [e['event_id'] for e in event_system.events],
+                       [n['node_id'] for n in map_system.node_list], weather_system.weather_types,
+                       codec.statuses)
+    with pytest.raises(ValueError):
+        other.unpack(codec.pack(GameState()))
+
+
+def test_mcts_snapshot_restores_the_position(systems, codec):
+    run = AutoPlayer(*systems).play(5, season="spring", max_steps=30)
+    restored = mcts.restore(systems, mcts.snapshot(run, codec), random.Random(0), codec)
+    assert restored.state.to_dict() == run.state.to_dict()
+    assert (restored.phase, restored.steps) == (run.phase, run.steps)
+    assert restored.sim.current_event is run.sim.current_event
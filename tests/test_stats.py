@@ -0,0 +1,98 @@
+import random
+import pytest
+from game.config import *
+from game.state import GameState
+from game.stats import Histogram, TurnStats
+
+# Streaming histograms: quantiles within a bin of the exact ones, merging
+# equals adding everything to one, JSON round trips.
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_quantiles_within_one_bin(seed):
+    rng = random.Random(seed)
+    h = Histogram(0.0, 100.0, 1.0)
+    values = [rng.gauss(50, 20) for _ in range(5000)] # Some fall outside 0..100
+    for v in values:
+        h.add(v)
+    assert h.count == len(values)
+    assert h.min == min(values) and h.max == max(values)
+    assert h.mean() == pytest.approx(sum(values) / len(values))
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        assert abs(h.quantile(q) - exact_quantile(values, q)) <= 1.0 + 1e-9
+    assert h.quantile(0.0) >= h.min
+    assert h.quantile(1.0) == h.max
+
+
+def test_merge_equals_one_histogram():
+    rng = random.Random(1)
+    values = [rng.uniform(-5, 45) for _ in range(3000)]
+    whole = Histogram(0.0, 40.0, 0.5)
+    parts = [Histogram(0.0, 40.0, 0.5) for _ in range(3)]
+    for i, v in enumerate(values):
+        whole.add(v)
+        parts[i % 3].add(v)
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+    assert merged.counts == whole.counts
+    assert (merged.count, merged.min, merged.max) == (whole.count, whole.min, whole.max)
+    assert merged.total == pytest.approx(whole.total)
+    for q in (0.1, 0.5, 0.9):
+        assert merged.quantile(q) == pytest.approx(whole.quantile(q))
+
+
+def test_merge_with_empty_and_mismatched_bins():
+    h = Histogram(0.0, 10.0, 1.0)
+    h.add(3.0)
+    h.merge(Histogram(0.0, 10.0, 1.0))
+    assert (h.count, h.min, h.max) == (1, 3.0, 3.0)
+    with pytest.raises(ValueError):
+        h.merge(Histogram(0.0, 10.0, 0.5))
+
+
+def test_empty_histogram():
+    h = Histogram(0.0, 10.0, 1.0)
+    assert h.quantile(0.5) is None
+    assert h.mean() is None
+    again = Histogram.from_dict(h.to_dict())
+    assert again.count == 0 and again.quantile(0.5) is None
+
+
+def test_value_on_the_upper_edge():
+    h = Histogram(0.0, 10.0, 1.0)
+    h.add(10.0)
+    assert h.counts[-1] == 1
+    assert h.quantile(0.5) == 10.0
+
+
+def test_turn_stats_round_trip_and_merge():
+    a, b = TurnStats(), TurnStats()
+    state = GameState()
+    for i in range(50):
+        state.temperature = 35 + i * 0.05
+        state.sanity = 100 - i
+        (a if i % 2 else b).turn(state, 12.5)
+        (a if i % 2 else b).hike(1.2)
+    again = TurnStats.from_dict(a.to_dict())
+    assert again.summary() == a.summary()
+    a.merge(b)
+    assert a.turns == 50
+    assert a.summary()["sanity"]["max"] == 100
+
+
+def test_turn_stats_are_clamped():
+    # An event can leave a stat past its range until its choice is resolved
+    stats = TurnStats()
+    state = GameState()
+    state.sanity = MAX_SANITY + 1
+    state.stamina = -3
+    state.temperature = 29.0
+    stats.turn(state, 10)
+    summary = stats.summary()
+    assert summary["sanity"]["max"] == MAX_SANITY
+    assert summary["stamina"]["min"] == 0
+    assert summary["temperature"]["min"] == 30.0
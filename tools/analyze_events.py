@@ -0,0 +1,192 @@
+import sys
+import json
+import time
+from game.config import *
+from game.systems import DataLoader, ItemSystem
+from game.effects import compile_event_effect
+
+# Exact outcome-distribution analyzer for events.json.
+# Usage: python -m tools.analyze_events [--json out.json] [--baseline health=30,sanity=20]
+#
+# Every choice is reduced to a discrete distribution of compiled effects
+# (random_outcome branches plus the base effect for any uncovered probability
+# mass), so expectations and variances are exact, not sampled.
+
+CHANCE_TOLERANCE = 1e-9
+DEFAULT_TRIGGER_CHANCE = 0.1 # Same default as EventSystem.check_event
+
+# Reference state for "lethal" outcomes: the thresholds Game.hike warns about,
+# and a normal body temperature (the one a game starts with; hike doesn't
+# warn about it). An outcome is lethal if applying it to this state ends the game.
+DEFAULT_BASELINE = {
+    "health": 30,
+    "stamina": 20,
+    "sanity": 20,
+    "hunger": 20,
+    "thirst": 20,
+    "temperature": 36.5,
+}
+
+STATS = ["stamina", "sanity", "health", "thirst", "hunger", "karma", "temperature", "action_points"]
+
+
+def outcome_distribution(compiled):
+    # [(probability, CompiledEffect)] matching CompiledEffect.resolve():
+    # roll in [0, 1), first branch with roll <= cumulative chance wins.
+    if not compiled.outcomes:
+        return [(1.0, compiled)]
+
+    dist = []
+    covered = 0.0
+    for threshold, outcome in compiled.outcomes:
+        p = min(threshold, 1.0) - covered
+        if p > 0:
+            dist.append((p, outcome))
+            covered += p
+    if covered < 1.0 - CHANCE_TOLERANCE:
+        dist.append((1.0 - covered, compiled))
+    return dist
+
+
+def is_lethal(deltas, baseline):
+    health = baseline["health"] + deltas.get("health", 0)
+    sanity = baseline["sanity"] + deltas.get("sanity", 0)
+    hunger = baseline["hunger"] + deltas.get("hunger", 0)
+    thirst = baseline["thirst"] + deltas.get("thirst", 0)
+    temperature = baseline["temperature"] + deltas.get("temperature", 0)
+    # Same order and thresholds as GameState.check_game_over
+    return health <= 0 or sanity <= 0 or temperature < 32 or hunger <= 0 or thirst <= 0
+
+
+def analyze_choice(choice, item_system, baseline):
+    effects = choice.get('effects', {})
+    compiled = compile_event_effect(effects, item_system)
+    dist = outcome_distribution(compiled)
+
+    mean = dict.fromkeys(STATS, 0.0)
+    second = dict.fromkeys(STATS, 0.0)
+    p_lethal = 0.0
+    p_special = 0.0
+    for p, effect in dist:
+        if effect.special_action:
+            # Special actions (scavenge) are resolved by game code, not data
+            p_special += p
+            continue
+        deltas = effect.stat_deltas()
+        for stat, d in deltas.items():
+            mean[stat] += p * d
+            second[stat] += p * d * d
+        if is_lethal(deltas, baseline):
+            p_lethal += p
+
+    variance = {stat: max(0.0, second[stat] - mean[stat] ** 2) for stat in STATS}
+    return {
+        "text": choice.get('text', ''),
+        "requirements": choice.get('requirements', {}).get('items', []),
+        "outcomes": len(dist),
+        "mean": {k: v for k, v in mean.items() if v or variance[k]},
+        "variance": {k: v for k, v in variance.items() if v},
+        "p_lethal": p_lethal,
+        "p_special": p_special,
+    }
+
+
+def check_chances(event):
+    problems = []
+    conditions = event.get('trigger_conditions', {})
+    if 'chance' not in conditions:
+        problems.append(f"trigger chance missing (defaults to {DEFAULT_TRIGGER_CHANCE})")
+    elif not 0 <= conditions['chance'] <= 1:
+        problems.append(f"trigger chance {conditions['chance']} outside [0, 1]")
+
+    for i, choice in enumerate(event.get('choices', [])):
+        outcomes = choice.get('effects', {}).get('random_outcome')
+        if outcomes is None:
+            continue
+        total = sum(o.get('chance', 0) for o in outcomes)
+        if abs(total - 1.0) > CHANCE_TOLERANCE:
+            problems.append(f"choice {i}: random_outcome chances sum to {total:.4f}")
+        for j, o in enumerate(outcomes):
+            if not 0 <= o.get('chance', 0) <= 1:
+                problems.append(f"choice {i}: outcome {j} chance {o.get('chance')} outside [0, 1]")
+    return problems
+
+
+def analyze_events(events, item_system=None, baseline=None):
+    baseline = dict(DEFAULT_BASELINE, **(baseline or {}))
+    report = []
+    seen_ids = set()
+    for event in events:
+        event_id = event.get('event_id', '?')
+        problems = check_chances(event)
+        if event_id in seen_ids:
+            problems.append("duplicate event_id")
+        seen_ids.add(event_id)
+
+        report.append({
+            "event_id": event_id,
+            "trigger_chance": event.get('trigger_conditions', {}).get('chance', DEFAULT_TRIGGER_CHANCE),
+            "choices": [analyze_choice(c, item_system, baseline) for c in event.get('choices', [])],
+            "problems": problems,
+        })
+    return report
+
+
+def format_deltas(mean, variance):
+    parts = []
+    for stat in STATS:
+        if stat in mean:
+            sd = variance.get(stat, 0) ** 0.5
+            parts.append(f"{stat} {mean[stat]:+.2f}" + (f"±{sd:.2f}" if sd else ""))
+    return ", ".join(parts) or "-"
+
+
+def parse_baseline(arg):
+    baseline = {}
+    for pair in arg.split(","):
+        key, value = pair.split("=")
+        baseline[key.strip()] = float(value)
+    return baseline
+
+
+def main():
+    args = sys.argv[1:]
+    json_out = None
+    baseline = None
+    if "--json" in args:
+        json_out = args[args.index("--json") + 1]
+    if "--baseline" in args:
+        baseline = parse_baseline(args[args.index("--baseline") + 1])
+
+    events = DataLoader.load_json("events.json")
+    item_system = ItemSystem()
+
+    start = time.perf_counter()
+    report = analyze_events(events, item_system, baseline)
+    elapsed = time.perf_counter() - start
+
+    problem_count = 0
+    for entry in report:
+        print(f"[{entry['event_id']}] trigger {entry['trigger_chance']:.2f}")
+        for i, c in enumerate(entry['choices']):
+            line = f"  {i}. {c['text']}: {format_deltas(c['mean'], c['variance'])}"
+            if c['p_lethal']:
+                line += f"  lethal {c['p_lethal']:.0%}"
+            if c['p_special']:
+                line += f"  special {c['p_special']:.0%}"
+            print(line)
+        for problem in entry['problems']:
+            print(f"  ! {problem}")
+            problem_count += 1
+
+    print(f"Analyzed {len(report)} events in {elapsed * 1000:.1f}ms, {problem_count} problems.")
+
+    if json_out:
+        with open(json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return 1 if problem_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
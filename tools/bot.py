@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import random
+import traceback
+from game.config import *
+from game.autoplay import AutoPlayer, load_systems, survival_policy, random_policy
+from game import mcts
+
+# Plays whole games with a bot and reports how they end: a smoke test for
+# new event packs and map variants (crashes, runs that get stuck, balance).
+# Usage: python -m tools.bot [--games 10] [--seed 0] [--bot mcts|survival|random]
+#                            [--workers N] [--iterations 1000] [--time 0.5]
+#                            [--character xiaomou] [--season spring] [--record DIR]
+#
+#   --workers     MCTS search processes (root parallel, default: one per core)
+#   --iterations  MCTS iterations per worker and move
+#   --time        MCTS seconds per move (0 = iterations only)
+#   --record      save each game's action log to DIR (replay with tools.replay)
+#
+# Exits 1 if a game crashed or got stuck.
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m tools.bot [--games N] [--seed S] [--bot mcts|survival|random] [--workers N]"
+              " [--iterations N] [--time S] [--character ID] [--season ID] [--record DIR]")
+        return 2
+    games = int(option(args, "--games", 10))
+    first_seed = int(option(args, "--seed", 0))
+    bot = option(args, "--bot", "mcts")
+    character_id = option(args, "--character", "xiaomou")
+    season = option(args, "--season", "spring")
+    record_dir = option(args, "--record", None)
+    if bot not in ("mcts", "survival", "random") or character_id not in CHARACTERS or season not in SEASONS:
+        print("Unknown bot, character or season.")
+        return 2
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+
+    player = AutoPlayer(*load_systems())
+    searcher = None
+    if bot == "mcts":
+        searcher = mcts.MCTSPlayer(int(option(args, "--workers", os.cpu_count() or 1)),
+                                   int(option(args, "--iterations", mcts.ITERATIONS)),
+                                   float(option(args, "--time", mcts.TIME_LIMIT)) or None,
+                                   seed=first_seed)
+
+    failed = 0
+    wins = 0
+    start = time.perf_counter()
+    try:
+        for seed in range(first_seed, first_seed + games):
+            policy = searcher or (survival_policy if bot == "survival" else random_policy(random.Random(seed)))
+            try:
+                run = player.play(seed, character_id, season, policy=policy, record=bool(record_dir))
+            except Exception:
+                print(f"seed {seed}: crashed")
+                traceback.print_exc()
+                failed += 1
+                continue
+            result = run.outcome()
+            if record_dir:
+                with open(os.path.join(record_dir, f"bot_{seed}.log"), "w", encoding="utf-8") as f:
+                    f.write(run.sim.log.to_text())
+            if result['phase'] != "GAME_OVER":
+                failed += 1
+            wins += result['won']
+            print(f"seed {seed}: {'WON ' if result['won'] else ''}{result['phase']} day {result['days']}"
+                  f" {result['hour']}:00, {result['km']:.1f}km, {result['steps']} actions - {result['message']}")
+    finally:
+        if searcher:
+            searcher.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{wins}/{games} won, {failed} crashed or stuck, {elapsed:.1f}s")
+    if searcher and searcher.moves:
+        print(f"MCTS: {searcher.moves} searched moves, {searcher.search_seconds / searcher.moves:.2f}s per move,"
+              f" {searcher.rollouts / searcher.search_seconds:.0f} rollouts/s"
+              f" ({searcher.workers} worker{'s' if searcher.workers > 1 else ''})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import sys
+import time
+from game.systems import DataLoader
+from game import bundle as data_bundle
+from game import resources
+
+# Validates data/*.json and compiles them into data/data.bundle.
+# Usage: python -m tools.build_bundle [--check]
+#
+#   --check  validate only, don't write the bundle
+#
+# Exits 1 on schema errors (nothing is written). Delete the bundle, or just
+# edit a JSON file (it then becomes newer than the bundle), to go back to
+# loading JSON.
+
+
+def main():
+    args = sys.argv[1:]
+    data = {name: DataLoader.load_json(filename) for name, filename in data_bundle.SOURCES.items()}
+
+    errors, warnings = data_bundle.validate(data)
+    for warning in warnings:
+        print(f"warning: {warning}")
+    for error in errors:
+        print(f"error: {error}")
+    if errors:
+        print(f"{len(errors)} errors, bundle not written.")
+        return 1
+    if "--check" in args:
+        print("Data is valid.")
+        return 0
+
+    for name, records in data.items():
+        data_bundle.intern_ids(name, records)
+    raw = data_bundle.encode_bundle(data)
+    path = resources.loader.local_path(f"{DataLoader.DATA_DIR}/{data_bundle.BUNDLE_NAME}")
+    if path is None:
+        print("Data is not in a plain directory (packed assets?), bundle not written.")
+        return 1
+    with open(path, 'wb') as f:
+        f.write(raw)
+
+    start = time.perf_counter()
+    data_bundle.decode_bundle(raw)
+    load_ms = (time.perf_counter() - start) * 1000
+    source_bytes = sum(len(resources.loader.read(f"{DataLoader.DATA_DIR}/{f}")) for f in data_bundle.SOURCES.values())
+    print(f"Wrote {path}: {len(raw)} bytes (JSON sources {source_bytes} bytes), decodes in {load_ms:.2f}ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import zipfile
+from game.config import EMOJI_DIR
+from game import resources
+
+# Packs the game's read-only resources into one file next to the game package.
+# Usage: python -m tools.pack_assets [--zip] [--remove]
+#
+#   (default)  assets.pack, memory-mapped at startup
+#   --zip      assets.zip instead
+#   --remove   delete both archives (back to loose files)
+#
+# Packed resources take priority over the loose files, so remove the archive
+# (or rebuild it) after editing data.
+
+RESOURCE_DIRS = ["data", EMOJI_DIR]
+FONT_EXTENSIONS = (".ttf", ".ttc", ".otf")
+
+
+def collect(root):
+    # {resource name: bytes}
+    files = {}
+    for directory in RESOURCE_DIRS:
+        base = os.path.join(root, directory)
+        if not os.path.isdir(base):
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    files[name] = f.read()
+    for filename in sorted(os.listdir(root)):
+        if filename.lower().endswith(FONT_EXTENSIONS):
+            with open(os.path.join(root, filename), "rb") as f:
+                files[filename] = f.read()
+    return files
+
+
+def main():
+    args = sys.argv[1:]
+    root = os.fspath(resources.project_root())
+    pack_path = os.path.join(root, resources.ASSET_PACK)
+    zip_path = os.path.join(root, resources.ASSET_ZIP)
+
+    if "--remove" in args:
+        for path in (pack_path, zip_path):
+            if os.path.exists(path):
+                os.remove(path)
+                print(f"Removed {path}")
+        return 0
+
+    files = collect(root)
+    if "--zip" in args:
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, data in files.items():
+                zf.writestr(name, data)
+        out = zip_path
+    else:
+        with open(pack_path, "wb") as f:
+            f.write(resources.encode_pack(files))
+        out = pack_path
+
+    # Time a cold open + reading everything back through the loader
+    start = time.perf_counter()
+    source = resources.PackSource(out) if out == pack_path else resources.ZipSource(out)
+    loader = resources.ResourceLoader([source])
+    for name in files:
+        if loader.read(name) != files[name]:
+            print(f"Mismatch reading back {name}")
+            return 1
+    elapsed = time.perf_counter() - start
+    print(f"Packed {len(files)} files ({sum(len(d) for d in files.values())} bytes) into {out}"
+          f" ({os.path.getsize(out)} bytes), read back in {elapsed * 1000:.1f}ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import sys
+import time
+from game.config import *
+from game.autoplay import AutoPlayer, load_systems
+from game import loadout
+
+# Offline loadout report: runs the shop optimizer (game/loadout.py) for each
+# character and season and prints the recommended cart next to the default
+# autoplay loadout, both scored on the same simulated games.
+# Usage: python -m tools.recommend_loadout [--character xiaomou|all] [--season spring|all]
+#                                          [--seeds 16] [--rounds 2] [--force] [--out report.md]
+#
+#   --seeds   simulated games per candidate cart
+#   --rounds  rounds of +1/-1 item moves after the knapsack candidates
+#   --force   optimize again even if the result is cached
+#   --out     also write the report as Markdown
+#
+# Results are cached in cache/loadout/ (the shop's "推荐装备" button reads
+# them) until the item catalog changes. Needs numpy.
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def describe(item_system, cart):
+    return ", ".join(f"{item_system.get_item(i)['name']} x{n}" for i, n in sorted(cart.items()))
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m tools.recommend_loadout [--character ID|all] [--season ID|all]"
+              " [--seeds N] [--rounds N] [--force] [--out report.md]")
+        return 2
+    if loadout.np is None:
+        print("The loadout optimizer needs numpy (pip install numpy).")
+        return 2
+    character_arg = option(args, "--character", "xiaomou")
+    season_arg = option(args, "--season", "spring")
+    characters = list(CHARACTERS) if character_arg == "all" else [character_arg]
+    seasons = list(SEASONS) if season_arg == "all" else [season_arg]
+    if any(c not in CHARACTERS for c in characters) or any(s not in SEASONS for s in seasons):
+        print(f"Unknown character or season (characters: {', '.join(CHARACTERS)}; seasons: {', '.join(SEASONS)})")
+        return 2
+    seeds = int(option(args, "--seeds", loadout.SEEDS))
+    rounds = int(option(args, "--rounds", loadout.ROUNDS))
+    out_path = option(args, "--out", None)
+
+    player = AutoPlayer(*load_systems())
+    item_system = player.item_system
+    lines = ["# Loadout report", "",
+             f"Budget {START_MONEY}, catalog {loadout.catalog_hash(item_system)}, {seeds} games per cart.", "",
+             "| character | season | price | weight | won | km | default won | default km |",
+             "|---|---|---|---|---|---|---|---|"]
+    carts = []
+    for character_id in characters:
+        for season in seasons:
+            shown = {}
+
+            def progress(stage, done, total):
+                if shown.get("at") == (stage, done):
+                    return # Called after every game
+                shown["at"] = (stage, done)
+                print(f"\r  {character_id} {season}: {'candidates' if stage == 0 else f'round {stage}'}"
+                      f" {done + 1}/{total}   ", end="", flush=True)
+
+            start = time.perf_counter()
+            result = loadout.recommend(player, character_id, season, START_MONEY, seeds, rounds,
+                                       force="--force" in args, progress=progress)
+            elapsed = time.perf_counter() - start
+            base = result.get("baseline") or {}
+            print(f"\r{character_id} {season}: {result['price']} yuan, {result['weight']:.1f}kg,"
+                  f" won {result['win_rate']:.0%}, {result['mean_km']:.1f}km"
+                  f" (default loadout: won {base.get('win_rate', 0):.0%}, {base.get('mean_km', 0):.1f}km)"
+                  f" - {elapsed:.1f}s, {result['games']} games")
+            print(f"  {describe(item_system, result['cart'])}")
+            lines.append(f"| {character_id} | {season} | {result['price']} | {result['weight']:.1f} |"
+                         f" {result['win_rate']:.0%} | {result['mean_km']:.1f} |"
+                         f" {base.get('win_rate', 0):.0%} | {base.get('mean_km', 0):.1f} |")
+            carts.append(f"- **{character_id} {season}**: {describe(item_system, result['cart'])}")
+
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines + ["", "## Carts", ""] + carts) + "\n")
+        print(f"\nReport written to {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
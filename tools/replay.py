@@ -0,0 +1,74 @@
+import sys
+import time
+from game.config import *
+from game.systems import ItemSystem, MapSystem, WeatherSystem, EventSystem
+from game.replay import ActionLog, Replayer, format_action
+from game import save
+
+# Headless replay of an action log.
+# Usage: python -m tools.replay savegame.log [--verify savegame.json] [--upto N] [--trace] [--repeat N]
+#
+#   --verify  replay and compare with a save file (exit 1 on mismatch)
+#   --upto    stop after N actions (reproduce the state right before a bug)
+#   --trace   print the key stats after every action
+#   --repeat  replay N times and report the speed
+
+TRACE_FIELDS = ["current_node_id", "game_time", "day_time", "stamina", "hunger", "thirst",
+                "temperature", "sanity", "health", "weather"]
+
+
+def format_state(state):
+    parts = []
+    for name in TRACE_FIELDS:
+        value = getattr(state, name)
+        parts.append(f"{name}={value:.2f}" if isinstance(value, float) else f"{name}={value}")
+    return " ".join(parts)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print("Usage: python -m tools.replay <file.log> [--verify save.json] [--upto N] [--trace] [--repeat N]")
+        return 2
+
+    log = ActionLog.load(args[0])
+    if log is None:
+        return 2
+    upto = int(args[args.index("--upto") + 1]) if "--upto" in args else None
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 1
+
+    item_system = ItemSystem()
+    replayer = Replayer(item_system, MapSystem(), WeatherSystem(), EventSystem(item_system))
+
+    if "--trace" in args:
+        for i, action, state in replayer.states(log):
+            if upto is not None and i >= upto:
+                break
+            print(f"{i:5d} {format_action(action):30s} {format_state(state)}")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sim = replayer.replay(log, upto)
+    elapsed = time.perf_counter() - start
+
+    count = len(log.actions[:upto])
+    print(f"Replayed {count} actions (seed {log.seed}) x{repeat} in {elapsed * 1000:.1f}ms"
+          f" ({count * repeat / max(elapsed, 1e-9):.0f} actions/s)")
+    print(format_state(sim.state))
+    if sim.state.game_over or sim.state.game_won:
+        print(sim.state.status_message)
+
+    if "--verify" in args:
+        save_file = args[args.index("--verify") + 1]
+        sim, diffs = replayer.verify(log, save.read_state(save_file), upto)
+        if diffs:
+            print(f"{save_file} does NOT match the log:")
+            for field, saved, replayed in diffs:
+                print(f"  {field}: saved {saved!r}, replayed {replayed!r}")
+            return 1
+        print(f"{save_file} matches the log.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import os
+import re
+import sys
+import json
+import time
+from game.config import *
+from game import results, stats
+
+# Result store for sweeps (game/results.py): record seeded survival-bot games
+# into append-only memory-mapped columns, then filter, group and summarize
+# them without loading the store into memory. Every recording also adds to
+# the store's per-turn histograms (game/stats.py), which `stats` prints.
+# Usage: python -m tools.results record [--games 100] [--seed 0] [--characters xiaomou|all|ID,ID]
+#                                       [--seasons spring|all|ID,ID] [--cart cart.json] [--turns]
+#                                       [--workers N] [--store DIR]
+#        python -m tools.results query [--table runs|turns] [--where COND,COND] [--by COL,COL]
+#                                      [--column km] [--percentiles 10,50,90] [--store DIR]
+#        python -m tools.results stats [--store DIR]
+#        python -m tools.results info [--store DIR]
+#
+#   --games    seeds per character and season (seeds --seed .. --seed + games - 1)
+#   --turns    also record every game's trajectory (stats after each action)
+#   --store    store directory (default: cache/results/results); records are appended
+#   --where    conditions that must all hold: name=value, name=a|b, name!=value,
+#              name<value, name<=value, name>value, name>=value
+#              e.g. --where season=winter,outcome=dead,days>=2
+#   --by       group by these columns (e.g. character,season or outcome,cause)
+#   --column   numeric column to summarize (runs: days, hours, km, steps,
+#              min_temp, min_sanity; turns: temperature, sanity, stamina, ...)
+#
+# Needs numpy.
+
+CONDITION = re.compile(r"^(\w+)(>=|<=|!=|=|<|>)(.*)$")
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def pick(arg, known):
+    return list(known) if arg == "all" else arg.split(",")
+
+
+def parse_where(table, text):
+    # "season=winter,days>=2" -> {name: value | [values] | test}, None if malformed
+    where = {}
+    for part in filter(None, text.split(",")):
+        match = CONDITION.match(part)
+        if not match or match.group(1) not in table.dtypes:
+            return None
+        name, op, value = match.groups()
+        numeric = table.dtypes[name].kind != "S"
+        values = [float(v) if numeric else v for v in value.split("|")]
+        if op == "=":
+            where[name] = values if len(values) > 1 else values[0]
+            continue
+        value = table.encode(name, values[0])
+        where[name] = {"!=": lambda a, v=value: a != v, "<": lambda a, v=value: a < v,
+                       "<=": lambda a, v=value: a <= v, ">": lambda a, v=value: a > v,
+                       ">=": lambda a, v=value: a >= v}[op]
+    return where
+
+
+def number(value):
+    return f"{value:.3g}" if isinstance(value, float) else str(value)
+
+
+def print_stats(cell_stats):
+    # Per character and season: percentiles of the per-turn stats
+    names = list(stats.BINS)
+    print(f"{'character':<12} {'season':<8} " + " ".join(f"{n + ' p10/50/90':>22}" for n in names))
+    for (character_id, season), turn_stats in sorted(cell_stats.items()):
+        h = turn_stats.histograms
+        cells = ["/".join(f"{h[n].quantile(q):.3g}" for q in stats.QUANTILES) if h[n].count else "-"
+                 for n in names]
+        print(f"{character_id:<12} {season:<8} " + " ".join(f"{c:>22}" for c in cells))
+
+
+def record(args, store):
+    characters = pick(option(args, "--characters", "xiaomou"), CHARACTERS)
+    seasons = pick(option(args, "--seasons", "spring"), SEASONS)
+    if any(c not in CHARACTERS for c in characters) or any(s not in SEASONS for s in seasons):
+        print(f"Unknown character or season (characters: {', '.join(CHARACTERS)}; seasons: {', '.join(SEASONS)})")
+        return 2
+    cart = None
+    if "--cart" in args:
+        with open(option(args, "--cart", None), "r", encoding="utf-8") as f:
+            cart = json.load(f)
+    first_seed = int(option(args, "--seed", 0))
+    seeds = range(first_seed, first_seed + int(option(args, "--games", 100)))
+    workers = int(option(args, "--workers", os.cpu_count() or 1))
+    jobs = [(seed, c, s) for c in characters for s in seasons for seed in seeds]
+
+    def progress(done, total):
+        print(f"\r{done}/{total} games", end="", flush=True)
+
+    start = time.perf_counter()
+    cell_stats = results.record(store, jobs, cart, "--turns" in args, workers, progress)
+    print(f"\rRecorded {len(jobs)} games in {time.perf_counter() - start:.1f}s:"
+          f" {store.runs.rows} runs, {store.turns.rows} turns in {store.path}\n")
+    print_stats(cell_stats)
+    return 0
+
+
+def query(args, store):
+    table = store.turns if option(args, "--table", "runs") == "turns" else store.runs
+    where = parse_where(table, option(args, "--where", ""))
+    keys = [k for k in option(args, "--by", "").split(",") if k]
+    column = option(args, "--column", "km")
+    percentiles = [float(q) for q in option(args, "--percentiles", "10,50,90").split(",") if q]
+    if where is None or any(name not in table.dtypes for name in keys + [column]) \
+            or table.dtypes[column].kind == "S":
+        print(f"Unknown column or condition (columns: {', '.join(table.names)})")
+        return 2
+    start = time.perf_counter()
+    groups = table.group_by(keys, column, where, percentiles)
+    elapsed = time.perf_counter() - start
+    total = sum(g["count"] for g in groups.values())
+    print(f"{total} of {table.rows} rows, {column} ({elapsed:.2f}s)")
+    header = keys + ["count", "mean", "min", "max"] + [f"p{q:g}" for q in percentiles]
+    print("  ".join(f"{h:>10}" for h in header))
+    for key, row in groups.items():
+        print("  ".join(f"{number(v):>10}" for v in list(key) + [row[h] for h in header[len(keys):]]))
+    return 0
+
+
+def info(store):
+    for name, table in (("runs", store.runs), ("turns", store.turns)):
+        size = sum(os.path.getsize(table.column_path(c)) for c in table.names
+                   if os.path.exists(table.column_path(c)))
+        print(f"{name}: {table.rows} rows, {size / 1e6:.1f}MB, columns"
+              f" {', '.join(f'{c}:{table.dtypes[c].str}' for c in table.names)}")
+    return 0
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args or not args or args[0] not in ("record", "query", "stats", "info"):
+        print("Usage: python -m tools.results record [--games N] [--seed S] [--characters ID,ID|all]"
+              " [--seasons ID,ID|all] [--cart FILE] [--turns] [--workers N] [--store DIR]\n"
+              "       python -m tools.results query [--table runs|turns] [--where COND,COND] [--by COL,COL]"
+              " [--column COL] [--percentiles Q,Q] [--store DIR]\n"
+              "       python -m tools.results stats [--store DIR]\n"
+              "       python -m tools.results info [--store DIR]")
+        return 2
+    if results.np is None:
+        print("The result store needs numpy (pip install numpy).")
+        return 2
+    path = option(args, "--store", None) or results.default_path()
+    if path is None:
+        print("No default store location (packed game): pass --store DIR.")
+        return 2
+    if args[0] != "record" and not os.path.isdir(path):
+        print(f"No store at {path} (python -m tools.results record first).")
+        return 2
+    store = results.ResultStore(path)
+    try:
+        if args[0] == "record":
+            return record(args, store)
+        if args[0] == "query":
+            return query(args, store)
+        if args[0] == "stats":
+            print_stats(store.load_stats())
+            return 0
+        return info(store)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
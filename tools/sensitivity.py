@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+from game.config import *
+from game import tuning, simcache
+
+# Sensitivity report: how the survival bot's win rate, distance and days to
+# finish respond to each tunable (game/tuning.py: terrain and altitude
+# factors, weather stamina costs, body heat loss, item effects, drains,
+# event chances). Every parameter is moved by -/+ step on its own and played
+# on the same seeds as the shipped values (common random numbers), so the
+# central differences measure the parameter, not the dice.
+# Usage: python -m tools.sensitivity [--characters xiaomou|all|ID,ID] [--seasons all|ID,ID]
+#                                    [--groups terrain,altitude,...] [--seeds 32] [--step 0.1]
+#                                    [--workers N] [--cart cart.json] [--top N] [--out report.json]
+#                                    [--no-cache]
+#
+#   --groups   parameter groups (default: all of them)
+#   --seeds    games per character/season cell and setting
+#   --step     relative change each way (0.1 = -/+10%)
+#   --workers  simulation processes (default: one per core)
+#   --top      only print the N most influential parameters
+#   --no-cache play every game (by default cells already played with the same
+#              data, rules and settings come from cache/sim/, see game/simcache.py)
+#
+# Effects are per +step: "win +3.1%" means +10% on the parameter wins 3.1
+# more games in 100 (averaged over the cells). Ranked by win rate, then km.
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def pick(arg, known):
+    return list(known) if arg == "all" else arg.split(",")
+
+
+def signed(value, fmt):
+    return "-" if value is None else format(value, "+" + fmt)
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m tools.sensitivity [--characters ID,ID|all] [--seasons ID,ID|all]"
+              " [--groups G,G] [--seeds N] [--step S] [--workers N] [--cart FILE] [--top N] [--out FILE] [--no-cache]")
+        return 2
+    characters = pick(option(args, "--characters", "xiaomou"), CHARACTERS)
+    seasons = pick(option(args, "--seasons", "all"), SEASONS)
+    groups = pick(option(args, "--groups", "all"), tuning.GROUPS)
+    if any(c not in CHARACTERS for c in characters) or any(s not in SEASONS for s in seasons) \
+            or any(g not in tuning.GROUPS for g in groups):
+        print(f"Unknown character, season or group (characters: {', '.join(CHARACTERS)};"
+              f" seasons: {', '.join(SEASONS)}; groups: {', '.join(tuning.GROUPS)})")
+        return 2
+    cart = None
+    if "--cart" in args:
+        with open(option(args, "--cart", None), "r", encoding="utf-8") as f:
+            cart = json.load(f)
+    seeds = range(int(option(args, "--seeds", 32)))
+    step = float(option(args, "--step", tuning.STEP))
+    workers = int(option(args, "--workers", os.cpu_count() or 1))
+    top = int(option(args, "--top", 0))
+    out_path = option(args, "--out", None)
+
+    cells = [(c, s) for c in characters for s in seasons]
+    params = tuning.parameters(tuning.load_systems(), groups)
+    games = len(cells) * len(seeds) * (1 + 2 * len(params))
+    print(f"{len(params)} parameters x {len(cells)} cells x {len(seeds)} seeds: {games} games"
+          f" on {max(1, workers)} worker{'s' if workers > 1 else ''}")
+    start = time.perf_counter()
+    cache = None if "--no-cache" in args else simcache.default_cache()
+    evaluator = tuning.Evaluator(groups, workers, cart, cache)
+    try:
+        base, rows = tuning.sensitivity(evaluator, params, cells, seeds, step)
+    finally:
+        evaluator.close()
+    print(f"Done in {time.perf_counter() - start:.0f}s ({evaluator.games} games played,"
+          f" {evaluator.cached_games} from the cache).\n")
+
+    rows.sort(key=lambda r: (-abs(r[3]["win_rate"]), -abs(r[3]["km"])))
+    print(f"Shipped values: won {base['win_rate']:.1%}, {base['km']:.1f}km"
+          + (f", {base['days']:.1f} days to finish" if base['days'] is not None else ""))
+    print(f"\n{'rank':>4}  {'parameter':<36} {'value':>8}  {'win':>7} {'km':>7} {'days':>6}   per +{step:.0%}")
+    for rank, (p, minus, plus, effect) in enumerate(rows[:top or None], 1):
+        print(f"{rank:>4}  {p.label:<36} {p.default:>8.3g}  {signed(effect['win_rate'] * 100, '.1f'):>6}%"
+              f" {signed(effect['km'], '.2f'):>7} {signed(effect['days'], '.2f'):>6}")
+
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({"cells": cells, "seeds": len(seeds), "step": step, "base": base,
+                       "parameters": [{"name": p.name, "label": p.label, "default": p.default,
+                                       "minus": minus, "plus": plus, "effect": effect}
+                                      for p, minus, plus, effect in rows]},
+                      f, ensure_ascii=False, indent=1)
+        print(f"\nWrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
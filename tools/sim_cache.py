@@ -0,0 +1,38 @@
+import sys
+from game import simcache
+
+# The simulation result cache (game/simcache.py, cache/sim/): size, clearing
+# and eviction. Entries are keyed by the data, constants, rules and settings
+# they were played with, so they never need invalidating by hand; tools
+# evict the least recently used ones past the size limit themselves.
+# Usage: python -m tools.sim_cache [--max-mb 256] [--clear]
+#
+#   --max-mb  evict least recently used entries down to this size
+#   --clear   delete every entry
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m tools.sim_cache [--max-mb N] [--clear]")
+        return 2
+    cache = simcache.default_cache(int(float(option(args, "--max-mb", simcache.MAX_BYTES / 2 ** 20)) * 2 ** 20))
+    if cache is None:
+        print("No cache when running from an archive.")
+        return 2
+    if "--clear" in args:
+        cache.clear()
+    elif "--max-mb" in args:
+        print(f"Evicted {cache.evict()} entries.")
+    entries = cache.entries()
+    print(f"{cache.path}: {len(entries)} entries, {sum(size for _, size, _ in entries) / 2 ** 20:.1f}MB"
+          f" (limit {cache.max_bytes / 2 ** 20:.1f}MB), data/rules key {simcache.content_key()[:16]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
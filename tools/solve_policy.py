@@ -0,0 +1,89 @@
+import sys
+import json
+import time
+from game.config import *
+from game.systems import ItemSystem, MapSystem, WeatherSystem
+from game.state import GameState
+from game.autoplay import DEFAULT_CART
+from game import mdp
+
+# Solves the survival MDP (game/mdp.py) for a character, season and loadout
+# and prints the success probability and advice at the start of the trip.
+# Usage: python -m tools.solve_policy [--character xiaomou] [--season spring] [--cart cart.json]
+#                                     [--days 8] [--quick] [--force]
+#
+#   --cart   loadout as {item_id: count} (default: the autoplay loadout)
+#   --days   planning horizon
+#   --quick  coarse grid (seconds instead of minutes, values less precise)
+#   --force  solve again even if the table is cached
+#
+# Tables are cached in cache/policy/ and reused until the loadout, the data
+# files, the grid or the model change. Needs numpy.
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m tools.solve_policy [--character ID] [--season ID] [--cart cart.json]"
+              " [--days N] [--quick] [--force]")
+        return 2
+    if mdp.np is None:
+        print("The MDP solver needs numpy (pip install numpy).")
+        return 2
+    character_id = option(args, "--character", "xiaomou")
+    season = option(args, "--season", "spring")
+    if character_id not in CHARACTERS or season not in SEASONS:
+        print(f"Unknown character or season (characters: {', '.join(CHARACTERS)}; seasons: {', '.join(SEASONS)})")
+        return 2
+    cart = DEFAULT_CART
+    if "--cart" in args:
+        with open(option(args, "--cart", None), "r", encoding="utf-8") as f:
+            cart = json.load(f)
+    days = int(option(args, "--days", mdp.MAX_DAYS))
+    grid = mdp.QUICK_GRID if "--quick" in args else None
+
+    item_system = ItemSystem()
+    map_system = MapSystem()
+    weather_system = WeatherSystem()
+
+    def progress(done, total):
+        if done % 24 == 0 or done == total:
+            print(f"\r  hour {done}/{total}", end="", flush=True)
+
+    start = time.perf_counter()
+    table = mdp.solve(item_system, map_system, weather_system, character_id, season, cart, grid, days,
+                      force="--force" in args, progress=progress)
+    elapsed = time.perf_counter() - start
+    meta = table.meta
+    print(f"\n{meta.get('states', 0):,} states x 24 hours ({' x '.join(map(str, meta['shape']))}),"
+          f" {meta['rations']} rations of {meta['ration']:.0f}"
+          f" - {'loaded from cache' if table.cached else 'solved'} in {elapsed:.1f}s")
+
+    # The trip as it starts after checkout
+    state = GameState()
+    state.character_id = character_id
+    state.season = season
+    state.stamina = min(CHARACTERS[character_id]['buffs'].get('max_stamina', MAX_STAMINA), MAX_STAMINA)
+    for item_id, count in cart.items():
+        state.add_item(item_id, count)
+    state.distance_to_next_node = map_system.get_node(state.current_node_id).get('distance_to_next', 0)
+    print(f"\nStart ({state.day_time}:00, {state.weather}) - model estimates, not bounds on the game:")
+    for weather in meta["weathers"]:
+        state.weather = weather
+        action, probability = table.lookup(state, map_system, item_system)
+        print(f"  {weather:<8} {action:<14} success {probability:6.1%}")
+
+    counts = {}
+    for code in range(len(mdp.ACTION_NAMES)):
+        counts[mdp.ACTION_NAMES[code]] = int((table.action == code).sum())
+    total = sum(counts.values())
+    print("\nPolicy over all states: " + ", ".join(f"{name} {n / total:.0%}" for name, n in counts.items() if n))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
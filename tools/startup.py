@@ -0,0 +1,66 @@
+import os
+import sys
+import subprocess
+
+# Startup report: import time of each game module in a fresh interpreter,
+# and whether it pulled in pygame. The rules / data modules must not (the
+# headless tools, the replayer and the browser's first frame rely on that).
+# Usage: python -m tools.startup
+#
+# Exits 1 if a pure-data module imports pygame. For time to first frame, run
+# the game: main.py prints "Startup: imports ..ms, first frame ..ms".
+
+PURE_MODULES = [
+    "game.config",
+    "game.resources",
+    "game.bundle",
+    "game.effects",
+    "game.state",
+    "game.systems",
+    "game.simulation",
+    "game.storage",
+    "game.save",
+    "game.replay",
+    "game.slots",
+    "game.hotreload",
+]
+UI_MODULES = ["game.ui", "game.visualizer", "main"]
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print((time.perf_counter() - start) * 1000, 'pygame' in sys.modules)\n"
+)
+
+
+def probe(module, root):
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    out = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=root, env=env,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return None, out.stderr.strip().splitlines()[-1:]
+    ms, has_pygame = out.stdout.split()[-2:]
+    return float(ms), has_pygame == "True"
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    failed = False
+    print(f"{'module':<20} {'import ms':>10}  pygame")
+    for module in PURE_MODULES + UI_MODULES:
+        ms, has_pygame = probe(module, root)
+        if ms is None:
+            print(f"{module:<20} {'error':>10}  {has_pygame}")
+            failed = True
+            continue
+        flag = "yes" if has_pygame else "no"
+        if has_pygame and module in PURE_MODULES:
+            flag += "  <- should not import pygame"
+            failed = True
+        print(f"{module:<20} {ms:>10.1f}  {flag}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import os
+import re
+import sys
+import json
+import time
+from game.config import *
+from game.systems import DataLoader
+from game import resources, simulation, simcache, tuning
+
+# Tunes event trigger chances and the hunger/thirst drains (game/tuning.py)
+# so the survival bot's win rate per character and season hits a target,
+# then checks the result against the shipped values on fresh seeds.
+# Usage: python -m tools.tune_difficulty [--characters all|ID,ID] [--seasons all|ID,ID]
+#                                        [--targets targets.json] [--groups drains,chances]
+#                                        [--generations 20] [--seeds 16] [--popsize N] [--workers N]
+#                                        [--seed 0] [--cart cart.json] [--out tuning.json] [--apply]
+#                                        [--no-cache]
+#
+#   --targets  {season: win rate} for every character, or {character: {season: win rate}}
+#              (default: spring 60%, summer 50%, autumn 40%, winter 15%)
+#   --groups   which parameters to tune
+#   --seeds    games per character/season cell and candidate (common to a generation)
+#   --workers  simulation processes (default: one per core)
+#   --cart     loadout the bot buys (default: the autoplay loadout)
+#   --out      write the tuned values, the search history and the check as JSON
+#   --apply    write the chances into data/events.json and the drains into
+#              data/balance.json (rebuild the bundle afterwards: tools.build_bundle)
+#   --no-cache play every game (by default cells already played with the same
+#              data, rules and settings come from cache/sim/, see game/simcache.py)
+
+CHECK_SEED = 1000000 # Check seeds start here, far from the tuning seeds
+
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def pick(arg, known):
+    return list(known) if arg == "all" else arg.split(",")
+
+
+def load_targets(path, characters, seasons):
+    targets = dict(tuning.DEFAULT_TARGETS)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            targets = json.load(f)
+    cells = {}
+    for character_id in characters:
+        per_season = targets.get(character_id, targets)
+        for season in seasons:
+            if season in per_season:
+                cells[(character_id, season)] = float(per_season[season])
+    return cells
+
+
+def apply_chances(params, values):
+    # Rewrites the "chance" of each event's trigger_conditions line in place,
+    # keeping the file's hand formatting
+    path = resources.loader.local_path(f"{DataLoader.DATA_DIR}/events.json")
+    if path is None:
+        print("Data is not in a plain directory (packed assets?), events.json not written.")
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    rows = [i for i, line in enumerate(lines) if '"trigger_conditions"' in line]
+    events = json.loads("\n".join(lines))
+    indices = [i for i, e in enumerate(events) if 'trigger_conditions' in e]
+    if len(rows) != len(indices):
+        print("events.json: trigger_conditions are not one per line, not written.")
+        return False
+    row_of = dict(zip(indices, rows))
+    for p in params:
+        if not p.name.startswith("chance."):
+            continue
+        row = row_of[int(p.name.split(".")[1])]
+        line, count = re.subn(r'("chance":\s*)[0-9.eE+-]+', rf'\g<1>{values[p.name]:.3g}', lines[row])
+        if count != 1:
+            print(f"events.json line {row + 1}: no single chance, not written.")
+            return False
+        lines[row] = line
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    print(f"Wrote {path}")
+    return True
+
+
+def apply_drains(params, values):
+    # Writes the drains into data/balance.json, which game/simulation.py reads
+    path = resources.loader.local_path(simulation.BALANCE_FILE)
+    if path is None:
+        print(f"Data is not in a plain directory (packed assets?), {simulation.BALANCE_FILE} not written.")
+        return False
+    balance = simulation.load_balance()
+    for p in params:
+        if p.name.startswith("drain."):
+            balance[p.label] = round(values[p.name], 2)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(balance, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {path}")
+    return True
+
+
+def main():
+    args = sys.argv[1:]
+    if "--help" in args or "-h" in args:
+        print("Usage: python -m tools.tune_difficulty [--characters all|ID,ID] [--seasons all|ID,ID]"
+              " [--targets FILE] [--groups drains,chances] [--generations N] [--seeds N] [--popsize N]"
+              " [--workers N] [--seed S] [--cart FILE] [--out FILE] [--apply] [--no-cache]")
+        return 2
+    characters = pick(option(args, "--characters", "all"), CHARACTERS)
+    seasons = pick(option(args, "--seasons", "all"), SEASONS)
+    groups = option(args, "--groups", "drains,chances").split(",")
+    if any(c not in CHARACTERS for c in characters) or any(s not in SEASONS for s in seasons) \
+            or any(g not in tuning.GROUPS for g in groups):
+        print(f"Unknown character, season or group (characters: {', '.join(CHARACTERS)};"
+              f" seasons: {', '.join(SEASONS)}; groups: {', '.join(tuning.GROUPS)})")
+        return 2
+    targets = load_targets(option(args, "--targets", None), characters, seasons)
+    if not targets:
+        print("No targets for these characters and seasons.")
+        return 2
+    cart = None
+    if "--cart" in args:
+        with open(option(args, "--cart", None), "r", encoding="utf-8") as f:
+            cart = json.load(f)
+    generations = int(option(args, "--generations", tuning.GENERATIONS))
+    seeds = int(option(args, "--seeds", tuning.SEEDS))
+    popsize = int(option(args, "--popsize", 0)) or None
+    workers = int(option(args, "--workers", os.cpu_count() or 1))
+    out_path = option(args, "--out", None)
+
+    cache = None if "--no-cache" in args else simcache.default_cache()
+    evaluator = tuning.Evaluator(groups, workers, cart, cache)
+    params = tuning.parameters(tuning.load_systems(), groups)
+    tuner = tuning.Tuner(evaluator, params, targets, seeds, popsize, seed=int(option(args, "--seed", 0)))
+    print(f"{len(params)} parameters, {len(targets)} cells, {tuner.cma.popsize} candidates x"
+          f" {seeds} games per cell and generation, {max(1, workers)} worker{'s' if workers > 1 else ''}")
+    start = time.perf_counter()
+    try:
+        for _ in range(generations):
+            losses, _ = tuner.step()
+            generation, best, mean, sigma = tuner.history[-1]
+            print(f"generation {generation:3d}: best loss {best:.4f}, mean {mean:.4f}, step {sigma:.3f}"
+                  f" ({time.perf_counter() - start:.0f}s)")
+
+        # Check: shipped and tuned values on the same fresh seeds
+        values = tuner.result()
+        check_seeds = range(CHECK_SEED, CHECK_SEED + seeds * 4)
+        defaults = {p.name: p.default for p in params}
+        before, after = tuner.win_rates([defaults, values], check_seeds)
+    finally:
+        evaluator.close()
+
+    print(f"\n{evaluator.games} games ({evaluator.cached_games} more from the cache)"
+          f" in {time.perf_counter() - start:.0f}s."
+          f" Win rates on {len(check_seeds)} check seeds per cell:")
+    print(f"{'character':<12} {'season':<8} {'target':>7} {'shipped':>8} {'tuned':>7}")
+    for cell, target in targets.items():
+        print(f"{cell[0]:<12} {cell[1]:<8} {target:>7.0%} {before[cell]:>8.0%} {after[cell]:>7.0%}")
+    print(f"loss: shipped {tuner.loss(before, [0.0] * len(params)):.4f}, tuned {tuner.loss(after, tuner.cma.mean):.4f}")
+
+    print("\nParameters (largest change first):")
+    for p in sorted(params, key=lambda p: -abs(values[p.name] / p.default - 1) if p.default else 0):
+        print(f"  {p.label:<44} {p.default:>8.3g} -> {values[p.name]:<8.3g} x{values[p.name] / p.default:.2f}")
+
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({"targets": [[c, s, t] for (c, s), t in targets.items()],
+                       "values": values,
+                       "labels": {p.name: p.label for p in params},
+                       "history": tuner.history,
+                       "check": {"seeds": len(check_seeds),
+                                 "shipped": [[c, s, r] for (c, s), r in before.items()],
+                                 "tuned": [[c, s, r] for (c, s), r in after.items()]}},
+                      f, ensure_ascii=False, indent=1)
+        print(f"Wrote {out_path}")
+    if "--apply" in args:
+        if apply_chances(params, values):
+            print("Run python -m tools.build_bundle to rebuild the data bundle.")
+        apply_drains(params, values)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())